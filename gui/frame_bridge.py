@@ -0,0 +1,70 @@
+# /home/taran/self_discovery/gui/frame_bridge.py
+# Carries "a new frame was captured" from the grabber thread to the GUI
+# thread, so the window repaints when the camera delivers and sits idle in
+# between, never faster than the display can show.
+
+import threading
+import time
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+from camera.frame_pacing import FramePacingStats
+
+
+class FrameBridge(QObject):
+    """
+    Listens on a FrameGrabber and emits `frame_ready(frame, seq, timestamp)`
+    on the GUI thread. At most one wake-up is queued at a time: frames that
+    arrive while one is pending are not queued behind it, the GUI simply
+    picks up the newest frame when it gets there. Deliveries are spaced at
+    least 1 / `max_fps` apart (the display refresh rate); a frame arriving
+    sooner is held until the next refresh slot rather than dropped.
+
+    The frame is the receivers' own copy (FrameGrabber.latest_copy), so it
+    cannot tear when the grabber wraps around its ring and may be kept.
+    Pacing is recorded in `stats` (FramePacingStats).
+    """
+
+    frame_ready = pyqtSignal(object, int, float)
+    _wake = pyqtSignal()
+
+    def __init__(self, grabber, max_fps=60.0, parent=None):
+        super().__init__(parent)
+        self.grabber = grabber
+        self.min_interval = 1.0 / max_fps if max_fps else 0.0
+        self.stats = FramePacingStats()
+        self._pending = False
+        self._lock = threading.Lock()
+        self._next_delivery = 0.0
+        self._held = QTimer(self)
+        self._held.setSingleShot(True)
+        self._held.timeout.connect(self._deliver)
+        # Emitted from the grabber thread, queued onto this object's thread
+        self._wake.connect(self._deliver)
+        grabber.add_listener(self._on_frame)
+
+    def _on_frame(self, frame, seq, timestamp):
+        with self._lock:
+            if self._pending:
+                return
+            self._pending = True
+        self._wake.emit()
+
+    def _deliver(self):
+        wait = self._next_delivery - time.perf_counter()
+        if wait > 0:
+            if not self._held.isActive():
+                self._held.start(int(wait * 1000) + 1)
+            return
+        with self._lock:
+            self._pending = False
+        # One copy per displayed frame rather than per captured one
+        frame, seq, timestamp = self.grabber.latest_copy()
+        if frame is None:
+            return
+        self._next_delivery = time.perf_counter() + self.min_interval
+        self.stats.record(seq, timestamp)
+        self.frame_ready.emit(frame, seq, timestamp)
+
+    def close(self):
+        self.grabber.remove_listener(self._on_frame)
+        self._held.stop()
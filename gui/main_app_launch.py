@@ -1,5 +1,6 @@
 # /home/taran/self_discovery/gui/main_app_launch.py
 
+import copy
 import sys
 import os
 import cv2
@@ -14,8 +15,8 @@ from PyQt5.QtWidgets import (
     QVBoxLayout,
     QPushButton,
 )
-from PyQt5.QtCore import QTimer, Qt
-from PyQt5.QtGui import QImage, QPixmap, QFont
+from PyQt5.QtCore import QTimer, Qt, pyqtSignal
+from PyQt5.QtGui import QFont
 
 sys.path.append(os.path.join(os.path.dirname(__file__), "..", "src"))
 from camera.camera_interface import CameraInterface
@@ -23,17 +24,33 @@ from face_detection.face_detector import HailoFaceDetector
 from user_management.user_profiles import (
     ProfileDetailsDialog,
     save_profile,
-    load_profiles,
+    get_profile_store,
     DEFAULT_PROFILE_TEMPLATE,
 )
+from user_management.face_gallery import FaceGallery
+from user_management.embedding_service import get_embedding_service
+from user_management.face_quality import FaceQualityGate
+from user_management.snapshot_writer import SnapshotWriter
+from user_management.snapshot_archive import get_snapshot_archive
+from user_analysis.feature_store import get_feature_store
+from user_analysis.skin_metrics import compute_skin_metrics
 from weather.open_meteo import get_weather
-import face_recognition
-from timezonefinder import TimezoneFinder
-from geopy.geocoders import Nominatim
+from weather.location_resolver import get_location_resolver
+from recognition_worker import RecognitionWorker
+from frame_bridge import FrameBridge
+from video_widget import VideoWidget
 import pytz
 
 
 class SmartMirrorApp(QMainWindow):
+    # Profile saves can happen on the snapshot writer thread
+    profile_changed = pyqtSignal(str, object)
+    # Snapshot results from the writer thread, handled on this one
+    registration_snapshot_done = pyqtSignal(str, object, object)  # user, file, enc
+    daily_snapshot_skipped = pyqtSignal(str)  # date key
+    # Geocoding results for profiles without a timezone
+    location_resolved = pyqtSignal(str, object)  # user id, result or None
+
     def __init__(self):
         super().__init__()
 
@@ -53,8 +70,9 @@ class SmartMirrorApp(QMainWindow):
         self.greeting_label.setFont(QFont("Arial", 16))
         self.layout.addWidget(self.greeting_label)
 
-        self.camera_label = QLabel()
-        self.layout.addWidget(self.camera_label)
+        # Mirrors and scales in the paint itself; frames stay as captured
+        self.video = VideoWidget(mirror=True)
+        self.layout.addWidget(self.video)
 
         self.setup_btn = QPushButton("+ Add New User")
         self.setup_btn.clicked.connect(self.begin_registration_sequence)
@@ -64,25 +82,56 @@ class SmartMirrorApp(QMainWindow):
         self.switch_btn.clicked.connect(self.reset_recognition)
         self.layout.addWidget(self.switch_btn)
 
-        self.camera = CameraInterface()
+        # Capture runs on its own thread; update_frame only picks up the latest
+        self.camera = CameraInterface(threaded=True)
         self.face_detector = HailoFaceDetector(
             "/usr/share/hailo-models/yolov5s_personface_h8l.hef"
         )
-        self.users = load_profiles()
-
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.update_frame)
-        self.timer.start(100)
+        self.profile_store = get_profile_store()
+        self.users = self.profile_store.profiles
+        self.gallery = FaceGallery.from_profiles(self.users)
+        # Saved profiles are pushed here instead of reloading every user
+        # (queued onto this thread when a save happens elsewhere)
+        self.profile_changed.connect(self.on_profile_changed)
+        self.profile_store.add_listener(self.profile_changed.emit)
+        # Image encoding, disk writes and snapshot bookkeeping run here
+        self.snapshot_writer = SnapshotWriter(self.profile_store)
+        self.registration_snapshot_done.connect(self.on_registration_snapshot)
+        self.daily_snapshot_skipped.connect(self.on_daily_snapshot_skipped)
+        self.location_resolved.connect(self.on_location_resolved)
+        self._resolving = set()  # user ids with a location lookup running
+        self.archive = get_snapshot_archive()
+        self.features = get_feature_store()
+        self._snapshot_pending = False
+
+        # Detection + encoding take hundreds of ms: keep them off this thread.
+        # The worker owns the Hailo detector from here on.
+        self.quality_gate = FaceQualityGate()
+        # "Look left/right" prompts ask for some yaw on purpose
+        self.registration_gate = FaceQualityGate(max_yaw=0.6)
+        self.recognition_worker = RecognitionWorker(detector=self.face_detector)
+        self.recognition_worker.faces_ready.connect(self.on_faces_ready)
+        self.recognition_worker.start()
+
+        # Repaint when the camera has a new frame, at most once per refresh
+        screen = QApplication.primaryScreen()
+        refresh = screen.refreshRate() if screen is not None else 60.0
+        self.frame_bridge = FrameBridge(self.camera.grabber, max_fps=refresh or 60.0)
+        self.frame_bridge.frame_ready.connect(self.update_frame)
 
         self.clock_timer = QTimer()
         self.clock_timer.timeout.connect(self.update_time)
         self.clock_timer.start(60000)
+        # One pending look at the weather cache while the first reading is
+        # on its way; clock ticks and recognitions do not add more
+        self.weather_retry = QTimer()
+        self.weather_retry.setSingleShot(True)
+        self.weather_retry.timeout.connect(self.update_time)
 
         self.update_time("Europe/Bucharest")
         self.in_registration = False
         self.capture_count = 0
         self.registration_data = {}
-        self.frame_count = 0
         self.recognition_active = True
         self.snapshot_log = set()
         self.active_user = None
@@ -100,45 +149,56 @@ class SmartMirrorApp(QMainWindow):
         user_profile = getattr(self, "active_user", None)
         if timezone is None:
             if user_profile:
-                loc = user_profile.get("location", {})
-                location_str = f"{loc.get('city', '')}, {loc.get('state', '')}, {loc.get('country', '')}"
-                try:
-                    geolocator = Nominatim(user_agent="smart_mirror")
-                    location = geolocator.geocode(location_str)
-                    if location:
-                        tf = TimezoneFinder()
-                        timezone = tf.timezone_at(
-                            lng=location.longitude, lat=location.latitude
-                        )
-                    else:
-                        timezone = "UTC"
-                except:
-                    timezone = "UTC"
+                timezone = self.profile_timezone(user_profile)
             else:
                 timezone = "Europe/Bucharest"
 
         tz = pytz.timezone(timezone)
         now = datetime.now(tz).strftime("%H:%M:%S")
 
+        # Never block the GUI thread on the network: show the cached reading
+        # and, while the first one is still on its way, look again shortly
         weather = get_weather(
-            user_profile.get("location", {}) if user_profile else "default"
+            user_profile.get("location", {}) if user_profile else "default",
+            wait=False,
         )
+        if weather["condition"] == "Updating" and not self.weather_retry.isActive():
+            self.weather_retry.start(2000)
         weather_text = f"{weather['location']}: {weather['temperature']}°F • {weather['condition']} • Wind {weather['wind']} mph"
 
         self.info_label.setText(f"Time: {now} | {weather_text}")
 
-    def update_frame(self):
-        frame = self.camera.get_frame()
-        if frame is None:
-            return
+    def profile_timezone(self, profile):
+        loc = profile.get("location") or {}
+        if loc.get("timezone"):
+            return loc["timezone"]
+        # New registrations and profiles saved before locations were
+        # resolved: look the place up in the background (cached on disk) and
+        # show UTC until then
+        user_id = profile["name"].lower()
+        if user_id not in self._resolving:
+            self._resolving.add(user_id)
+            get_location_resolver().resolve_async(loc).add_done_callback(
+                lambda f: self.location_resolved.emit(
+                    user_id, None if f.exception() else f.result()
+                )
+            )
+        return "UTC"
 
-        frame = cv2.flip(frame, 1)
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = rgb.shape
-        qt_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-        self.camera_label.setPixmap(
-            QPixmap.fromImage(qt_img).scaled(800, 500, Qt.KeepAspectRatio)
+    def on_location_resolved(self, user_id, result):
+        self._resolving.discard(user_id)
+        if result is None:
+            return
+        self.snapshot_writer.update_profile(
+            user_id, lambda profile: profile.setdefault("location", {}).update(result)
         )
+        if self.active_user and self.active_user["name"].lower() == user_id:
+            self.update_time(result.get("timezone") or "UTC")
+
+    def update_frame(self, frame, seq, timestamp):
+        # `frame` is the bridge's own copy: the widget, the snapshot writer
+        # and the recognition worker only read it, so they share it
+        self.video.set_frame(frame)
 
         if self.in_registration:
             prompt = (
@@ -153,59 +213,48 @@ class SmartMirrorApp(QMainWindow):
                     self.last_capture_time = time.time()
                 elif time.time() - self.last_capture_time > 2:
                     self.last_capture_time = time.time()
-                    QTimer.singleShot(10, lambda: self.capture_snapshot(frame))
-                    self.capture_count += 1
+                    # Counts only once a snapshot passes the quality gate
+                    self.capture_snapshot(frame)
             else:
                 self.finish_registration()
                 return
 
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        small_rgb = cv2.resize(rgb, (0, 0), fx=0.5, fy=0.5)
-        self.frame_count += 1
-
-        if self.recognition_active and self.frame_count % 15 == 0:
-            face_locations = face_recognition.face_locations(small_rgb)
-            face_encodings = face_recognition.face_encodings(small_rgb, face_locations)
-
-            for face_encoding in face_encodings:
-                best_match = None
-                best_distance = float("inf")
-                for user_id, profile in self.users.items():
-                    known_encs = profile.get("facial_data", {}).get("encodings", [])
-                    known_encs_np = np.array(known_encs)
-                    if not known_encs_np.any():
-                        continue
-                    distances = face_recognition.face_distance(
-                        known_encs_np, face_encoding
-                    )
-                    min_dist = np.min(distances)
-                    if min_dist < 0.45 and min_dist < best_distance:
-                        best_match = profile
-                        best_distance = min_dist
-
-                if best_match:
-                    self.active_user = best_match
-                    self.setup_btn.hide()
-                    self.update_time()
-                    self.greeting_label.setText(
-                        f"🌞 Welcome back, {best_match['name']}!"
-                    )
-                    print(
-                        f"✅ Recognized user: {best_match['name']} (distance: {best_distance:.2f})"
-                    )
-                    self.recognition_active = False
-                    self.capture_daily_snapshot(frame)
-                    break
-                else:
-                    self.greeting_label.setText(
-                        "😕 I don't recognize you yet. Want to add a profile?"
-                    )
-
-        h, w, ch = rgb.shape
-        qt_img = QImage(rgb.data, w, h, ch * w, QImage.Format_RGB888)
-        self.camera_label.setPixmap(
-            QPixmap.fromImage(qt_img).scaled(800, 500, Qt.KeepAspectRatio)
+        if self.recognition_active:
+            # The worker drops frames it can't keep up with and only embeds
+            # faces that are new (or due a re-check) to its tracker
+            self.recognition_worker.submit(frame)
+
+    def on_faces_ready(self, frame, track_ids, face_locations, face_encodings):
+        if not self.recognition_active:
+            return  # a frame submitted before someone was recognized
+
+        # 0.45 is a dlib distance; other embedders use their calibrated equivalent
+        backend = get_embedding_service().backend
+        matches = self.gallery.match(
+            face_encodings, threshold=backend.threshold_for(0.45), metric=backend.metric
         )
+        track_ids = track_ids or [None] * len(face_encodings)
+        for (user_id, best_distance), location, encoding, track_id in zip(
+            matches, face_locations, face_encodings, track_ids
+        ):
+            self.recognition_worker.identify(track_id, user_id, best_distance)
+            best_match = self.users.get(user_id) if user_id else None
+
+            if best_match:
+                self.active_user = best_match
+                self.setup_btn.hide()
+                self.update_time()
+                self.greeting_label.setText(f"🌞 Welcome back, {best_match['name']}!")
+                print(
+                    f"✅ Recognized user: {best_match['name']} (distance: {best_distance:.2f})"
+                )
+                self.recognition_active = False
+                self.capture_daily_snapshot(frame, encoding, location)
+                break
+            else:
+                self.greeting_label.setText(
+                    "😕 I don't recognize you yet. Want to add a profile?"
+                )
 
     def begin_registration_sequence(self):
         dialog = ProfileDetailsDialog()
@@ -233,24 +282,76 @@ class SmartMirrorApp(QMainWindow):
         print("🟢 Starting registration in GUI mode")
 
     def capture_snapshot(self, frame):
-        timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
-        user_id = self.registration_data["name"].lower()
-        folder = os.path.join("data", "users", user_id)
-        os.makedirs(folder, exist_ok=True)
-        filename = os.path.join(folder, f"{timestamp}_snap{self.capture_count+1}.jpg")
-        cv2.imwrite(filename, frame)
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        encs = face_recognition.face_encodings(rgb)
-        if encs:
-            self.registration_data["encodings"].append(encs[0].tolist())
-            self.registration_data["snapshots"].append(filename)
-            print(f"✅ Captured and saved {filename}")
-        else:
-            print("⚠️ No face detected in snapshot")
+        # One snapshot in flight at a time; the next prompt waits for it
+        if self._snapshot_pending:
+            return
+        self._snapshot_pending = True
+        self.snapshot_writer.call(
+            self._store_registration_snapshot,
+            frame,
+            self.registration_data["name"].lower(),
+            self.capture_count + 1,
+        )
+
+    def _store_registration_snapshot(self, frame, user_id, number):
+        """
+        Runs on the snapshot writer thread. Registration state belongs to the
+        GUI thread: the outcome goes back through registration_snapshot_done.
+        """
+        filename = encoding = None
+        try:
+            frame = cv2.flip(frame, 1)  # stored as the mirror shows them
+            quality = self.registration_gate.best_face(frame)
+            if quality is None:
+                print("⚠️ No face detected in snapshot")
+                return
+            if not quality.ok:
+                print(f"⚠️ Snapshot rejected ({quality.reason}), trying again")
+                return
+
+            (encoding,) = get_embedding_service().encode_faces(
+                frame, [quality.location], [quality.landmarks]
+            )
+            if encoding is None:
+                print("⚠️ No face encoding for snapshot")
+                return
+
+            now = datetime.now()
+            folder = self.archive.user_folder(user_id)
+            name = f"{now.strftime('%Y-%m-%d_%H%M%S')}_snap{number}"
+            filename = self.snapshot_writer.save_image(
+                frame, os.path.join(folder, name)
+            )
+            self.snapshot_writer.call(
+                self._index_snapshot,
+                user_id,
+                filename,
+                now,
+                "registration",
+                None,
+                frame,
+                quality,
+                encoding,
+            )
+        finally:
+            self.registration_snapshot_done.emit(user_id, filename, encoding)
+
+    def on_registration_snapshot(self, user_id, filename, encoding):
+        self._snapshot_pending = False
+        if filename is None or not self.in_registration:
+            return
+        if user_id != self.registration_data["name"].lower():
+            return  # from a registration that was started over
+        if self.capture_count >= len(self.registration_prompts):
+            return
+        self.registration_data["encodings"].append(encoding.tolist())
+        self.registration_data["snapshots"].append(filename)
+        # Counted last: update_frame finishes registration on this count
+        self.capture_count += 1
+        print(f"✅ Captured {filename}")
 
     def finish_registration(self):
-        profile = DEFAULT_PROFILE_TEMPLATE.copy()
+        profile = copy.deepcopy(DEFAULT_PROFILE_TEMPLATE)
         encs = np.array(self.registration_data["encodings"])
         mean_vec = np.mean(encs, axis=0)
         dists = np.linalg.norm(encs - mean_vec, axis=1)
@@ -272,21 +373,31 @@ class SmartMirrorApp(QMainWindow):
         )
 
         user_id = profile["name"].lower()
-        save_profile(user_id, profile)
-        self.users = load_profiles()
-        self.active_user = profile
+        # lat/lon/timezone are looked up in the background (profile_timezone)
+        self.active_user = save_profile(user_id, profile)
         self.update_time()
         self.greeting_label.setText(f"🎉 Welcome, {profile['name']}!")
         print("✔️ Registration completed")
         self.in_registration = False
 
+    def on_profile_changed(self, user_id, profile):
+        if profile is None:
+            self.users.pop(user_id, None)
+            self.gallery.remove(user_id)
+            return
+        self.users[user_id] = profile
+        self.gallery.replace(user_id, profile["facial_data"].get("encodings", []))
+        if self.active_user and self.active_user["name"].lower() == user_id:
+            self.active_user = profile
+
     def reset_recognition(self):
         self.active_user = None
         self.recognition_active = True
+        self.recognition_worker.reset_tracks()
         self.greeting_label.setText("🔄 Please look at the mirror for recognition")
         self.setup_btn.show()
 
-    def capture_daily_snapshot(self, frame):
+    def capture_daily_snapshot(self, frame, encoding=None, location=None):
         if not self.active_user:
             return
 
@@ -308,49 +419,124 @@ class SmartMirrorApp(QMainWindow):
         if date_key in self.snapshot_log:
             return  # already captured
 
+        # Checked off now so later recognitions don't queue it again; it is
+        # cleared (daily_snapshot_skipped) if the snapshot turns out unusable
+        self.snapshot_log.add(date_key)
         user_id = self.active_user["name"].lower()
-        folder = os.path.join("data", "users", user_id)
-        os.makedirs(folder, exist_ok=True)
-        filename = os.path.join(
-            folder, f"{now.strftime('%Y-%m-%d_%H%M%S')}_{period}.jpg"
+        self.snapshot_writer.call(
+            self._store_daily_snapshot,
+            frame,
+            encoding,
+            location,
+            user_id,
+            now,
+            period,
+            date_key,
         )
-        cv2.imwrite(filename, frame)
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        encs = face_recognition.face_encodings(rgb)
-        if encs:
-            enc = encs[0].tolist()
-            profile = self.active_user
-            profile["facial_data"].setdefault("encodings", []).append(enc)
-            if len(profile["facial_data"]["encodings"]) > 10:
-                profile["facial_data"]["encodings"] = profile["facial_data"][
-                    "encodings"
-                ][-10:]
-            profile.setdefault("snapshots", []).append(filename)
-            save_profile(user_id, profile)
-            print(f"📸 Daily snapshot captured: {filename}")
 
-        self.snapshot_log.add(date_key)
+    def _store_daily_snapshot(
+        self, frame, encoding, location, user_id, now, period, date_key
+    ):
+        """Runs on the snapshot writer thread."""
+        # Only good crops join the gallery; after a rejection the snapshot is
+        # taken the next time the user is recognized
+        quality = self.quality_gate.best_face(
+            frame, [location] if location is not None else None
+        )
+        if quality is None or not quality.ok:
+            reason = quality.reason if quality else "no face"
+            print(f"⚠️ Daily snapshot skipped ({reason})")
+            self.daily_snapshot_skipped.emit(date_key)
+            return
 
-        # Save placeholder daily tip
-        tips_path = os.path.join(folder, "daily_tips.json")
-        import json
+        if encoding is None:
+            (encoding,) = get_embedding_service().encode_faces(
+                frame, [quality.location], [quality.landmarks]
+            )
+        if encoding is None:
+            print("⚠️ No face encoding for daily snapshot")
+            self.daily_snapshot_skipped.emit(date_key)
+            return
 
-        try:
-            with open(tips_path, "r") as f:
-                tips_data = json.load(f)
-        except FileNotFoundError:
-            tips_data = {}
+        folder = self.archive.user_folder(user_id)
+        filename = self.snapshot_writer.save_image(
+            frame, os.path.join(folder, f"{now.strftime('%Y-%m-%d_%H%M%S')}_{period}")
+        )
+        # Indexed once the image is on disk; the archive, not the profile,
+        # keeps the snapshot history, thinned out by its retention policy
+        self.snapshot_writer.call(
+            self._index_snapshot,
+            user_id,
+            filename,
+            now,
+            "daily",
+            period,
+            frame,
+            quality,
+            encoding,
+        )
+        self.snapshot_writer.call(self._apply_retention, user_id)
+
+        def add_encoding(profile):
+            known = profile["facial_data"].get("encodings", [])
+            known = np.asarray(known, dtype=np.float32)
+            if not known.size:
+                known = known.reshape(0, len(encoding))
+            # A different width (another embedding backend) fails in vstack
+            # Keep the 10 most recent encodings
+            profile["facial_data"]["encodings"] = np.vstack([known, encoding])[-10:]
 
-        tips_data[f"{now.date()}_{period}"] = "💡 (pending update)"
-        with open(tips_path, "w") as f:
-            json.dump(tips_data, f, indent=2)
+        self.snapshot_writer.update_profile(user_id, add_encoding)
+        print(f"📸 Daily snapshot captured: {filename}")
 
+        # Save placeholder daily tip
+        self.snapshot_writer.update_json(
+            os.path.join(folder, "daily_tips.json"),
+            {f"{now.date()}_{period}": "💡 (pending update)"},
+        )
         print(f"📝 Saved daily tip placeholder for {now.date()} {period} time")
 
+    def on_daily_snapshot_skipped(self, date_key):
+        self.snapshot_log.discard(date_key)  # taken at the next recognition
+
+    def _index_snapshot(
+        self, user_id, filename, now, kind, period, frame, quality, encoding
+    ):
+        """Runs on the snapshot writer thread, after the image is written."""
+        snapshot_id = self.archive.add(
+            user_id,
+            filename,
+            taken_at=now.timestamp(),
+            kind=kind,
+            period=period,
+            frame=frame,
+            location=quality.location,
+            quality=quality.sharpness,
+            embedding=encoding,
+        )
+        # Skin metrics are measured once, here, from the full-resolution face
+        metrics = compute_skin_metrics(frame, quality.location)
+        if metrics is not None:
+            self.features.append(user_id, now.timestamp(), metrics, snapshot_id)
+
+    def _apply_retention(self, user_id):
+        removed = self.archive.retain(user_id)
+        if removed:
+            self.archive.compact(user_id)
+            print(f"🧹 Removed {removed} old snapshot(s) of {user_id}")
+
     def closeEvent(self, event):
+        self.recognition_worker.stop()
+        self.snapshot_writer.close()  # finish pending writes
+        self.frame_bridge.close()
+        pacing = self.frame_bridge.stats.summary()
+        print(
+            f"📊 Display: {pacing['fps']:.1f} fps, {pacing['dropped']} dropped, "
+            f"{pacing['late']} late, {pacing['duplicate']} duplicate, "
+            f"{pacing['mean_latency_ms']:.0f} ms mean latency"
+        )
         self.camera.stop()
-        self.face_detector.close()
+        self.face_detector.release()
         event.accept()
 
 
@@ -0,0 +1,188 @@
+# /home/taran/self_discovery/gui/recognition_worker.py
+# Face location + encoding on a background QThread so the GUI timer only
+# hands frames over and paints; results come back through a Qt signal.
+# Face boxes come from the Hailo detector when one is given, so the CPU only
+# computes embeddings; otherwise face_recognition's HOG detector finds them.
+# Embeddings run on the EmbeddingService process pool, one face per core.
+# With the detector, faces are tracked across frames and a face is only
+# embedded when its track is new or due for a re-check. A motion/presence
+# scheduler decides how often any of this runs at all.
+
+import threading
+import time
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QThread, pyqtSignal
+from camera.activity_scheduler import (
+    IDENTIFY,
+    PRESENCE,
+    SKIP,
+    RecognitionScheduler,
+)
+from face_detection.face_detector import DETECTION_DTYPE, detections_to_locations
+from face_detection.face_tracker import FaceTracker
+from user_management.embedding_service import get_embedding_service
+from user_management.face_quality import FaceQualityGate
+
+
+class RecognitionWorker(QThread):
+    """
+    Holds at most one pending frame: submit() replaces a frame the worker has
+    not started on yet (counted in `dropped`), so a slow pass never builds a
+    backlog and every result describes the newest frame available when the
+    worker became free.
+
+    With a detector, every submitted frame is detected (cheap on the
+    accelerator) and fed to a FaceTracker; only the tracks it reports as due
+    and pass `quality` (size, brightness, blur; pose needs landmarks and is
+    left to the capture paths) are embedded, and `faces_ready` is emitted
+    with (frame, track_ids, locations, encodings) for those. Report the
+    match for each track with identify() so it is re-checked at the slower
+    re-verify rate. Without a detector, HOG finds and encodes all faces in
+    one pass and track_ids is None.
+
+    `scheduler` (a RecognitionScheduler) gates every frame: while the room
+    is still only its motion check runs, once something moves faces are
+    detected, and embeddings are computed only while faces are in view.
+    Without a detector the HOG pass serves as detection, so the default
+    scheduler then runs at most `hog_rate` passes per second.
+
+    Frames are submitted as captured; with `mirror` the worker flips the
+    ones it processes, so the frame in `faces_ready` and its (top, right,
+    bottom, left) locations match what the mirror shows. The signal is
+    queued onto the receiver's thread, so matching against the gallery stays
+    on the GUI thread.
+    """
+
+    faces_ready = pyqtSignal(object, object, object, object)
+
+    def __init__(
+        self,
+        detector=None,
+        embedder=None,
+        tracker=None,
+        quality=None,
+        scheduler=None,
+        scale=0.5,
+        hog_rate=1.0,
+        mirror=True,
+        parent=None,
+    ):
+        super().__init__(parent)
+        self.detector = detector
+        self.embedder = embedder or get_embedding_service()
+        self.tracker = tracker or FaceTracker()
+        self.quality = quality or FaceQualityGate(min_size=60, check_pose=False)
+        self.scheduler = scheduler
+        self.scale = scale
+        self.mirror = mirror
+        self.hog_rate = hog_rate
+        self.submitted = 0
+        self.processed = 0
+        self.dropped = 0
+        self.rejected = 0  # due faces that failed the quality gate
+        self.last_duration = 0.0
+        self._pending = None
+        self._running = True
+        self._cond = threading.Condition()
+
+    def submit(self, frame):
+        with self._cond:
+            if self._pending is not None:
+                self.dropped += 1
+            self._pending = frame
+            self.submitted += 1
+            self._cond.notify()
+
+    def run(self):
+        if self.detector is not None and not self.detector.is_open:
+            try:
+                # Opened here so the vstreams live on the thread that uses them
+                self.detector.open()
+            except Exception as e:
+                print(f"⚠️ Hailo detector unavailable ({e}), using CPU HOG")
+                self.detector = None
+        if self.scheduler is None:
+            rates = None
+            if self.detector is None:
+                rates = {PRESENCE: self.hog_rate, IDENTIFY: self.hog_rate}
+            self.scheduler = RecognitionScheduler(rates=rates)
+
+        while True:
+            with self._cond:
+                while self._pending is None and self._running:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                frame, self._pending = self._pending, None
+
+            start = time.perf_counter()
+            result = self.encode(frame)
+            self.last_duration = time.perf_counter() - start
+            self.processed += 1
+            if result is not None:
+                self.faces_ready.emit(*result)
+
+    def encode(self, frame):
+        """(frame, track_ids, locations, encodings), or None if none were embedded."""
+        action = self.scheduler.next_action(frame)
+        if action == SKIP:
+            return None
+        if self.mirror:
+            frame = cv2.flip(frame, 1)
+        if self.detector is not None:
+            detections = self.detector.detect_faces(frame, classes=("face",))
+            self.scheduler.observe_faces(len(detections))
+            self.tracker.update(detections)
+            if action != IDENTIFY:
+                return None  # presence: the tracker follows faces, no embeddings
+            due = self.tracker.due_for_embedding()
+            if not due:
+                return None
+            boxes = np.array([t.detection for t in due], dtype=DETECTION_DTYPE)
+            locations = detections_to_locations(boxes, frame.shape)
+            # Poor crops and crops without an encoding are retried by the
+            # tracker a few frames later
+            checks = [self.quality.assess(frame, loc) for loc in locations]
+            keep = [i for i, check in enumerate(checks) if check.ok]
+            if not keep:
+                self.rejected += len(due)
+                return None
+            self.rejected += len(due) - len(keep)
+            due = [due[i] for i in keep]
+            locations = [locations[i] for i in keep]
+            encodings = self.embedder.encode_faces(
+                frame, locations, [checks[i].landmarks for i in keep]
+            )
+            found = [i for i, enc in enumerate(encodings) if enc is not None]
+            if not found:
+                return None
+            return (
+                frame,
+                [due[i].track_id for i in found],
+                [locations[i] for i in found],
+                [encodings[i] for i in found],
+            )
+
+        small = cv2.resize(frame, (0, 0), fx=self.scale, fy=self.scale)
+        small_locations, encodings = self.embedder.encode_frame(small)
+        self.scheduler.observe_faces(len(small_locations))
+        locations = [
+            tuple(int(v / self.scale) for v in location) for location in small_locations
+        ]
+        return frame, None, locations, encodings
+
+    def identify(self, track_id, user_id, distance=None):
+        if track_id is not None:
+            self.tracker.identify(track_id, user_id, distance)
+
+    def reset_tracks(self):
+        """Re-embed every face in view on the next frames."""
+        self.tracker.reset()
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify()
+        self.wait()
@@ -0,0 +1,111 @@
+# /home/taran/self_discovery/gui/video_widget.py
+# Camera view painted straight from the BGR frame: a QImage wrapping the
+# frame's own memory, and the mirror flip + fit-to-widget scaling done by the
+# painter in the same draw, instead of flip, colour conversion, QPixmap
+# upload and a separate smooth rescale on every tick.
+
+import cv2
+import numpy as np
+from PyQt5.QtCore import QRect, QRectF, QSize, Qt
+from PyQt5.QtGui import QImage, QPainter, QTransform
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+# Qt >= 5.14 reads BGR directly; older builds get one cvtColor into a buffer
+BGR888 = getattr(QImage, "Format_BGR888", None)
+
+
+class VideoWidget(QWidget):
+    """
+    set_frame(frame) wraps a BGR uint8 frame in a QImage without copying it
+    (the widget keeps a reference until the next frame, which must not be
+    written to meanwhile; FrameBridge hands over a private copy) and
+    schedules a repaint. Without Format_BGR888 the frame is converted into
+    one persistent RGB buffer instead. paintEvent draws the QImage through a
+    cached transform (mirror + letterboxed fit), recomputed only when the
+    widget or the frame size changes. Fast (nearest) sampling is used unless
+    `smooth` is set.
+    """
+
+    def __init__(self, parent=None, mirror=True, smooth=False):
+        super().__init__(parent)
+        self.mirror = mirror
+        self.smooth = smooth
+        self.frames = 0
+        self._pixels = None  # array the QImage wraps, kept alive with it
+        self._image = None
+        self._transform = None
+        self._bars = []
+        # Every pixel is painted each time: skip Qt's background erase
+        self.setAttribute(Qt.WA_OpaquePaintEvent)
+        self.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.setMinimumSize(320, 200)
+
+    def sizeHint(self):
+        return QSize(800, 500)
+
+    def set_frame(self, frame_bgr):
+        height, width = frame_bgr.shape[:2]
+        resized = self._pixels is None or self._pixels.shape != frame_bgr.shape
+        if resized:
+            self._transform = None
+        if BGR888 is not None:
+            self._pixels = np.ascontiguousarray(frame_bgr)
+            self._image = QImage(self._pixels.data, width, height, 3 * width, BGR888)
+        else:
+            if resized:
+                self._pixels = np.empty((height, width, 3), dtype=np.uint8)
+                self._image = QImage(
+                    self._pixels.data, width, height, 3 * width, QImage.Format_RGB888
+                )
+            cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB, dst=self._pixels)
+        self.frames += 1
+        self.update()
+
+    def resizeEvent(self, event):
+        self._transform = None
+        super().resizeEvent(event)
+
+    def _fit(self):
+        """Transform mapping image pixels onto the letterboxed target rect."""
+        img_w, img_h = self._image.width(), self._image.height()
+        scale = min(self.width() / img_w, self.height() / img_h)
+        target_w, target_h = img_w * scale, img_h * scale
+        left = (self.width() - target_w) / 2.0
+        top = (self.height() - target_h) / 2.0
+
+        transform = QTransform()
+        transform.translate(left, top)
+        if self.mirror:
+            transform.translate(target_w, 0)
+            transform.scale(-scale, scale)
+        else:
+            transform.scale(scale, scale)
+
+        target = QRectF(left, top, target_w, target_h).toAlignedRect()
+        full = self.rect()
+        self._bars = [
+            bar
+            for bar in (
+                QRect(0, 0, full.width(), target.top()),
+                QRect(0, target.bottom() + 1, full.width(), full.height()),
+                QRect(0, target.top(), target.left(), target.height()),
+                QRect(target.right() + 1, target.top(), full.width(), target.height()),
+            )
+            if bar.isValid() and not bar.isEmpty()
+        ]
+        return transform
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        if self._image is None:
+            painter.fillRect(self.rect(), Qt.black)
+            painter.end()
+            return
+        if self._transform is None:
+            self._transform = self._fit()
+        for bar in self._bars:
+            painter.fillRect(bar, Qt.black)
+        painter.setRenderHint(QPainter.SmoothPixmapTransform, self.smooth)
+        painter.setTransform(self._transform)
+        painter.drawImage(0, 0, self._image)
+        painter.end()
@@ -0,0 +1,161 @@
+# /home/taran/self_discovery/src/camera/activity_scheduler.py
+# Decides per camera frame how much work the mirror does: nothing but a
+# cheap motion check while the room is empty, face detection once something
+# moves, and detection + embedding while faces are in view.
+
+import time
+
+import cv2
+import numpy as np
+
+IDLE = "idle"
+PRESENCE = "presence"
+IDENTIFY = "identify"
+
+# Actions returned by RecognitionScheduler.next_action()
+SKIP = "skip"
+DETECT = "detect"
+
+DEFAULT_RATES = {IDLE: 2.0, PRESENCE: 4.0, IDENTIFY: 10.0}  # Hz
+
+
+class MotionDetector:
+    """
+    Frame differencing on a tiny blurred grayscale copy of the frame against
+    a running-average background. update() returns the fraction of pixels
+    that changed by more than `threshold` grey levels; it costs well under a
+    millisecond whatever the camera resolution.
+    """
+
+    def __init__(self, size=(80, 60), threshold=15, alpha=0.1):
+        self.size = size
+        self.threshold = threshold
+        self.alpha = alpha
+        self._background = None
+        self._small = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._diff = np.empty((size[1], size[0]), dtype=np.uint8)
+
+    def update(self, frame_bgr):
+        gray = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2GRAY)
+        cv2.resize(gray, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.GaussianBlur(self._small, (5, 5), 0, dst=self._small)
+        if self._background is None:
+            self._background = self._small.astype(np.float32)
+            return 0.0
+        cv2.absdiff(self._small, self._background.astype(np.uint8), dst=self._diff)
+        cv2.accumulateWeighted(self._small, self._background, self.alpha)
+        return float(np.count_nonzero(self._diff > self.threshold)) / self._diff.size
+
+    def reset(self):
+        self._background = None
+
+
+class RecognitionScheduler:
+    """
+    Three states with their own rate (calls per second, see DEFAULT_RATES):
+
+      idle      only the motion detector runs, at rates[IDLE]
+      presence  face detection runs at rates[PRESENCE]
+      identify  detection + embedding run at rates[IDENTIFY]
+
+    Call next_action(frame) for every camera frame: it returns SKIP, DETECT
+    or IDENTIFY. After a DETECT or IDENTIFY, report the number of faces
+    found with observe_faces().
+
+    Hysteresis keeps the state from flapping: idle -> presence needs
+    `motion_samples` consecutive samples with more than `min_motion` of the
+    frame changing; presence -> identify needs `face_samples` consecutive
+    detections with a face; identify falls back to presence only after
+    `lost_after` seconds without a face, and presence to idle after
+    `idle_after` seconds without motion or faces.
+    """
+
+    def __init__(
+        self,
+        rates=None,
+        motion=None,
+        min_motion=0.01,
+        motion_samples=2,
+        face_samples=1,
+        lost_after=3.0,
+        idle_after=10.0,
+        clock=time.monotonic,
+    ):
+        self.rates = dict(DEFAULT_RATES, **(rates or {}))
+        self.motion = motion or MotionDetector()
+        self.min_motion = min_motion
+        self.motion_samples = motion_samples
+        self.face_samples = face_samples
+        self.lost_after = lost_after
+        self.idle_after = idle_after
+        self.clock = clock
+
+        now = clock()
+        self.state = IDLE
+        self.transitions = 0
+        self._entered = now
+        self._time_in = {IDLE: 0.0, PRESENCE: 0.0, IDENTIFY: 0.0}
+        self._next_run = now
+        self._motion_run = 0
+        self._face_run = 0
+        self._last_motion = now
+        self._last_face = now
+
+    def _enter(self, state, now):
+        if state == self.state:
+            return
+        self._time_in[self.state] += now - self._entered
+        print(f"🔁 Recognition scheduler: {self.state} -> {state}")
+        self.state = state
+        self.transitions += 1
+        self._entered = now
+        self._motion_run = self._face_run = 0
+        self._next_run = now  # act on the next frame at the new rate
+
+    def next_action(self, frame_bgr, now=None):
+        now = self.clock() if now is None else now
+        if now < self._next_run:
+            return SKIP
+        self._next_run = now + 1.0 / self.rates[self.state]
+
+        moving = self.motion.update(frame_bgr) > self.min_motion
+        if moving:
+            self._last_motion = now
+        if self.state == IDLE:
+            self._motion_run = self._motion_run + 1 if moving else 0
+            if self._motion_run < self.motion_samples:
+                return SKIP
+            self._enter(PRESENCE, now)
+            self._next_run = now + 1.0 / self.rates[PRESENCE]
+        return IDENTIFY if self.state == IDENTIFY else DETECT
+
+    def observe_faces(self, count, now=None):
+        now = self.clock() if now is None else now
+        if count:
+            self._last_face = now
+            self._face_run += 1
+            if self.state == PRESENCE and self._face_run >= self.face_samples:
+                self._enter(IDENTIFY, now)
+            return
+        self._face_run = 0
+        if self.state == IDENTIFY and now - self._last_face > self.lost_after:
+            self._enter(PRESENCE, now)
+        elif (
+            self.state == PRESENCE
+            and now - max(self._last_motion, self._last_face) > self.idle_after
+        ):
+            self._enter(IDLE, now)
+
+    def time_in_states(self, now=None):
+        """Seconds spent in each state so far."""
+        now = self.clock() if now is None else now
+        spent = dict(self._time_in)
+        spent[self.state] += now - self._entered
+        return spent
+
+    def reset(self):
+        """Back to idle, e.g. after the camera was moved."""
+        now = self.clock()
+        self._enter(IDLE, now)
+        self.motion.reset()
+        self._last_motion = self._last_face = now
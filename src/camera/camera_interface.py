@@ -1,29 +1,163 @@
 # /home/taran/self_discovery/src/camera/camera_interface.py
-from picamera2 import Picamera2
+import threading
+import time
 import cv2
 import numpy as np
-import time
+
+try:
+    from .frame_sources import PicameraSource
+except ImportError:  # run as a script / camera dir on sys.path
+    from frame_sources import PicameraSource
+
+
+class FrameGrabber:
+    """
+    Background thread that keeps reading `source` into a ring of reusable
+    buffers. latest() hands out the newest frame as a read-only view together
+    with its sequence number and capture timestamp; a view stays valid until
+    `buffer_count - 1` newer frames have been captured. latest_copy() returns
+    a private copy for frames kept longer than that.
+
+    Listeners registered with add_listener(callback) are called on the
+    grabber thread as callback(frame, seq, timestamp) for every new frame,
+    so consumers can react to frames instead of polling. Keep them short:
+    capture waits for them.
+    """
+
+    def __init__(self, source, buffer_count=3):
+        if buffer_count < 2:
+            raise ValueError("buffer_count must be >= 2")
+        self.source = source
+        self.buffer_count = buffer_count
+        self._buffers = [None] * buffer_count
+        self._views = [None] * buffer_count
+        self._latest = (None, 0, 0.0)
+        self._cond = threading.Condition()
+        self._running = True
+        self._listeners = []
+        self.error = None
+        self._thread = threading.Thread(
+            target=self._run, name="frame-grabber", daemon=True
+        )
+        self._thread.start()
+
+    def _run(self):
+        seq = 0
+        while self._running:
+            index = seq % self.buffer_count
+            try:
+                frame = self.source.read(self._buffers[index])
+            except Exception as e:
+                self.error = e
+                frame = None
+            if frame is None:
+                with self._cond:
+                    self._running = False
+                    self._cond.notify_all()
+                return
+
+            if frame is not self._buffers[index]:
+                # First frame of this size: adopt it as the ring slot
+                self._buffers[index] = frame
+                view = frame.view()
+                view.flags.writeable = False
+                self._views[index] = view
+
+            seq += 1
+            latest = (self._views[index], seq, time.time())
+            with self._cond:
+                self._latest = latest
+                self._cond.notify_all()
+            self._notify(*latest)
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, frame, seq, timestamp):
+        for callback in list(self._listeners):
+            try:
+                callback(frame, seq, timestamp)
+            except Exception as e:
+                print(f"⚠️ Frame listener failed: {e}")
+
+    @property
+    def running(self):
+        return self._running
+
+    def latest(self):
+        """Return (frame, seq, timestamp) of the newest frame; frame may be None."""
+        with self._cond:
+            return self._latest
+
+    def latest_copy(self):
+        """
+        Like latest(), but with a private copy of the frame. The copy is
+        retaken if the grabber may have started refilling the slot while it
+        was being made, so it never mixes two captures.
+        """
+        while True:
+            frame, seq, timestamp = self.latest()
+            if frame is None:
+                return frame, seq, timestamp
+            copy = frame.copy()
+            if self.latest()[1] - seq < self.buffer_count - 1:
+                return copy, seq, timestamp
+
+    def wait_for_frame(self, after_seq=0, timeout=None):
+        """Block until a frame newer than `after_seq` exists (or timeout)."""
+        with self._cond:
+            self._cond.wait_for(
+                lambda: self._latest[1] > after_seq or not self._running, timeout
+            )
+            return self._latest
+
+    def stop(self):
+        self._running = False
+        self._thread.join(timeout=2)
 
 
 class CameraInterface:
-    def __init__(self, resolution=(640, 480)):
-        self.picam = Picamera2()
+    """
+    Camera front-end. `source` defaults to the Pi camera; pass an OpenCVSource
+    or ReplaySource to run without it. With threaded=True frames are grabbed
+    continuously in the background and get_frame() never waits on capture.
+    """
+
+    def __init__(self, resolution=(640, 480), source=None, threaded=False):
         self.resolution = resolution
-        self.picam.preview_configuration.main.size = resolution
-        self.picam.preview_configuration.main.format = "RGB888"
-        self.picam.configure("preview")
-        self.picam.start()
-        time.sleep(1)  # Let camera warm up
+        self.source = source if source is not None else PicameraSource(resolution)
+        self.grabber = FrameGrabber(self.source) if threaded else None
+
+    def latest(self):
+        """(frame, seq, timestamp) of the newest grabbed frame (threaded mode)."""
+        if self.grabber is None:
+            frame = self.source.read()
+            return frame, 0, time.time()
+        return self.grabber.latest()
 
     def get_frame(self, rgb=False):
-        frame = self.picam.capture_array()
-        if rgb:
+        if self.grabber is not None:
+            if not self.grabber.running:
+                return None  # source ended or failed
+            frame, seq, _ = self.grabber.latest_copy()
+            if frame is None:
+                self.grabber.wait_for_frame(timeout=1.0)
+                frame, seq, _ = self.grabber.latest_copy()
+        else:
+            frame = self.source.read()
+        if frame is not None and rgb:
             frame = cv2.cvtColor(frame, cv2.COLOR_RGB2BGR)
 
         return frame  # default is BGR
 
     def stop(self):
-        self.picam.close()
+        if self.grabber is not None:
+            self.grabber.stop()
+        self.source.close()
 
 
 # Test mode
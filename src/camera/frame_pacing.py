@@ -0,0 +1,60 @@
+# /home/taran/self_discovery/src/camera/frame_pacing.py
+# Bookkeeping for frames shown on screen: which captured frames never made
+# it, which were shown twice, and which arrived too late to look live.
+
+import time
+
+
+class FramePacingStats:
+    """
+    record(seq, timestamp) once per displayed frame, with the grabber's
+    sequence number and capture time (time.time()):
+
+      dropped    captured frames that were never displayed (seq gaps)
+      duplicate  a displayed frame shown again
+      late       displayed more than `late_after` seconds after capture
+    """
+
+    def __init__(self, late_after=0.1, clock=time.time):
+        self.late_after = late_after
+        self.clock = clock
+        self.reset()
+
+    def reset(self):
+        self.displayed = 0
+        self.dropped = 0
+        self.duplicate = 0
+        self.late = 0
+        self.latency_total = 0.0
+        self.max_latency = 0.0
+        self._last_seq = None
+        self._started = self.clock()
+
+    def record(self, seq, timestamp, now=None):
+        now = self.clock() if now is None else now
+        if self._last_seq is not None:
+            if seq == self._last_seq:
+                self.duplicate += 1
+                return
+            self.dropped += max(0, seq - self._last_seq - 1)
+        self._last_seq = seq
+        self.displayed += 1
+
+        latency = now - timestamp
+        self.latency_total += latency
+        self.max_latency = max(self.max_latency, latency)
+        if latency > self.late_after:
+            self.late += 1
+
+    def summary(self, now=None):
+        now = self.clock() if now is None else now
+        elapsed = max(now - self._started, 1e-9)
+        return {
+            "fps": self.displayed / elapsed,
+            "displayed": self.displayed,
+            "dropped": self.dropped,
+            "duplicate": self.duplicate,
+            "late": self.late,
+            "mean_latency_ms": 1000.0 * self.latency_total / max(self.displayed, 1),
+            "max_latency_ms": 1000.0 * self.max_latency,
+        }
@@ -0,0 +1,150 @@
+# /home/taran/self_discovery/src/camera/frame_sources.py
+# Frame sources for CameraInterface. Every source returns BGR uint8 frames
+# from read(out=None), writing into `out` when it is given and matches.
+
+import os
+import time
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+
+
+def _into(frame, out):
+    if out is not None and out.shape == frame.shape and out.dtype == frame.dtype:
+        np.copyto(out, frame)
+        return out
+    return frame
+
+
+class PicameraSource:
+    """Raspberry Pi camera via Picamera2 (RGB888 comes out in BGR order)."""
+
+    def __init__(self, resolution=(640, 480), warmup=1.0):
+        from picamera2 import Picamera2
+
+        self.picam = Picamera2()
+        self.resolution = resolution
+        self.picam.preview_configuration.main.size = resolution
+        self.picam.preview_configuration.main.format = "RGB888"
+        self.picam.configure("preview")
+        self.picam.start()
+        time.sleep(warmup)  # Let camera warm up
+
+    def read(self, out=None):
+        return _into(self.picam.capture_array(), out)
+
+    def close(self):
+        self.picam.close()
+
+
+class OpenCVSource:
+    """USB/V4L2 camera or any URL cv2.VideoCapture understands."""
+
+    def __init__(self, device=0, resolution=(640, 480)):
+        self.capture = cv2.VideoCapture(device)
+        if not self.capture.isOpened():
+            raise RuntimeError(f"Could not open video device {device!r}")
+        self.resolution = resolution
+        if resolution:
+            self.capture.set(cv2.CAP_PROP_FRAME_WIDTH, resolution[0])
+            self.capture.set(cv2.CAP_PROP_FRAME_HEIGHT, resolution[1])
+
+    def read(self, out=None):
+        if out is not None:
+            ok, frame = self.capture.read(out)
+        else:
+            ok, frame = self.capture.read()
+        return frame if ok else None
+
+    def close(self):
+        self.capture.release()
+
+
+class ReplaySource:
+    """
+    Replays a recorded video file or a directory of images (sorted by name).
+    With loop=True playback restarts at the end instead of returning None.
+    Images that cannot be decoded are skipped.
+    `fps` paces read() to a fixed rate like a live camera; None replays as
+    fast as frames can be decoded, "native" uses the video's own frame rate.
+    """
+
+    def __init__(self, path, loop=True, resolution=None, fps=None):
+        self.path = path
+        self.loop = loop
+        self.resolution = resolution
+        self.capture = None
+        self.images = None
+        self._index = 0
+        self._next_due = None
+        self._unreadable = set()
+
+        if os.path.isdir(path):
+            self.images = sorted(
+                os.path.join(path, f)
+                for f in os.listdir(path)
+                if f.lower().endswith(IMAGE_EXTENSIONS)
+            )
+            if not self.images:
+                raise RuntimeError(f"No images found in {path}")
+        else:
+            self.capture = cv2.VideoCapture(path)
+            if not self.capture.isOpened():
+                raise RuntimeError(f"Could not open video {path}")
+
+        if fps == "native":
+            fps = self.capture.get(cv2.CAP_PROP_FPS) if self.capture else None
+        self.fps = fps or None
+
+    def _read_raw(self, out):
+        if self.images is not None:
+            while self._index < len(self.images):
+                image_path = self.images[self._index]
+                self._index += 1
+                frame = cv2.imread(image_path)
+                if frame is not None:
+                    return frame
+                if image_path not in self._unreadable:
+                    self._unreadable.add(image_path)
+                    print(f"⚠️ Skipping unreadable image {image_path}")
+            return None
+
+        if out is not None:
+            ok, frame = self.capture.read(out)
+        else:
+            ok, frame = self.capture.read()
+        return frame if ok else None
+
+    def rewind(self):
+        self._index = 0
+        if self.capture is not None:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+
+    def _pace(self):
+        if self.fps is None:
+            return
+        now = time.perf_counter()
+        if self._next_due is not None and now < self._next_due:
+            time.sleep(self._next_due - now)
+            now = self._next_due
+        # A late frame restarts the schedule rather than bursting to catch up
+        self._next_due = now + 1.0 / self.fps
+
+    def read(self, out=None):
+        self._pace()
+        frame = self._read_raw(out)
+        if frame is None and self.loop:
+            self.rewind()
+            frame = self._read_raw(out)
+        if frame is None:
+            return None
+        if self.resolution and (frame.shape[1], frame.shape[0]) != tuple(
+            self.resolution
+        ):
+            frame = cv2.resize(frame, tuple(self.resolution))
+        return _into(frame, out)
+
+    def close(self):
+        if self.capture is not None:
+            self.capture.release()
@@ -0,0 +1,169 @@
+# /home/taran/self_discovery/src/face_detection/detection_pipeline.py
+# Three-stage threaded pipeline around HailoFaceDetector:
+#   preprocess(frame N+1)  |  infer(frame N)  |  postprocess(frame N-1)
+
+import queue
+import threading
+from collections import deque
+from concurrent.futures import Future
+
+_STOP = object()
+
+
+class _Job:
+    __slots__ = ("frame", "future", "callback", "inputs", "outputs")
+
+    def __init__(self, frame, future, callback):
+        self.frame = frame
+        self.future = future
+        self.callback = callback
+        self.inputs = None
+        self.outputs = None
+
+
+class DetectionPipeline:
+    """
+    Overlaps the CPU pre/post stages with accelerator inference.
+
+    submit() never blocks: at most `queue_depth` frames wait for
+    preprocessing and, when a new frame arrives on a full queue, the oldest
+    waiting frame is dropped (its future is cancelled). Between the stages
+    the hand-off queues hold a single job, so a slow stage pushes back on
+    the input queue rather than building up latency.
+    """
+
+    def __init__(self, detector, queue_depth=2, threshold=0.4, classes=None):
+        if queue_depth < 1:
+            raise ValueError("queue_depth must be >= 1")
+
+        self.detector = detector
+        self.queue_depth = queue_depth
+        self.threshold = threshold
+        self.classes = classes
+
+        self.submitted = 0
+        self.completed = 0
+        self.dropped = 0
+
+        self._pending = deque()
+        self._pending_cond = threading.Condition()
+        self._to_infer = queue.Queue(maxsize=1)
+        self._to_post = queue.Queue(maxsize=1)
+        self._running = True
+
+        self._threads = [
+            threading.Thread(target=self._preprocess_loop, name="detect-pre"),
+            threading.Thread(target=self._infer_loop, name="detect-infer"),
+            threading.Thread(target=self._postprocess_loop, name="detect-post"),
+        ]
+        for t in self._threads:
+            t.daemon = True
+            t.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+    @property
+    def in_flight(self):
+        return self.submitted - self.completed - self.dropped
+
+    def submit(self, frame, callback=None):
+        """
+        Queue a frame for detection. Returns a concurrent.futures.Future that
+        resolves to the detections; `callback(detections)` is also invoked
+        from the postprocess thread if given.
+        """
+        if not self._running:
+            raise RuntimeError("Detection pipeline is stopped")
+
+        future = Future()
+        job = _Job(frame, future, callback)
+        with self._pending_cond:
+            if len(self._pending) >= self.queue_depth:
+                oldest = self._pending.popleft()
+                oldest.future.cancel()
+                self.dropped += 1
+            self._pending.append(job)
+            self.submitted += 1
+            self._pending_cond.notify()
+        return future
+
+    def stop(self):
+        if not self._running:
+            return
+        self._running = False
+        with self._pending_cond:
+            while self._pending:
+                self._pending.popleft().future.cancel()
+                self.dropped += 1
+            self._pending_cond.notify_all()
+        for t in self._threads:
+            t.join()
+
+    # === Stage loops ===
+    def _next_pending(self):
+        with self._pending_cond:
+            while self._running and not self._pending:
+                self._pending_cond.wait()
+            if not self._pending:
+                return _STOP
+            return self._pending.popleft()
+
+    def _preprocess_loop(self):
+        while True:
+            job = self._next_pending()
+            if job is _STOP:
+                self._to_infer.put(_STOP)
+                return
+            if not job.future.set_running_or_notify_cancel():
+                with self._pending_cond:
+                    self.dropped += 1  # cancelled by the caller while waiting
+                continue
+            try:
+                job.inputs = self.detector.preprocess(job.frame)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            self._to_infer.put(job)
+
+    def _infer_loop(self):
+        while True:
+            job = self._to_infer.get()
+            if job is _STOP:
+                self._to_post.put(_STOP)
+                return
+            try:
+                job.outputs = self.detector.infer(job.inputs.input_dict)
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            self._to_post.put(job)
+
+    def _postprocess_loop(self):
+        while True:
+            job = self._to_post.get()
+            if job is _STOP:
+                return
+            try:
+                detections = self.detector.postprocess(
+                    job.outputs, self.threshold, self.classes, job.inputs
+                )
+            except Exception as e:
+                self._fail(job, e)
+                continue
+            with self._pending_cond:
+                self.completed += 1
+            job.future.set_result(detections)
+            if job.callback is not None:
+                try:
+                    job.callback(detections)
+                except Exception as e:
+                    print(f"[WARN] Detection callback failed: {e}")
+
+    def _fail(self, job, error):
+        with self._pending_cond:
+            self.completed += 1
+        job.future.set_exception(error)
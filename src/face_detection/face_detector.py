@@ -1,100 +1,438 @@
 # /home/taran/self_discovery/src/face_detection/face_detector.py
-import hailo_platform as hailort
+import asyncio
+import json
+import os
+import time
 import cv2
 import numpy as np
 
+from .hailo_runtime import HailoBackend
+from .detection_pipeline import DetectionPipeline
+
+DEFAULT_CONFIG_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "../../models/hailo/yolov5_personface.json")
+)
+
+
+# One row per detected box, in pixels of the model input
+DETECTION_DTYPE = np.dtype(
+    [
+        ("x", np.int32),
+        ("y", np.int32),
+        ("w", np.int32),
+        ("h", np.int32),
+        ("score", np.float32),
+        ("class_id", np.int32),
+    ]
+)
+
+
+def iou_matrix(boxes_a, boxes_b):
+    """Pairwise IoU between two DETECTION_DTYPE arrays, shape (len(a), len(b))."""
+    ax1 = boxes_a["x"].astype(np.float32)[:, None]
+    ay1 = boxes_a["y"].astype(np.float32)[:, None]
+    ax2 = ax1 + boxes_a["w"][:, None]
+    ay2 = ay1 + boxes_a["h"][:, None]
+    bx1 = boxes_b["x"].astype(np.float32)[None, :]
+    by1 = boxes_b["y"].astype(np.float32)[None, :]
+    bx2 = bx1 + boxes_b["w"][None, :]
+    by2 = by1 + boxes_b["h"][None, :]
+
+    inter_w = np.clip(np.minimum(ax2, bx2) - np.maximum(ax1, bx1), 0, None)
+    inter_h = np.clip(np.minimum(ay2, by2) - np.maximum(ay1, by1), 0, None)
+    inter = inter_w * inter_h
+    union = (ax2 - ax1) * (ay2 - ay1) + (bx2 - bx1) * (by2 - by1) - inter
+    return np.divide(inter, union, out=np.zeros_like(inter), where=union > 0)
+
+
+# Up to this many boxes plain Python beats the fixed cost of array operations
+NMS_SMALL = 24
+# Above this many boxes the n x n IoU matrix gets too big; suppress row by row
+NMS_MATRIX_LIMIT = 384
+
+
+def non_max_suppression(detections, iou_threshold=0.4, per_class=True):
+    """
+    Greedy NMS on a DETECTION_DTYPE array, best score first. The pairwise
+    overlaps are computed once as a boolean matrix and the greedy pass only
+    walks its rows. A frame's usual handful of boxes (up to NMS_SMALL) is
+    compared pair by pair in plain Python, which is cheaper than building
+    the matrix; beyond NMS_MATRIX_LIMIT boxes each kept box computes its
+    own IoU row against the survivors instead.
+    With per_class=True boxes only suppress boxes of the same class_id.
+    """
+    n = len(detections)
+    if n <= 1:
+        return detections
+    if n <= NMS_SMALL:
+        return detections.take(_suppress_small(detections, iou_threshold, per_class))
+
+    order = np.argsort(-detections["score"], kind="stable")
+    detections = detections[order]
+    if n > NMS_MATRIX_LIMIT:
+        return detections[_suppress_by_rows(detections, iou_threshold, per_class)]
+
+    overlaps = iou_matrix(detections, detections) >= iou_threshold
+    if per_class:
+        class_ids = detections["class_id"]
+        overlaps &= class_ids[:, None] == class_ids[None, :]
+    # Only boxes ranked below i can be suppressed by it
+    overlaps = np.triu(overlaps, k=1)
+    if not overlaps.any():
+        return detections
+
+    keep = np.ones(n, dtype=bool)
+    for i in np.flatnonzero(overlaps.any(axis=1)):
+        if keep[i]:
+            keep &= ~overlaps[i]
+    return detections[keep]
+
+
+def _suppress_small(detections, iou_threshold, per_class):
+    """Indices of the boxes kept by greedy NMS over a few `detections`, best first."""
+    boxes = detections.tolist()
+    # reverse=True keeps equal scores in input order, like a stable argsort
+    order = sorted(range(len(boxes)), key=lambda i: boxes[i][4], reverse=True)
+    keep = []
+    kept_boxes = []  # (x1, y1, x2, y2, area, class_id) of each kept box
+    for i in order:
+        x1, y1, w, h, _, class_id = boxes[i]
+        x2, y2, area = x1 + w, y1 + h, w * h
+        for kx1, ky1, kx2, ky2, kept_area, kept_class in kept_boxes:
+            if per_class and kept_class != class_id:
+                continue
+            inter_w = min(x2, kx2) - max(x1, kx1)
+            inter_h = min(y2, ky2) - max(y1, ky1)
+            if inter_w <= 0 or inter_h <= 0:
+                continue
+            inter = inter_w * inter_h
+            if inter >= iou_threshold * (area + kept_area - inter):
+                break
+        else:
+            keep.append(i)
+            kept_boxes.append((x1, y1, x2, y2, area, class_id))
+    return keep
+
+
+def _suppress_by_rows(detections, iou_threshold, per_class):
+    """Indices kept by greedy NMS over score-sorted `detections`."""
+    keep = []
+    remaining = np.arange(len(detections))
+    while remaining.size:
+        current = remaining[0]
+        keep.append(current)
+        rest = remaining[1:]
+        if not rest.size:
+            break
+        ious = iou_matrix(detections[current : current + 1], detections[rest])[0]
+        suppressed = ious >= iou_threshold
+        if per_class:
+            suppressed &= (
+                detections["class_id"][rest] == detections["class_id"][current]
+            )
+        remaining = rest[~suppressed]
+    return keep
+
+
+def detections_to_locations(detections, frame_shape=None):
+    """
+    DETECTION_DTYPE boxes as face_recognition (top, right, bottom, left)
+    tuples (one per box, same order), clipped to the frame when its shape is
+    given, ready to pass as face_encodings(..., known_face_locations=...).
+    """
+    left = detections["x"].astype(np.int64)
+    top = detections["y"].astype(np.int64)
+    right = left + detections["w"]
+    bottom = top + detections["h"]
+    if frame_shape is not None:
+        height, width = frame_shape[:2]
+        left, right = np.clip(left, 0, width), np.clip(right, 0, width)
+        top, bottom = np.clip(top, 0, height), np.clip(bottom, 0, height)
+    return [
+        (int(t), int(r), int(b), int(l)) for t, r, b, l in zip(top, right, bottom, left)
+    ]
+
+
+def _gather_outputs(output_dict):
+    """
+    Flatten the nested {name: [[class0, class1, ...], ...]} NMS output into
+    one (n, 5) float array plus the per-row index of the class group.
+    """
+    arrays = []
+    class_ids = []
+    for name, output_list in output_dict.items():
+        for item in output_list:
+            nested_items = item if isinstance(item, list) else [item]
+            for class_id, subitem in enumerate(nested_items):
+                if not isinstance(subitem, np.ndarray):
+                    print(f"[WARN] Skipped subitem of type {type(subitem)}")
+                    continue
+                if subitem.size == 0 or subitem.shape[-1] < 5:
+                    continue
+                rows = subitem.reshape(-1, subitem.shape[-1])[:, :5]
+                arrays.append(rows)
+                class_ids.append(np.full(len(rows), class_id, dtype=np.int32))
+
+    if not arrays:
+        return None, None
+    return (
+        np.concatenate(arrays).astype(np.float32, copy=False),
+        np.concatenate(class_ids),
+    )
+
+
+class InputBuffer:
+    """
+    Preallocated model input for one frame in flight. The tensor is written in
+    place by preprocess(); the letterbox geometry maps boxes back to the frame.
+    """
+
+    __slots__ = (
+        "tensor",
+        "resized",
+        "roi",
+        "input_dict",
+        "frame_shape",
+        "scale_x",
+        "scale_y",
+        "pad_x",
+        "pad_y",
+    )
+
+    def __init__(self, input_name, input_shape, frame_shape, letterbox):
+        input_h, input_w = input_shape
+        frame_h, frame_w = frame_shape
+        if letterbox:
+            scale = min(input_w / frame_w, input_h / frame_h)
+            new_w, new_h = int(round(frame_w * scale)), int(round(frame_h * scale))
+        else:
+            new_w, new_h = input_w, input_h
+        self.pad_x = (input_w - new_w) // 2
+        self.pad_y = (input_h - new_h) // 2
+        self.scale_x = new_w / frame_w
+        self.scale_y = new_h / frame_h
+        self.frame_shape = frame_shape
+
+        self.tensor = np.full((1, input_h, input_w, 3), 114, dtype=np.uint8)
+        self.resized = np.empty((new_h, new_w, 3), dtype=np.uint8)
+        self.roi = self.tensor[
+            0, self.pad_y : self.pad_y + new_h, self.pad_x : self.pad_x + new_w
+        ]
+        # The vstream takes a flat (1, H*W*3) view of the same memory
+        self.input_dict = {input_name: self.tensor.reshape(1, -1)}
+
 
 class HailoFaceDetector:
-    def __init__(self, hef_path):
+    """
+    YOLOv5 person/face detector running on the Hailo-8L.
+
+    By default every detect_faces() call activates the network group and
+    builds the vstream pipeline for a single frame. Call open() (or use the
+    detector as a context manager) to keep the pipeline up across frames;
+    close() tears it down and the detector can be opened again. release()
+    frees the device itself, after which the detector is unusable.
+    Pass `backend=` to run against a different engine, e.g. FakeBackend.
+
+    Class names come from the model's JSON config ("labels" shifted by
+    "label_offset"), so class_id in the results indexes self.labels.
+
+    Input tensors live in preallocated InputBuffers reused across frames.
+    With letterbox=True the frame keeps its aspect ratio and is padded to the
+    model input; detect_faces() always returns boxes in frame pixels.
+    """
+
+    # Buffers a running DetectionPipeline can hold at once: one per stage plus
+    # one in each single-slot hand-off queue
+    PIPELINE_BUFFERS = 5
+
+    def __init__(
+        self,
+        hef_path=None,
+        backend=None,
+        config_path=DEFAULT_CONFIG_PATH,
+        letterbox=False,
+        buffer_count=1,
+    ):
         self.hef_path = hef_path
-        self.vdevice = hailort.VDevice()
-        self.hef = hailort.HEF(hef_path)
-        self.network_groups = self.vdevice.configure(self.hef)
-        self.network_group = self.network_groups[0]
-        self.network_group_params = self.network_group.create_params()
-
-        self.input_infos = self.network_group.get_input_stream_infos()
-        self.output_infos = self.network_group.get_output_stream_infos()
-        self.input_name = self.input_infos[0].name
-        self.output_name = self.output_infos[0].name
-
-        self.input_params = hailort.InputVStreamParams.make_from_network_group(
-            self.network_group, quantized=False, format_type=hailort.FormatType.UINT8
-        )
-        self.output_params = hailort.OutputVStreamParams.make_from_network_group(
-            self.network_group, quantized=False, format_type=hailort.FormatType.FLOAT32
-        )
-
-        self.input_shape = self.input_infos[0].shape[:2]  # (height, width)
-
-    def detect_faces(self, frame, threshold=0.4):
-        resized = cv2.resize(frame, (self.input_shape[1], self.input_shape[0]))
-        rgb = cv2.cvtColor(resized, cv2.COLOR_BGR2RGB)
-        input_tensor = rgb.astype(np.uint8).flatten()
-        input_tensor = np.expand_dims(input_tensor, axis=0)
-        input_dict = {self.input_name: input_tensor}
-
-        with self.network_group.activate(self.network_group_params):
-            with hailort.InferVStreams(
-                self.network_group, self.input_params, self.output_params
-            ) as streams:
-                output_dict = streams.infer(input_dict)
-
-        return self.postprocess(output_dict)
-
-    def non_max_suppression(self, boxes, iou_threshold=0.4):
-        if len(boxes) == 0:
-            return []
-
-        boxes = sorted(boxes, key=lambda x: x[4], reverse=True)
-        selected_boxes = []
-
-        def iou(box1, box2):
-            x1, y1, w1, h1 = box1[:4]
-            x2, y2, w2, h2 = box2[:4]
-            xa = max(x1, x2)
-            ya = max(y1, y2)
-            xb = min(x1 + w1, x2 + w2)
-            yb = min(y1 + h1, y2 + h2)
-            inter_area = max(0, xb - xa) * max(0, yb - ya)
-            union_area = w1 * h1 + w2 * h2 - inter_area
-            return inter_area / union_area if union_area > 0 else 0
-
-        while boxes:
-            current = boxes.pop(0)
-            selected_boxes.append(current)
-            boxes = [box for box in boxes if iou(current, box) < iou_threshold]
-
-        return selected_boxes
-
-    def postprocess(self, output_dict, threshold=0.4):
-        detections = []
+        self.backend = backend if backend is not None else HailoBackend(hef_path)
+
+        with open(config_path, "r") as f:
+            config = json.load(f)
+        self.labels = config.get("labels", [])
+        self.label_offset = config.get("label_offset", 0)
+        self.max_boxes = config.get("max_boxes")
+
+        self.input_name = self.backend.input_name
+        self.output_name = self.backend.output_name
+        self.input_shape = self.backend.input_shape[:2]  # (height, width)
+        self.last_inference_time = None
+        self._pipeline = None
+
+        self.letterbox = letterbox
+        self.buffer_count = buffer_count
+        self._buffers = []
+        self._next_buffer = 0
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def is_open(self):
+        return self.backend.is_open
+
+    def open(self):
+        """Activate the network group and keep the vstreams open."""
+        self.backend.open()
+        return self
+
+    def class_ids(self, classes):
+        """Map label names (e.g. "face") or ids to class ids; None means all."""
+        if classes is None:
+            return None
+        if isinstance(classes, (str, int)):
+            classes = [classes]
+        ids = []
+        for c in classes:
+            if isinstance(c, str):
+                if c not in self.labels:
+                    raise ValueError(
+                        f"Unknown class '{c}', expected one of {self.labels}"
+                    )
+                c = self.labels.index(c)
+            ids.append(int(c))
+        return np.array(ids, dtype=np.int32)
+
+    def detect_faces(self, frame, threshold=0.4, classes=None):
+        buffer = self.preprocess(frame)
+        output_dict = self.infer(buffer.input_dict)
+        return self.postprocess(output_dict, threshold, classes, buffer)
+
+    def _take_buffer(self, frame_shape):
+        if len(self._buffers) < self.buffer_count:
+            self._buffers.append(None)
+        index = self._next_buffer % len(self._buffers)
+        self._next_buffer = index + 1
+        buffer = self._buffers[index]
+        if buffer is None or buffer.frame_shape != frame_shape:
+            buffer = InputBuffer(
+                self.input_name, self.input_shape, frame_shape, self.letterbox
+            )
+            self._buffers[index] = buffer
+        return buffer
+
+    def preprocess(self, frame):
+        """
+        Resize and BGR->RGB convert `frame` straight into a reusable input
+        buffer. Once the buffers exist for a frame size nothing is allocated.
+        """
+        buffer = self._take_buffer(frame.shape[:2])
+        resized = buffer.resized
+        cv2.resize(frame, (resized.shape[1], resized.shape[0]), dst=resized)
+        cv2.cvtColor(resized, cv2.COLOR_BGR2RGB, dst=buffer.roi)
+        return buffer
+
+    def infer(self, input_dict):
+        start = time.perf_counter()
+        output_dict = self.backend.infer(input_dict)
+        self.last_inference_time = time.perf_counter() - start
+        return output_dict
+
+    # === Pipelined (asynchronous) detection ===
+    def start_pipeline(self, queue_depth=2, threshold=0.4, classes=None):
+        """
+        Open the session and start the three-stage pipeline so that
+        preprocessing, inference and postprocessing of consecutive frames
+        overlap. Frames are then fed with submit() / detect_async().
+        """
+        if self._pipeline is None:
+            self.open()
+            self.buffer_count = max(self.buffer_count, self.PIPELINE_BUFFERS)
+            self._pipeline = DetectionPipeline(
+                self, queue_depth=queue_depth, threshold=threshold, classes=classes
+            )
+        return self._pipeline
+
+    def submit(self, frame, callback=None):
+        if self._pipeline is None:
+            self.start_pipeline()
+        return self._pipeline.submit(frame, callback)
+
+    async def detect_async(self, frame):
+        return await asyncio.wrap_future(self.submit(frame))
+
+    def stop_pipeline(self):
+        if self._pipeline is not None:
+            self._pipeline.stop()
+            self._pipeline = None
+
+    def non_max_suppression(self, detections, iou_threshold=0.4):
+        return non_max_suppression(detections, iou_threshold)
+
+    def postprocess(self, output_dict, threshold=0.4, classes=None, buffer=None):
+        """
+        Decode the NMS output tensors into a DETECTION_DTYPE structured array
+        of (x, y, w, h, score, class_id) boxes. Coordinates are frame pixels
+        when the InputBuffer from preprocess() is given, model input pixels
+        otherwise. `classes` restricts the result to those labels, e.g. ("face",).
+        """
+        rows, class_ids = _gather_outputs(output_dict)
+        if rows is None:
+            return np.zeros(0, dtype=DETECTION_DTYPE)
+
+        class_ids = class_ids + self.label_offset
         input_w, input_h = self.input_shape[1], self.input_shape[0]
+        keep = rows[:, 4] >= threshold
+        wanted = self.class_ids(classes)
+        if wanted is not None:
+            keep &= np.isin(class_ids, wanted)
+        rows = rows[keep]
+        class_ids = class_ids[keep]
+        if self.max_boxes and len(rows) > self.max_boxes:
+            top = np.argsort(-rows[:, 4], kind="stable")[: self.max_boxes]
+            rows = rows[top]
+            class_ids = class_ids[top]
+
+        if buffer is None:
+            scale_x = scale_y = 1.0
+            pad_x = pad_y = 0
+            out_h, out_w = input_h, input_w
+        else:
+            scale_x, scale_y = buffer.scale_x, buffer.scale_y
+            pad_x, pad_y = buffer.pad_x, buffer.pad_y
+            out_h, out_w = buffer.frame_shape
 
-        for name, output_list in output_dict.items():
-            for item in output_list:
-                nested_items = item if isinstance(item, list) else [item]
-                for subitem in nested_items:
-                    if isinstance(subitem, np.ndarray):
-                        rows = subitem.reshape(-1, subitem.shape[-1])
-                        for row in rows:
-                            if len(row) < 5:
-                                continue
-                            x1, y1, x2, y2, score = row[:5]
-                            if score < threshold:
-                                continue
-                            x1 = max(0, int(x1 * input_w))
-                            y1 = max(0, int(y1 * input_h))
-                            x2 = min(input_w - 1, int(x2 * input_w))
-                            y2 = min(input_h - 1, int(y2 * input_h))
-                            w = x2 - x1
-                            h = y2 - y1
-                            if w > 0 and h > 0:
-                                detections.append((x1, y1, w, h, float(score)))
-                    else:
-                        print(f"[WARN] Skipped subitem of type {type(subitem)}")
-
-        return self.non_max_suppression(detections)
+        # All four corners in one pass: model input fraction -> output pixels
+        size = np.array([input_w, input_h, input_w, input_h], dtype=np.float32)
+        pad = np.array([pad_x, pad_y, pad_x, pad_y], dtype=np.float32)
+        scale = np.array([scale_x, scale_y, scale_x, scale_y], dtype=np.float32)
+        corners = ((rows[:, :4] * size - pad) / scale).astype(np.int32)
+        limit = np.array([out_w - 1, out_h - 1, out_w - 1, out_h - 1], dtype=np.int32)
+        np.maximum(corners, 0, out=corners)
+        np.minimum(corners, limit, out=corners)
+        corners[:, 2:] -= corners[:, :2]  # (x, y, w, h)
+        valid = (corners[:, 2] > 0) & (corners[:, 3] > 0)
+
+        detections = np.empty(np.count_nonzero(valid), dtype=DETECTION_DTYPE)
+        boxes = corners[valid]
+        detections["x"] = boxes[:, 0]
+        detections["y"] = boxes[:, 1]
+        detections["w"] = boxes[:, 2]
+        detections["h"] = boxes[:, 3]
+        detections["score"] = rows[valid, 4]
+        detections["class_id"] = class_ids[valid]
+
+        return non_max_suppression(detections)
 
     def close(self):
-        self.vdevice.release()
+        """Stop any pipeline and tear down the vstreams; the device stays."""
+        self.stop_pipeline()
+        self.backend.close()
+
+    def release(self):
+        """close() and free the VDevice; call once, at shutdown."""
+        self.close()
+        self.backend.release()
@@ -0,0 +1,141 @@
+# /home/taran/self_discovery/src/face_detection/face_tracker.py
+# IoU tracker over detector output, so a face is embedded when it appears
+# (and now and then to re-check it) instead of on every Nth frame.
+
+import itertools
+import threading
+
+import numpy as np
+
+from .face_detector import DETECTION_DTYPE, iou_matrix
+
+
+class Track:
+    """One face followed across frames, with the identity found for it."""
+
+    __slots__ = (
+        "track_id",
+        "detection",
+        "first_frame",
+        "last_seen",
+        "hits",
+        "user_id",
+        "distance",
+        "embedded_at",
+    )
+
+    def __init__(self, track_id, detection, frame):
+        self.track_id = track_id
+        self.detection = detection
+        self.first_frame = frame
+        self.last_seen = frame
+        self.hits = 1
+        self.user_id = None
+        self.distance = None
+        self.embedded_at = None  # frame of the last embedding request
+
+    @property
+    def box(self):
+        d = self.detection
+        return int(d["x"]), int(d["y"]), int(d["w"]), int(d["h"])
+
+    def __repr__(self):
+        return f"Track({self.track_id}, {self.box}, user={self.user_id})"
+
+
+class FaceTracker:
+    """
+    Greedy IoU association: each frame's detections are paired with live
+    tracks in order of decreasing overlap (pairs under `iou_threshold` are
+    never joined), unmatched detections start new tracks, and a track not
+    seen for `max_missed` frames is dropped.
+
+    due_for_embedding() returns the visible tracks that need an embedding:
+    new tracks once they have `min_hits` detections, unidentified tracks
+    every `retry_every` frames, identified ones every `reverify_every`
+    frames. Returned tracks are marked as requested right away, so a slow
+    asynchronous embedding is not requested twice. Report results with
+    identify().
+
+    Thread-safe: a worker thread may update() while another thread
+    identify()s.
+    """
+
+    def __init__(
+        self,
+        iou_threshold=0.3,
+        max_missed=5,
+        min_hits=1,
+        retry_every=10,
+        reverify_every=50,
+    ):
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.min_hits = min_hits
+        self.retry_every = retry_every
+        self.reverify_every = reverify_every
+        self.frame = 0
+        self.tracks = {}  # track_id -> Track
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def update(self, detections):
+        """Advance one frame; returns the Track of each detection, in order."""
+        with self._lock:
+            self.frame += 1
+            live = list(self.tracks.values())
+            assigned = [None] * len(detections)
+
+            if live and len(detections):
+                previous = np.array([t.detection for t in live], dtype=DETECTION_DTYPE)
+                ious = iou_matrix(np.asarray(detections), previous)
+                det_idx, trk_idx = np.nonzero(ious >= self.iou_threshold)
+                order = np.argsort(-ious[det_idx, trk_idx], kind="stable")
+                used = set()
+                for d, t in zip(det_idx[order], trk_idx[order]):
+                    if assigned[d] is None and t not in used:
+                        assigned[d] = live[t]
+                        used.add(t)
+
+            for i, track in enumerate(assigned):
+                if track is None:
+                    track = Track(next(self._ids), detections[i].copy(), self.frame)
+                    self.tracks[track.track_id] = track
+                    assigned[i] = track
+                else:
+                    track.detection = detections[i].copy()
+                    track.last_seen = self.frame
+                    track.hits += 1
+
+            for track_id in [
+                t.track_id for t in live if self.frame - t.last_seen > self.max_missed
+            ]:
+                del self.tracks[track_id]
+            return assigned
+
+    def _is_due(self, track):
+        if track.last_seen != self.frame or track.hits < self.min_hits:
+            return False
+        if track.embedded_at is None:
+            return True
+        interval = self.retry_every if track.user_id is None else self.reverify_every
+        return self.frame - track.embedded_at >= interval
+
+    def due_for_embedding(self):
+        with self._lock:
+            due = [t for t in self.tracks.values() if self._is_due(t)]
+            for track in due:
+                track.embedded_at = self.frame
+            return due
+
+    def identify(self, track_id, user_id, distance=None):
+        with self._lock:
+            track = self.tracks.get(track_id)
+            if track is not None:
+                track.user_id = user_id
+                track.distance = distance
+
+    def reset(self):
+        """Forget all tracks, so every face present is embedded again."""
+        with self._lock:
+            self.tracks.clear()
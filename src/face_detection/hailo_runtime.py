@@ -0,0 +1,165 @@
+# /home/taran/self_discovery/src/face_detection/hailo_runtime.py
+# Inference backends for HailoFaceDetector: the real Hailo-8L runtime and a
+# CPU-only fake that mimics its interface for off-device testing.
+
+import time
+import numpy as np
+
+try:
+    import hailo_platform as hailort
+
+    has_hailort = True
+except ImportError:
+    has_hailort = False
+
+
+class HailoBackend:
+    """
+    Owns the VDevice, configured network group and vstream params.
+    Between open() and close() the network group stays activated and the
+    InferVStreams pipeline stays up, so infer() only pushes a frame.
+    """
+
+    def __init__(self, hef_path):
+        if not has_hailort:
+            raise RuntimeError("hailo_platform is not installed")
+
+        self.hef_path = hef_path
+        self.vdevice = hailort.VDevice()
+        self.hef = hailort.HEF(hef_path)
+        self.network_groups = self.vdevice.configure(self.hef)
+        self.network_group = self.network_groups[0]
+        self.network_group_params = self.network_group.create_params()
+
+        self.input_infos = self.network_group.get_input_stream_infos()
+        self.output_infos = self.network_group.get_output_stream_infos()
+        self.input_name = self.input_infos[0].name
+        self.output_name = self.output_infos[0].name
+
+        self.input_params = hailort.InputVStreamParams.make_from_network_group(
+            self.network_group, quantized=False, format_type=hailort.FormatType.UINT8
+        )
+        self.output_params = hailort.OutputVStreamParams.make_from_network_group(
+            self.network_group, quantized=False, format_type=hailort.FormatType.FLOAT32
+        )
+
+        self.input_shape = self.input_infos[0].shape[:2]  # (height, width)
+
+        self._activation = None
+        self._streams = None
+
+    @property
+    def is_open(self):
+        return self._streams is not None
+
+    def open(self):
+        if self.is_open:
+            return
+        self._activation = self.network_group.activate(self.network_group_params)
+        self._activation.__enter__()
+        try:
+            self._streams = hailort.InferVStreams(
+                self.network_group, self.input_params, self.output_params
+            ).__enter__()
+        except Exception:
+            self._activation.__exit__(None, None, None)
+            self._activation = None
+            raise
+
+    def infer(self, input_dict):
+        if self.is_open:
+            return self._streams.infer(input_dict)
+
+        # One-shot path: full pipeline setup and teardown around a single frame
+        with self.network_group.activate(self.network_group_params):
+            with hailort.InferVStreams(
+                self.network_group, self.input_params, self.output_params
+            ) as streams:
+                return streams.infer(input_dict)
+
+    def close(self):
+        if self._streams is not None:
+            self._streams.__exit__(None, None, None)
+            self._streams = None
+        if self._activation is not None:
+            self._activation.__exit__(None, None, None)
+            self._activation = None
+
+    def release(self):
+        self.close()
+        self.vdevice.release()
+
+
+class FakeBackend:
+    """
+    Stand-in for HailoBackend on CPU-only machines.
+
+    Returns outputs in the same layout as the Hailo NMS postprocess:
+    {output_name: [[class0_boxes, class1_boxes, ...]]} with each array shaped
+    (n, 5) as (x1, y1, x2, y2, score) in normalized coordinates.
+    `detections` may be a fixed list of per-class arrays or a callable taking
+    the input tensor and returning one. `latency` (seconds) simulates device
+    time per frame and `setup_latency` the cost of bringing the pipeline up.
+    """
+
+    def __init__(
+        self,
+        input_shape=(640, 640),
+        detections=None,
+        num_classes=2,
+        latency=0.0,
+        setup_latency=0.0,
+    ):
+        self.input_shape = tuple(input_shape)
+        self.input_name = "fake/input_layer1"
+        self.output_name = "fake/yolov5_nms_postprocess"
+        self.num_classes = num_classes
+        self.detections = detections
+        self.latency = latency
+        self.setup_latency = setup_latency
+        self.setup_count = 0
+        self.infer_count = 0
+        self.released = False
+        self._open = False
+
+    @property
+    def is_open(self):
+        return self._open
+
+    def open(self):
+        if self.released:
+            raise RuntimeError("device already released")
+        if self._open:
+            return
+        self._setup()
+        self._open = True
+
+    def _setup(self):
+        self.setup_count += 1
+        if self.setup_latency:
+            time.sleep(self.setup_latency)
+
+    def _outputs(self, input_tensor):
+        detections = self.detections
+        if callable(detections):
+            detections = detections(input_tensor)
+        if detections is None:
+            detections = [
+                np.zeros((0, 5), dtype=np.float32) for _ in range(self.num_classes)
+            ]
+        return {self.output_name: [list(detections)]}
+
+    def infer(self, input_dict):
+        if not self._open:
+            self._setup()
+        if self.latency:
+            time.sleep(self.latency)
+        self.infer_count += 1
+        return self._outputs(input_dict[self.input_name])
+
+    def close(self):
+        self._open = False
+
+    def release(self):
+        self.close()
+        self.released = True  # like VDevice.release(): no reopening
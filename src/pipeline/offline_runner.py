@@ -0,0 +1,216 @@
+# /home/taran/self_discovery/src/pipeline/offline_runner.py
+# Headless detection + recognition over a recorded video or image folder,
+# reporting per-stage timings. Runs without Picamera2, Qt or (with
+# --detector hog/fake) a Hailo device, so it works on any Linux box.
+#
+#   python src/pipeline/offline_runner.py --source recordings/hallway.mp4
+#   python src/pipeline/offline_runner.py --source frames/ --detector hailo --fps 15
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import cv2
+import numpy as np
+from camera.camera_interface import CameraInterface
+from camera.frame_sources import ReplaySource
+from face_detection.face_detector import (
+    DETECTION_DTYPE,
+    HailoFaceDetector,
+    detections_to_locations,
+)
+from face_detection.hailo_runtime import FakeBackend
+from user_management.face_gallery import FaceGallery
+from user_management.profile_store import ProfileStore
+
+try:
+    import face_recognition
+
+    has_face_recognition = True
+except ImportError:
+    has_face_recognition = False
+
+DEFAULT_HEF_PATH = "/usr/share/hailo-models/yolov5s_personface_h8l.hef"
+DEFAULT_PROFILES_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "user_management", "user_profiles.json"
+)
+RECOGNITION_THRESHOLD = 0.6
+
+
+class StageTimer:
+    """Collects wall-clock samples per named stage."""
+
+    def __init__(self):
+        self.samples = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.samples[name].append(time.perf_counter() - start)
+
+    def add(self, name, seconds):
+        self.samples[name].append(seconds)
+
+    def summary(self):
+        report = {}
+        for name, values in self.samples.items():
+            ms = np.array(values) * 1000.0
+            report[name] = {
+                "count": int(ms.size),
+                "mean_ms": float(ms.mean()),
+                "p50_ms": float(np.percentile(ms, 50)),
+                "p95_ms": float(np.percentile(ms, 95)),
+                "max_ms": float(ms.max()),
+                "total_ms": float(ms.sum()),
+            }
+        return report
+
+
+def locations_to_detections(locations):
+    """face_recognition (top, right, bottom, left) boxes -> DETECTION_DTYPE."""
+    detections = np.zeros(len(locations), dtype=DETECTION_DTYPE)
+    for i, (top, right, bottom, left) in enumerate(locations):
+        detections[i] = (left, top, right - left, bottom - top, 1.0, 0)
+    return detections
+
+
+def load_gallery(profiles_path):
+    return FaceGallery.from_profiles(ProfileStore(profiles_path).profiles)
+
+
+class OfflineRunner:
+    def __init__(self, camera, detector=None, recognize=True, profiles_path=None):
+        self.camera = camera
+        self.detector = detector
+        self.recognize = recognize and has_face_recognition
+        self.timer = StageTimer()
+        self.frames = 0
+        self.faces = 0
+        self.matches = defaultdict(int)
+        self.gallery = load_gallery(profiles_path or DEFAULT_PROFILES_PATH)
+
+    def detect(self, frame):
+        if self.detector is None:
+            with self.timer.stage("detect"):
+                rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+                return locations_to_detections(face_recognition.face_locations(rgb))
+
+        with self.timer.stage("preprocess"):
+            buffer = self.detector.preprocess(frame)
+        with self.timer.stage("infer"):
+            outputs = self.detector.infer(buffer.input_dict)
+        with self.timer.stage("postprocess"):
+            return self.detector.postprocess(outputs, classes=("face",), buffer=buffer)
+
+    def identify(self, frame, detections):
+        with self.timer.stage("embed"):
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            locations = detections_to_locations(detections, frame.shape)
+            encodings = face_recognition.face_encodings(rgb, locations)
+
+        with self.timer.stage("match"):
+            for user_id, _ in self.gallery.match(encodings, RECOGNITION_THRESHOLD):
+                self.matches[user_id or "unknown"] += 1
+
+    def run(self, max_frames=None):
+        start = time.perf_counter()
+        while max_frames is None or self.frames < max_frames:
+            capture_start = time.perf_counter()
+            frame = self.camera.get_frame()
+            if frame is None:
+                break
+            self.timer.add("capture", time.perf_counter() - capture_start)
+            self.frames += 1
+
+            detections = self.detect(frame)
+            self.faces += len(detections)
+            if self.recognize and len(detections):
+                self.identify(frame, detections)
+
+        elapsed = time.perf_counter() - start
+        return {
+            "frames": self.frames,
+            "faces": self.faces,
+            "elapsed_s": elapsed,
+            "fps": self.frames / elapsed if elapsed > 0 else 0.0,
+            "matches": dict(self.matches),
+            "stages": self.timer.summary(),
+        }
+
+
+def print_report(report):
+    print(
+        f"📊 {report['frames']} frames, {report['faces']} face(s) in "
+        f"{report['elapsed_s']:.2f}s ({report['fps']:.1f} FPS)"
+    )
+    print(
+        f"{'stage':<12} {'count':>6} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9} {'max ms':>9}"
+    )
+    for name, s in report["stages"].items():
+        print(
+            f"{name:<12} {s['count']:>6} {s['mean_ms']:>9.2f} {s['p50_ms']:>9.2f} "
+            f"{s['p95_ms']:>9.2f} {s['max_ms']:>9.2f}"
+        )
+    if report["matches"]:
+        print(f"👤 Matches: {report['matches']}")
+
+
+def build_detector(kind, hef_path):
+    if kind == "hailo":
+        return HailoFaceDetector(hef_path).open()
+    if kind == "fake":
+        return HailoFaceDetector(backend=FakeBackend()).open()
+    if not has_face_recognition:
+        raise RuntimeError("--detector hog needs face_recognition installed")
+    return None  # CPU HOG via face_recognition
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Replay recorded frames through detection + recognition"
+    )
+    parser.add_argument("--source", required=True, help="video file or image folder")
+    parser.add_argument("--detector", choices=["hailo", "hog", "fake"], default="hog")
+    parser.add_argument("--hef", default=DEFAULT_HEF_PATH)
+    parser.add_argument("--profiles", default=DEFAULT_PROFILES_PATH)
+    parser.add_argument(
+        "--fps", type=float, default=None, help="pace replay (default: max speed)"
+    )
+    parser.add_argument("--frames", type=int, default=None, help="stop after N frames")
+    parser.add_argument("--no-recognition", action="store_true")
+    parser.add_argument("--json", help="write the report to this file")
+    args = parser.parse_args(argv)
+
+    camera = CameraInterface(source=ReplaySource(args.source, loop=False, fps=args.fps))
+    detector = build_detector(args.detector, args.hef)
+    try:
+        runner = OfflineRunner(
+            camera,
+            detector,
+            recognize=not args.no_recognition,
+            profiles_path=args.profiles,
+        )
+        report = runner.run(max_frames=args.frames)
+    finally:
+        camera.stop()
+        if detector is not None:
+            detector.release()
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
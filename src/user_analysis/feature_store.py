@@ -0,0 +1,163 @@
+# /home/taran/self_discovery/src/user_analysis/feature_store.py
+# Columnar per-user store of snapshot features: one raw little-endian file
+# per column under data/users/<id>/features/, appended to at capture time
+# and memory-mapped for analysis.
+#   taken_at.f8   capture time (epoch seconds)
+#   snapshot.i8   SnapshotArchive row id, -1 if unknown
+#   <metric>.f4   one per skin metric
+
+import os
+import sys
+import threading
+
+import numpy as np
+
+try:
+    from .skin_metrics import METRIC_NAMES, compute_skin_metrics
+except ImportError:  # user_analysis dir on sys.path
+    from skin_metrics import METRIC_NAMES, compute_skin_metrics
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from user_management.snapshot_archive import DAY, DEFAULT_ROOT
+
+FEATURES_DIR = "features"
+KEY_COLUMNS = {"taken_at": np.dtype("<f8"), "snapshot": np.dtype("<i8")}
+METRIC_DTYPE = np.dtype("<f4")
+
+
+def _suffix(dtype):
+    return f".{dtype.kind}{dtype.itemsize}"
+
+
+class FeatureStore:
+    """
+    append() adds one row by appending a few bytes to every column file, so
+    capture cost does not grow with history. load() maps each column with
+    np.memmap and returns {column: array} ordered by taken_at. A row torn
+    by a crash mid-append (columns of unequal length) is ignored on load
+    and cut off before the next append.
+
+    Columns are the KEY_COLUMNS plus `metrics` (default: METRIC_NAMES); a
+    metric missing from an appended row is stored as NaN.
+    """
+
+    def __init__(self, root=DEFAULT_ROOT, metrics=METRIC_NAMES):
+        self.root = root
+        self.metrics = tuple(metrics)
+        self.columns = dict(KEY_COLUMNS)
+        self.columns.update({name: METRIC_DTYPE for name in self.metrics})
+        self._lock = threading.Lock()
+
+    def folder(self, user_id):
+        return os.path.join(self.root, user_id, FEATURES_DIR)
+
+    def _path(self, user_id, column):
+        return os.path.join(
+            self.folder(user_id), column + _suffix(self.columns[column])
+        )
+
+    def append(self, user_id, taken_at, metrics, snapshot_id=None):
+        row = {
+            "taken_at": taken_at,
+            "snapshot": -1 if snapshot_id is None else snapshot_id,
+        }
+        row.update({name: metrics.get(name, np.nan) for name in self.metrics})
+        with self._lock:
+            os.makedirs(self.folder(user_id), exist_ok=True)
+            self._repair(user_id)
+            for column, dtype in self.columns.items():
+                with open(self._path(user_id, column), "ab") as f:
+                    f.write(np.asarray(row[column], dtype=dtype).tobytes())
+
+    def _rows_on_disk(self, user_id):
+        counts = {}
+        for column, dtype in self.columns.items():
+            path = self._path(user_id, column)
+            size = os.path.getsize(path) if os.path.exists(path) else 0
+            counts[column] = size // dtype.itemsize
+        return counts
+
+    def _repair(self, user_id):
+        counts = self._rows_on_disk(user_id)
+        rows = min(counts.values())
+        for column, count in counts.items():
+            if count > rows:
+                os.truncate(
+                    self._path(user_id, column), rows * self.columns[column].itemsize
+                )
+
+    def load(self, user_id):
+        """{column: array}, oldest first; empty arrays for an unknown user."""
+        with self._lock:
+            rows = min(self._rows_on_disk(user_id).values())
+            arrays = {
+                column: (
+                    np.memmap(self._path(user_id, column), dtype=dtype, mode="r")[:rows]
+                    if rows
+                    else np.empty(0, dtype=dtype)
+                )
+                for column, dtype in self.columns.items()
+            }
+        times = arrays["taken_at"]
+        if rows > 1 and np.any(np.diff(times) < 0):  # backfilled out of order
+            order = np.argsort(times, kind="stable")
+            arrays = {column: a[order] for column, a in arrays.items()}
+        return arrays
+
+    def count(self, user_id):
+        return len(self.load(user_id)["taken_at"])
+
+    def latest(self, user_id, count=3):
+        """{column: array} of the newest `count` rows, oldest first."""
+        return {column: a[-count:] for column, a in self.load(user_id).items()}
+
+    def backfill(self, user_id, archive, read_image):
+        """
+        Add features for archived snapshots that have none yet, reading each
+        image once with read_image(path). A snapshot that cannot be measured
+        (unreadable, no face) gets an all-NaN row so it is not read again.
+        Cheap when nothing is missing. Returns how many rows were added.
+        """
+        known = set(self.load(user_id)["snapshot"].tolist())
+        added = 0
+        for row in archive.history(user_id):
+            if row["id"] in known:
+                continue
+            frame = read_image(row["path"])
+            metrics = None
+            if frame is not None:
+                metrics = compute_skin_metrics(frame, row["location"])
+            self.append(user_id, row["taken_at"], metrics or {}, snapshot_id=row["id"])
+            added += 1
+        return added
+
+
+def rolling_mean(times, values, window=7 * DAY):
+    """
+    Mean of `values` over the trailing `window` seconds at every sample,
+    for `times` sorted ascending (NaNs are skipped), from prefix sums and
+    one searchsorted instead of a loop over windows.
+    """
+    times = np.asarray(times, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    sums = np.concatenate([[0.0], np.cumsum(np.where(valid, values, 0.0))])
+    counts = np.concatenate([[0], np.cumsum(valid)])
+    start = np.searchsorted(times, times - window, side="right")
+    end = np.arange(1, len(times) + 1)
+    n = counts[end] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[end] - sums[start]) / n, np.nan)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_feature_store():
+    """Process-wide FeatureStore next to the snapshot archive (data/users)."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = FeatureStore()
+    return _store
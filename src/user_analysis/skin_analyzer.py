@@ -1,21 +1,56 @@
 import cv2
 import numpy as np
 import os
+import sys
 
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from user_management.snapshot_archive import SnapshotArchive, get_snapshot_archive
+from user_analysis.feature_store import (
+    DAY,
+    FeatureStore,
+    get_feature_store,
+    rolling_mean,
+)
 
-def analyze_face_history(user_id, snapshot_folder):
-    snapshots = sorted([f for f in os.listdir(snapshot_folder) if f.endswith(".jpg")])[
-        -3:
-    ]
 
-    if not snapshots:
-        return "⚠️ Not enough data to analyze."
+def _stores(snapshot_folder=None, archive=None, features=None):
+    if archive is None:
+        archive = (
+            get_snapshot_archive()
+            if snapshot_folder is None
+            else SnapshotArchive(os.path.dirname(os.path.normpath(snapshot_folder)))
+        )
+    if features is None:
+        features = (
+            get_feature_store()
+            if snapshot_folder is None
+            else FeatureStore(archive.root)
+        )
+    return archive, features
+
+
+def load_features(user_id, snapshot_folder=None, archive=None, features=None):
+    """
+    All stored skin metrics of a user as {column: array}, oldest first.
+    Archived snapshots without features (taken before the feature store
+    existed, even if newer ones have rows) are measured once and added to
+    it, indexing a legacy folder first if needed.
+    """
+    archive, features = _stores(snapshot_folder, archive, features)
+    if not archive.count(user_id):
+        archive.import_folder(user_id)
+    features.backfill(user_id, archive, cv2.imread)
+    return features.load(user_id)
+
 
-    avg_brightness = []
-    for snap in snapshots:
-        img = cv2.imread(os.path.join(snapshot_folder, snap))
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        avg_brightness.append(np.mean(gray))
+def analyze_face_history(user_id, snapshot_folder=None, archive=None, features=None):
+    # Metrics were computed when each snapshot was taken: no image decoding
+    columns = load_features(user_id, snapshot_folder, archive, features)
+    avg_brightness = columns["brightness"][-3:]
+    avg_brightness = avg_brightness[~np.isnan(avg_brightness)]
+
+    if not len(avg_brightness):
+        return "⚠️ Not enough data to analyze."
 
     diff = max(avg_brightness) - min(avg_brightness)
     mean_brightness = np.mean(avg_brightness)
@@ -26,3 +61,10 @@ def analyze_face_history(user_id, snapshot_folder):
         return "☀️ Skin tone looks uneven. Try a calming mask or reduce sun exposure."
     else:
         return "😊 Skin looks consistent. Keep it up!"
+
+
+def skin_trend(user_id, metric="brightness", window_days=7, **stores):
+    """(taken_at, rolling mean of `metric` over the trailing window) arrays."""
+    columns = load_features(user_id, **stores)
+    times = np.asarray(columns["taken_at"])
+    return times, rolling_mean(times, columns[metric], window_days * DAY)
@@ -0,0 +1,59 @@
+# /home/taran/self_discovery/src/user_analysis/skin_metrics.py
+# Per-snapshot skin features, computed once from the face region when the
+# snapshot is taken and stored in the feature store.
+
+import cv2
+import numpy as np
+
+METRIC_NAMES = (
+    "brightness",  # mean grayscale level
+    "l_mean",  # CIELAB lightness, 0..100
+    "a_mean",  # green (-) .. red (+)
+    "b_mean",  # blue (-) .. yellow (+)
+    "l_std",  # spread of lightness: uneven tone
+    "a_std",
+    "redness",  # share of pixels noticeably redder than the face's own median
+    "texture",  # Laplacian variance of the region scaled to 112x112
+)
+SKIN_INSET = 0.2  # drop this fraction of the box on each side: hair, background
+REDNESS_MARGIN = 8.0  # a* units above the median
+
+
+def face_region(frame_bgr, location=None, inset=SKIN_INSET):
+    """Central part of the (top, right, bottom, left) box, or the whole frame."""
+    if location is None:
+        return frame_bgr
+    top, right, bottom, left = (int(v) for v in location)
+    dy, dx = int((bottom - top) * inset), int((right - left) * inset)
+    height, width = frame_bgr.shape[:2]
+    y0, y1 = max(0, top + dy), min(height, bottom - dy)
+    x0, x1 = max(0, left + dx), min(width, right - dx)
+    if y1 <= y0 or x1 <= x0:
+        return frame_bgr[0:0, 0:0]
+    return frame_bgr[y0:y1, x0:x1]
+
+
+def compute_skin_metrics(frame_bgr, location=None):
+    """{name: float} for METRIC_NAMES, or None when the region is empty."""
+    region = face_region(frame_bgr, location)
+    if region.size == 0:
+        return None
+
+    gray = cv2.cvtColor(region, cv2.COLOR_BGR2GRAY)
+    # 8-bit LAB: L scaled to 0..255, a/b offset by 128
+    lab = cv2.cvtColor(region, cv2.COLOR_BGR2LAB).reshape(-1, 3).astype(np.float32)
+    lightness = lab[:, 0] * (100.0 / 255.0)
+    a = lab[:, 1] - 128.0
+    b = lab[:, 2] - 128.0
+    small = cv2.resize(gray, (112, 112), interpolation=cv2.INTER_AREA)
+
+    return {
+        "brightness": float(gray.mean()),
+        "l_mean": float(lightness.mean()),
+        "a_mean": float(a.mean()),
+        "b_mean": float(b.mean()),
+        "l_std": float(lightness.std()),
+        "a_std": float(a.std()),
+        "redness": float(np.mean(a > np.median(a) + REDNESS_MARGIN)),
+        "texture": float(cv2.Laplacian(small, cv2.CV_64F).var()),
+    }
@@ -0,0 +1,78 @@
+# /home/taran/self_discovery/src/user_management/ann_index.py
+# Pure-NumPy inverted-file (IVF) coarse quantizer for large face galleries.
+
+import numpy as np
+
+
+class IVFIndex:
+    """
+    k-means partition of the embedding space into `nlist` cells. A query only
+    looks at the rows filed under its `nprobe` closest cells, so the exact
+    distance computation shrinks from the whole gallery to a few percent of
+    it. FaceGallery keeps the cell id of every row next to its user code and
+    re-ranks the candidates exactly, so thresholds mean the same thing as with
+    a brute-force scan; the only loss is recall when a true neighbour sits
+    in a cell that was not probed.
+    """
+
+    def __init__(self, nlist=None, nprobe=8, train_iters=10, seed=0):
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.train_iters = train_iters
+        self.seed = seed
+        self.centroids = None
+        self.trained_size = 0
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def train(self, vectors, max_samples_per_list=64):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        nlist = self.nlist or max(1, int(np.sqrt(len(vectors))))
+        nlist = min(nlist, len(vectors))
+        rng = np.random.default_rng(self.seed)
+
+        sample = vectors
+        if len(vectors) > nlist * max_samples_per_list:
+            idx = rng.choice(len(vectors), nlist * max_samples_per_list, replace=False)
+            sample = vectors[idx]
+
+        centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(self.train_iters):
+            labels = self._nearest(sample, centroids)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, labels, sample)
+            counts = np.bincount(labels, minlength=nlist)
+            filled = counts > 0
+            centroids[filled] = sums[filled] / counts[filled, None]
+            # Re-seed empty cells on random points so no list stays unused
+            empty = np.flatnonzero(~filled)
+            if len(empty):
+                centroids[empty] = sample[rng.choice(len(sample), len(empty))]
+
+        self.centroids = centroids
+        self.trained_size = len(vectors)
+
+    def _nearest(self, vectors, centroids, k=1):
+        centroid_sq = np.einsum("ij,ij->i", centroids, centroids)
+        # ||v||^2 is constant per row, so it does not change the ordering
+        scores = centroid_sq[None, :] - 2.0 * (vectors @ centroids.T)
+        if k == 1:
+            return np.argmin(scores, axis=1)
+        k = min(k, len(centroids))
+        return np.argpartition(scores, k - 1, axis=1)[:, :k]
+
+    def assign(self, vectors):
+        """Cell id for each vector."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(
+            -1, self.centroids.shape[1]
+        )
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int32)
+        return self._nearest(vectors, self.centroids).astype(np.int32)
+
+    def probe(self, probes, nprobe=None):
+        """Ids of the cells to scan for a batch of probes (union over the batch)."""
+        nearest = self._nearest(probes, self.centroids, k=nprobe or self.nprobe)
+        return np.unique(nearest)
@@ -1,26 +1,17 @@
 # /home/taran/self_discovery/src/user_management/embed_face.py
 import os
 import face_recognition
-import json
 
-USER_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "user_profiles.json")
+try:
+    from .user_profiles import load_profiles, save_profile
+except ImportError:  # run as a script from user_management/
+    from user_profiles import load_profiles, save_profile
+
 USER_DATA_ROOT = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../../data/users")
 )
 
 
-def load_profiles():
-    if not os.path.exists(USER_PROFILE_PATH):
-        return {}
-    with open(USER_PROFILE_PATH, "r") as f:
-        return json.load(f)
-
-
-def save_profiles(profiles):
-    with open(USER_PROFILE_PATH, "w") as f:
-        json.dump(profiles, f, indent=4)
-
-
 def generate_embedding(user_id):
     profiles = load_profiles()
 
@@ -51,9 +42,9 @@ def generate_embedding(user_id):
 
     # Use first face only
     embedding = face_encodings[0]
-    profiles[user_id]["facial_data"]["encodings"] = embedding.tolist()
+    profiles[user_id]["facial_data"]["encodings"] = [embedding]
 
-    save_profiles(profiles)
+    save_profile(user_id, profiles[user_id])
     print(f"✅ Embedding generated and saved for '{user_id}'.")
     return True
 
@@ -0,0 +1,323 @@
+# /home/taran/self_discovery/src/user_management/embedding_backends.py
+# Interchangeable face embedding models. A backend is called as
+# backend(rgb, locations, landmarks=None) -> (locations, encodings), which is
+# also what the EmbeddingService workers run, and knows the metric and
+# thresholds its vectors should be matched with. `landmarks` are the
+# (left eye, right eye, nose) points already found for each box, e.g. by
+# FaceQualityGate, so they are not searched for twice.
+#
+#   SMART_MIRROR_EMBEDDER=mobilefacenet python gui/main_app_launch.py
+#   python src/user_management/embedding_backends.py calibrate data/users
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+import numpy as np
+
+try:
+    import face_recognition
+
+    has_face_recognition = True
+except ImportError:
+    has_face_recognition = False
+
+try:
+    import onnxruntime
+
+    has_onnxruntime = True
+except ImportError:
+    has_onnxruntime = False
+
+MODELS_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "models", "hailo")
+)
+MOBILEFACENET_PATH = os.path.join(MODELS_DIR, "phase2_embedding", "mobilefacenet.onnx")
+EMBEDDER_ENV = "SMART_MIRROR_EMBEDDER"
+
+# Where the 5-point ArcFace template puts the eyes and nose in a 112x112 crop
+ALIGNED_SIZE = 112
+ARCFACE_EYES_NOSE = np.array(
+    [[38.2946, 51.6963], [73.5318, 51.5014], [56.0252, 71.7366]], dtype=np.float32
+)
+
+
+class DlibBackend:
+    """face_recognition's dlib ResNet: 128-D, Euclidean, the project's reference."""
+
+    name = "dlib"
+    metric = "euclidean"
+    batches = False  # face_encodings runs the network once per face
+
+    def __call__(self, rgb, locations=None, landmarks=None):
+        # face_encodings finds its own landmarks and cannot be given ours
+        if locations is None:
+            locations = face_recognition.face_locations(rgb)
+        return locations, face_recognition.face_encodings(rgb, locations)
+
+    def threshold_for(self, dlib_threshold):
+        """The match cut-offs used around the project are dlib distances."""
+        return dlib_threshold
+
+
+# === Alignment ===
+def face_landmarks(rgb, locations):
+    """Eye centres + nose per face from dlib's 5-point model, or None each."""
+    if not has_face_recognition:
+        return [None] * len(locations)
+    points = []
+    for marks in face_recognition.face_landmarks(rgb, locations, model="small"):
+        eyes = sorted(
+            [np.mean(marks["left_eye"], axis=0), np.mean(marks["right_eye"], axis=0)],
+            key=lambda p: p[0],
+        )
+        points.append(np.array(eyes + [marks["nose_tip"][0]], dtype=np.float32))
+    return points
+
+
+def align_face(rgb, location, landmarks=None, size=ALIGNED_SIZE):
+    """
+    size x size crop of one face. With (left eye, right eye, nose) landmarks
+    the face is rotated/scaled onto the ArcFace template; without them the
+    box is squared, padded by 10% and resized.
+    """
+    if landmarks is not None:
+        template = ARCFACE_EYES_NOSE * (size / ALIGNED_SIZE)
+        matrix, _ = cv2.estimateAffinePartial2D(landmarks, template)
+        if matrix is not None:
+            return cv2.warpAffine(rgb, matrix, (size, size), borderValue=0)
+
+    top, right, bottom, left = location
+    side = max(bottom - top, right - left) * 1.1
+    cx, cy = (left + right) / 2.0, (top + bottom) / 2.0
+    scale = size / max(side, 1.0)
+    matrix = np.array(
+        [[scale, 0, size / 2.0 - scale * cx], [0, scale, size / 2.0 - scale * cy]],
+        dtype=np.float32,
+    )
+    return cv2.warpAffine(rgb, matrix, (size, size), borderValue=0)
+
+
+# === ONNX Runtime ===
+_sessions = {}  # model path -> InferenceSession, per process
+
+
+class OnnxFaceBackend:
+    """
+    MobileFaceNet-style ONNX model on the CPU through ONNX Runtime. All faces
+    of a call go through the network as one NCHW batch of aligned 112x112
+    RGB crops scaled to [-1, 1]; outputs are L2-normalised, so they are
+    matched with the cosine metric.
+
+    Thresholds come from `<model>.calibration.json` (see calibrate_thresholds),
+    which maps the project's dlib cut-offs to equivalent cosine distances.
+
+    The ONNX session is not pickled: each EmbeddingService worker opens the
+    model once and keeps it for the life of the process.
+    """
+
+    metric = "cosine"
+    batches = True
+    DEFAULT_THRESHOLD = 0.5  # cosine distance, used until calibrated
+
+    def __init__(self, model_path=MOBILEFACENET_PATH, name="mobilefacenet", threads=1):
+        self.model_path = model_path
+        self.name = name
+        self.threads = threads
+        self.calibration_path = os.path.splitext(model_path)[0] + ".calibration.json"
+        self.thresholds = self._load_calibration()
+        self._warned = False
+
+    def _load_calibration(self):
+        if not os.path.exists(self.calibration_path):
+            return {}
+        with open(self.calibration_path, "r") as f:
+            return {float(k): v for k, v in json.load(f)["thresholds"].items()}
+
+    @property
+    def session(self):
+        session = _sessions.get(self.model_path)
+        if session is None:
+            if not has_onnxruntime:
+                raise RuntimeError("The ONNX embedding backend needs onnxruntime")
+            options = onnxruntime.SessionOptions()
+            # Parallelism comes from the worker processes, not from ORT threads
+            options.intra_op_num_threads = self.threads
+            try:
+                session = onnxruntime.InferenceSession(
+                    self.model_path, options, providers=["CPUExecutionProvider"]
+                )
+            except Exception as e:
+                raise RuntimeError(
+                    f"Could not load embedding model {self.model_path}: {e}"
+                ) from e
+            _sessions[self.model_path] = session
+        return session
+
+    def embed(self, crops):
+        """(n, 112, 112, 3) uint8 RGB crops -> (n, dim) L2-normalised float32."""
+        batch = (np.asarray(crops, dtype=np.float32) - 127.5) / 128.0
+        batch = np.ascontiguousarray(batch.transpose(0, 3, 1, 2))
+        session = self.session
+        (out,) = session.run(None, {session.get_inputs()[0].name: batch})
+        out = out.reshape(len(batch), -1).astype(np.float32, copy=False)
+        return out / np.maximum(np.linalg.norm(out, axis=1, keepdims=True), 1e-12)
+
+    def __call__(self, rgb, locations=None, landmarks=None):
+        if locations is None:
+            if not has_face_recognition:
+                raise RuntimeError("Finding faces needs locations or face_recognition")
+            locations = face_recognition.face_locations(rgb)
+        if not len(locations):
+            return locations, []
+        landmarks = (
+            list(landmarks) if landmarks is not None else [None] * len(locations)
+        )
+        missing = [i for i, marks in enumerate(landmarks) if marks is None]
+        if missing:
+            found = face_landmarks(rgb, [locations[i] for i in missing])
+            for i, marks in zip(missing, found):
+                landmarks[i] = marks
+        crops = [
+            align_face(rgb, loc, marks) for loc, marks in zip(locations, landmarks)
+        ]
+        return locations, list(self.embed(crops))
+
+    def threshold_for(self, dlib_threshold):
+        """Cosine distance giving the same decisions as `dlib_threshold`."""
+        if not self.thresholds:
+            if not self._warned:
+                print(
+                    f"⚠️ {self.name} is not calibrated, using {self.DEFAULT_THRESHOLD}"
+                )
+                self._warned = True
+            return self.DEFAULT_THRESHOLD
+        if dlib_threshold in self.thresholds:
+            return self.thresholds[dlib_threshold]
+        known = sorted(self.thresholds)
+        return float(
+            np.interp(dlib_threshold, known, [self.thresholds[k] for k in known])
+        )
+
+
+BACKENDS = {
+    "dlib": DlibBackend,
+    "mobilefacenet": OnnxFaceBackend,
+}
+
+
+def get_backend(name=None):
+    """Backend named by `name` or $SMART_MIRROR_EMBEDDER (default: dlib)."""
+    name = name or os.environ.get(EMBEDDER_ENV, "dlib")
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown embedder '{name}', expected one of {list(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+# === Calibration ===
+def pairwise_distances(encodings, metric):
+    encodings = np.asarray(encodings, dtype=np.float32)
+    if metric == "cosine":
+        unit = encodings / np.linalg.norm(encodings, axis=1, keepdims=True)
+        dist = 1.0 - unit @ unit.T
+    else:
+        sq = np.einsum("ij,ij->i", encodings, encodings)
+        dist = np.sqrt(
+            np.maximum(sq[:, None] + sq[None, :] - 2 * encodings @ encodings.T, 0)
+        )
+    upper = np.triu_indices(len(encodings), k=1)
+    return dist[upper]
+
+
+def best_agreement_threshold(distances, reference_matches):
+    """
+    Cut-off t on `distances` whose decisions (distance < t) agree most often
+    with the boolean `reference_matches`. Returns (t, agreement).
+    """
+    distances = np.asarray(distances, dtype=np.float64)
+    reference_matches = np.asarray(reference_matches, dtype=bool)
+    order = np.argsort(distances)
+    d, ref = distances[order], reference_matches[order]
+    # Cutting after the first i pairs accepts those i and rejects the rest
+    accepted_right = np.r_[0, np.cumsum(ref)]
+    rejected_right = np.r_[np.cumsum((~ref)[::-1])[::-1], 0]
+    agreement = (accepted_right + rejected_right) / len(d)
+    best = int(np.argmax(agreement))
+    if best == 0:
+        threshold = d[0]
+    elif best == len(d):
+        threshold = d[-1] + 1e-6
+    else:
+        threshold = (d[best - 1] + d[best]) / 2.0
+    return float(threshold), float(agreement[best])
+
+
+def calibrate_thresholds(
+    backend, images, reference=None, reference_thresholds=(0.45, 0.6)
+):
+    """
+    Encode one face per image with both backends and, for each dlib cut-off,
+    find the backend threshold that reproduces dlib's decision on every pair.
+    Returns {dlib_threshold: (threshold, agreement)}.
+    """
+    reference = reference or DlibBackend()
+    ours, theirs = [], []
+    for image in images:
+        rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        locations, ref_encodings = reference(rgb)
+        if len(locations) != 1:
+            continue  # ambiguous or no face
+        theirs.append(ref_encodings[0])
+        ours.append(backend(rgb, locations)[1][0])
+    if len(ours) < 2:
+        raise ValueError("Calibration needs at least two images with one face each")
+
+    ref_dist = pairwise_distances(theirs, reference.metric)
+    our_dist = pairwise_distances(ours, backend.metric)
+    return {
+        t: best_agreement_threshold(our_dist, ref_dist < t)
+        for t in reference_thresholds
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Calibrate an embedding backend")
+    sub = parser.add_subparsers(dest="command", required=True)
+    cal = sub.add_parser("calibrate", help="match dlib decisions on stored snapshots")
+    cal.add_argument("images", help="folder of snapshots, e.g. data/users")
+    cal.add_argument("--backend", default="mobilefacenet")
+    args = parser.parse_args(argv)
+
+    backend = get_backend(args.backend)
+    paths = [
+        os.path.join(root, f)
+        for root, _, files in os.walk(args.images)
+        for f in sorted(files)
+        if f.lower().endswith((".jpg", ".jpeg", ".png"))
+    ]
+    images = [img for img in (cv2.imread(p) for p in paths) if img is not None]
+    results = calibrate_thresholds(backend, images)
+    for t, (threshold, agreement) in results.items():
+        print(
+            f"🎯 dlib < {t:.2f}  ->  {backend.metric} < {threshold:.3f} ({agreement:.1%} agree)"
+        )
+
+    with open(backend.calibration_path, "w") as f:
+        json.dump(
+            {
+                "reference": "dlib",
+                "metric": backend.metric,
+                "images": len(images),
+                "thresholds": {str(t): r[0] for t, r in results.items()},
+                "agreement": {str(t): r[1] for t, r in results.items()},
+            },
+            f,
+            indent=2,
+        )
+    print(f"💾 Saved {backend.calibration_path}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -0,0 +1,296 @@
+# /home/taran/self_discovery/src/user_management/embedding_service.py
+# face_encodings on a pool of worker processes. dlib holds the GIL and uses
+# one core per call, so several faces (or several callers) only run in
+# parallel across processes. Face crops travel through shared memory; the
+# pool only pickles a slot index, a shape and the face boxes.
+
+import atexit
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+
+import cv2
+import numpy as np
+
+try:
+    from .embedding_backends import DlibBackend, get_backend
+except ImportError:  # user_management dir on sys.path
+    from embedding_backends import DlibBackend, get_backend
+
+DEFAULT_SLOT_BYTES = 1280 * 720 * 3
+CROP_MARGIN = 0.5  # context kept around a box, as a fraction of its size
+
+
+# === Worker side ===
+_attached = {}  # slot index -> SharedMemory, per worker process
+
+
+def _attach_untracked(name):
+    """
+    SharedMemory(name=name) without registering it with the resource
+    tracker, as track=False does from Python 3.13. The parent owns and
+    unlinks every block; a worker registering (or unregistering) it too
+    would have the tracker unlink it or report it leaked at exit.
+    """
+    register = resource_tracker.register
+
+    def skip_shared_memory(name, rtype):
+        if rtype != "shared_memory":
+            register(name, rtype)
+
+    resource_tracker.register = skip_shared_memory
+    try:
+        return shared_memory.SharedMemory(name=name)
+    finally:
+        resource_tracker.register = register
+
+
+def _attach(index, name):
+    shm = _attached.get(index)
+    if shm is None or shm.name != name:
+        if shm is not None:
+            shm.close()  # the parent replaced this slot with a bigger block
+        try:
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        except TypeError:  # Python < 3.13
+            shm = _attach_untracked(name)
+        _attached[index] = shm
+    return shm
+
+
+def _encode_job(backend, index, name, shape, locations, landmarks=None):
+    shm = _attach(index, name)
+    rgb = np.ndarray(shape, dtype=np.uint8, buffer=shm.buf)
+    if landmarks is None:
+        found, encodings = backend(rgb, locations)
+    else:
+        found, encodings = backend(rgb, locations, landmarks)
+    return [tuple(loc) for loc in found], [np.asarray(e, np.float32) for e in encodings]
+
+
+# === Parent side ===
+class EmbeddingService:
+    """
+    Process pool computing face embeddings with `backend` (see
+    embedding_backends; any callable (rgb, locations) -> (locations,
+    encodings) works, taking `landmarks` as a third argument if the caller
+    passes any).
+
+    encode_faces(frame, locations) crops the (top, right, bottom, left)
+    boxes with some margin, converts the crop to RGB straight into a free
+    shared-memory slot and embeds the faces in one job per frame, or spread
+    over the workers for a backend that cannot batch (see submit_faces); it
+    returns one float32 encoding per box, in order. encode_frame(frame)
+    ships the whole frame and lets the worker find the faces too, returning
+    (locations, encodings). submit_faces / submit_frame return futures
+    instead.
+
+    There are `slots` shared blocks (default 2 per worker); when all are
+    busy, submitting blocks until one frees up, which bounds memory and
+    keeps callers from queueing unbounded work. A slot too small for an
+    image is replaced by a bigger one.
+
+    Workers are spawned rather than forked so the pool is safe to start
+    from a process that already runs threads (Qt, camera grabber).
+    """
+
+    def __init__(
+        self,
+        workers=None,
+        backend=None,
+        slots=None,
+        slot_bytes=DEFAULT_SLOT_BYTES,
+        margin=CROP_MARGIN,
+    ):
+        self.workers = workers or max(1, (os.cpu_count() or 2) - 1)
+        self.backend = backend or DlibBackend()
+        self.margin = margin
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        slot_count = slots or 2 * self.workers
+        self._blocks = [
+            shared_memory.SharedMemory(create=True, size=slot_bytes)
+            for _ in range(slot_count)
+        ]
+        self._free = queue.Queue()
+        for index in range(slot_count):
+            self._free.put(index)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # === Shared memory slots ===
+    def _acquire(self, nbytes):
+        index = self._free.get()
+        with self._lock:
+            if self._blocks[index].size < nbytes:
+                old = self._blocks[index]
+                self._blocks[index] = shared_memory.SharedMemory(
+                    create=True, size=nbytes
+                )
+                old.close()
+                old.unlink()
+            return index, self._blocks[index]
+
+    def _submit_image(self, bgr, locations, landmarks=None):
+        """Copy `bgr` as RGB into a slot and queue an encode job on it."""
+        if self._closed:
+            raise RuntimeError("EmbeddingService is closed")
+        shape = bgr.shape
+        index, block = self._acquire(int(np.prod(shape)))
+        try:
+            rgb = np.ndarray(shape, dtype=np.uint8, buffer=block.buf)
+            cv2.cvtColor(bgr, cv2.COLOR_BGR2RGB, dst=rgb)
+            del rgb  # no view may outlive the slot (it could be replaced)
+            future = self._executor.submit(
+                _encode_job,
+                self.backend,
+                index,
+                block.name,
+                shape,
+                locations,
+                landmarks,
+            )
+        except Exception:
+            self._free.put(index)
+            raise
+        future.add_done_callback(lambda _: self._free.put(index))
+        return future
+
+    # === Submission ===
+    def _padded(self, frame, location):
+        """The box grown by `margin` and clipped to the frame, as (y0, y1, x0, x1)."""
+        top, right, bottom, left = location
+        height, width = frame.shape[:2]
+        pad_y = int((bottom - top) * self.margin)
+        pad_x = int((right - left) * self.margin)
+        return (
+            max(0, top - pad_y),
+            min(height, bottom + pad_y),
+            max(0, left - pad_x),
+            min(width, right + pad_x),
+        )
+
+    def _submit_group(self, frame, locations, landmarks):
+        """One job for these boxes, on the smallest crop holding all of them."""
+        padded = [self._padded(frame, loc) for loc in locations]
+        y0 = min(p[0] for p in padded)
+        y1 = max(p[1] for p in padded)
+        x0 = min(p[2] for p in padded)
+        x1 = max(p[3] for p in padded)
+        crop_locations = [
+            (top - y0, right - x0, bottom - y0, left - x0)
+            for top, right, bottom, left in locations
+        ]
+        if all(marks is None for marks in landmarks):
+            crop_landmarks = None
+        else:
+            crop_landmarks = [
+                None if marks is None else np.asarray(marks, np.float32) - (x0, y0)
+                for marks in landmarks
+            ]
+        return self._submit_image(frame[y0:y1, x0:x1], crop_locations, crop_landmarks)
+
+    def submit_faces(self, frame_bgr, locations, landmarks=None):
+        """
+        Future resolving to one encoding (or None) per face box, in order.
+        `landmarks` (one (3, 2) array or None per box, in frame pixels, e.g.
+        FaceQuality.landmarks) are handed to the backend instead of being
+        searched for again.
+
+        A backend with `batches = True` (OnnxFaceBackend) gets all faces of
+        the frame in one job, so they go through the network as one batch.
+        Others (dlib embeds one face at a time anyway) get the faces split
+        over up to `workers` jobs, so several people are embedded in
+        parallel.
+        """
+        if landmarks is None:
+            landmarks = [None] * len(locations)
+        result = Future()
+        encodings = [None] * len(locations)
+        inside = []
+        for i, location in enumerate(locations):
+            y0, y1, x0, x1 = self._padded(frame_bgr, location)
+            if y1 > y0 and x1 > x0:  # else the box is entirely outside the frame
+                inside.append(i)
+        if not inside:
+            result.set_result(encodings)
+            return result
+
+        jobs = 1 if getattr(self.backend, "batches", False) else self.workers
+        groups = [g.tolist() for g in np.array_split(inside, min(jobs, len(inside)))]
+        futures = [
+            self._submit_group(
+                frame_bgr,
+                [locations[i] for i in group],
+                [landmarks[i] for i in group],
+            )
+            for group in groups
+        ]
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def collect(group, future):
+            try:
+                _, found = future.result()
+            except BaseException as e:
+                with lock:
+                    if not result.done():
+                        result.set_exception(e)
+                return
+            with lock:
+                for i, encoding in zip(group, found):
+                    encodings[i] = encoding
+                remaining[0] -= 1
+                if not remaining[0] and not result.done():
+                    result.set_result(encodings)
+
+        for group, future in zip(groups, futures):
+            future.add_done_callback(lambda f, group=group: collect(group, f))
+        return result
+
+    def encode_faces(self, frame_bgr, locations, landmarks=None, timeout=None):
+        """Encodings in the order of `locations` (None where none came back)."""
+        return self.submit_faces(frame_bgr, locations, landmarks).result(timeout)
+
+    def submit_frame(self, frame_bgr):
+        """Future resolving to (locations, encodings) for every face in the frame."""
+        return self._submit_image(frame_bgr, None)
+
+    def encode_frame(self, frame_bgr, timeout=None):
+        return self.submit_frame(frame_bgr).result(timeout)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        self._executor.shutdown(wait=True)
+        for block in self._blocks:
+            block.close()
+            block.unlink()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_embedding_service():
+    """
+    Process-wide EmbeddingService using the backend chosen by
+    $SMART_MIRROR_EMBEDDER, started on first use and closed at exit.
+    """
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = EmbeddingService(backend=get_backend())
+            atexit.register(_service.close)
+    return _service
@@ -0,0 +1,136 @@
+# /home/taran/self_discovery/src/user_management/embedding_store.py
+# Face encodings kept as one float32 .npy file per user instead of lists of
+# floats inside user_profiles.json. Profiles only hold a reference:
+#   "facial_data": {"encodings_file": "embeddings/sorin.npy", "encoding_count": 4}
+
+import json
+import os
+import re
+import numpy as np
+
+EMBEDDINGS_DIRNAME = "embeddings"
+
+
+class EmbeddingStore:
+    """
+    Per-user float32 encoding matrices under `base_dir`/embeddings, referenced
+    by paths relative to `base_dir` (the directory of the profiles JSON).
+    Writes go to a temp file and are renamed into place, so a reader (or an
+    open memory map) never sees a half-written file. Loads are memory-mapped
+    and read-only.
+
+    Each file keeps the width of the encodings it was saved with, so dlib
+    (128-D) and ONNX backends (e.g. 512-D) both round-trip. With `dim` set,
+    saving vectors of another length raises ValueError.
+    """
+
+    def __init__(self, base_dir, dim=None):
+        self.base_dir = base_dir
+        self.dim = dim
+
+    def relative_path(self, user_id):
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", str(user_id)) or "_"
+        return os.path.join(EMBEDDINGS_DIRNAME, f"{safe}.npy")
+
+    def _absolute(self, relative_path):
+        return os.path.join(self.base_dir, relative_path)
+
+    def save(self, user_id, encodings):
+        """Write a user's encodings; returns the reference to keep in the profile."""
+        encodings = np.asarray(encodings, dtype=np.float32)
+        if encodings.ndim != 2 or (
+            self.dim is not None and encodings.shape[1] != self.dim
+        ):
+            expected = f"(n, {self.dim})" if self.dim is not None else "(n, dim)"
+            raise ValueError(
+                f"Expected encodings shaped {expected}, got {encodings.shape}"
+            )
+        relative = self.relative_path(user_id)
+        path = self._absolute(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.save(f, encodings)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+        return relative
+
+    def load(self, relative_path, mmap=True):
+        if not relative_path or not os.path.exists(self._absolute(relative_path)):
+            return np.zeros((0, self.dim or 0), dtype=np.float32)
+        return np.load(self._absolute(relative_path), mmap_mode="r" if mmap else None)
+
+    def delete(self, user_id):
+        path = self._absolute(self.relative_path(user_id))
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def store_for(profiles_path):
+    """The store living next to a profiles JSON file."""
+    return EmbeddingStore(os.path.dirname(os.path.abspath(profiles_path)))
+
+
+def attach_encodings(profile, store):
+    """Replace the on-disk reference with a memory-mapped `encodings` array."""
+    facial_data = profile.setdefault("facial_data", {})
+    if not isinstance(facial_data.get("encodings"), list):
+        facial_data["encodings"] = store.load(facial_data.get("encodings_file"))
+    return profile
+
+
+def detach_encodings(user_id, profile, store, write=True):
+    """
+    Copy of `profile` as it should be written to JSON: encodings replaced by
+    a reference, writing them to the store first when `write` is set.
+    """
+    facial_data = dict(profile.get("facial_data") or {})
+    encodings = facial_data.pop("encodings", None)
+    if write and encodings is not None and len(encodings):
+        facial_data["encodings_file"] = store.save(user_id, encodings)
+        facial_data["encoding_count"] = int(len(encodings))
+    elif write and encodings is not None:
+        store.delete(user_id)
+        facial_data.pop("encodings_file", None)
+        facial_data["encoding_count"] = 0
+
+    on_disk = dict(profile)
+    on_disk["facial_data"] = facial_data
+    return on_disk
+
+
+def needs_migration(profiles):
+    """True if any profile still carries encodings inline as JSON lists."""
+    return any(
+        isinstance((p.get("facial_data") or {}).get("encodings"), list)
+        and (p.get("facial_data") or {}).get("encodings")
+        for p in profiles.values()
+    )
+
+
+def migrate_profiles_file(profiles_path, store=None):
+    """
+    One-time migration of a profiles JSON that still stores encodings inline.
+    Each user's list is written to the store and replaced by a reference; the
+    JSON is rewritten atomically. Returns True if anything was migrated.
+    """
+    if not os.path.exists(profiles_path):
+        return False
+    with open(profiles_path, "r") as f:
+        profiles = json.load(f)
+    if not needs_migration(profiles):
+        return False
+
+    store = store or store_for(profiles_path)
+    migrated = {}
+    for user_id, profile in profiles.items():
+        inline = isinstance((profile.get("facial_data") or {}).get("encodings"), list)
+        migrated[user_id] = detach_encodings(user_id, profile, store, write=inline)
+
+    tmp_path = f"{profiles_path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(migrated, f, indent=4)
+    os.replace(tmp_path, profiles_path)
+    print(f"🔁 Moved face encodings of {len(migrated)} profile(s) to {store.base_dir}")
+    return True
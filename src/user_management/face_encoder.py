@@ -1,18 +1,19 @@
 # /home/taran/self_discovery/src/user_management/face_encoder.py
-# Supports both Hailo-accelerated embedding (when available) and CPU fallback
+# Embeddings come from the backend selected by $SMART_MIRROR_EMBEDDER (dlib or
+# MobileFaceNet on ONNX Runtime, see embedding_backends), computed on the
+# shared EmbeddingService worker pool.
 
 import numpy as np
-import cv2
 
 try:
-    import face_recognition
+    from .face_gallery import FaceGallery
+except ImportError:  # user_management dir on sys.path
+    from face_gallery import FaceGallery
 
-    has_face_recognition = True
-except ImportError:
-    has_face_recognition = False
-
-# Placeholder for future Hailo integration
-USE_HAILO = False
+try:
+    from .embedding_service import get_embedding_service
+except ImportError:  # user_management dir on sys.path
+    from embedding_service import get_embedding_service
 
 
 # === Matching ===
@@ -23,26 +24,22 @@ def cosine_similarity(a, b):
 
 
 def is_match(vec1, vec2, threshold=0.5):
+    """
+    Cosine match of `vec1` against a single encoding or, when `vec2` is a
+    FaceGallery, against every enrolled encoding at once.
+    """
+    if isinstance(vec2, FaceGallery):
+        user_id, _ = vec2.best_match(vec1, threshold, metric="cosine")
+        return user_id is not None
     return cosine_similarity(vec1, vec2) > (1 - threshold)
 
 
 # === Encoding ===
 def extract_embedding(frame_bgr):
     """
-    Extract a 128D face embedding from a given frame using either Hailo or CPU fallback.
+    Extract a face embedding from a given frame with the configured backend.
     Returns None if no face is detected.
     """
-    if USE_HAILO:
-        # Placeholder: Use Hailo infer() call once .hef is compiled
-        raise NotImplementedError("Hailo embedding not yet integrated.")
-
-    elif has_face_recognition:
-        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-        face_locations = face_recognition.face_locations(rgb)
-        if not face_locations:
-            return None
-        encodings = face_recognition.face_encodings(rgb, face_locations)
-        return encodings[0] if encodings else None
-
-    else:
-        raise RuntimeError("No available embedding backend (Hailo or face_recognition)")
+    # Detection + encoding run on the shared worker-process pool
+    _, encodings = get_embedding_service().encode_frame(frame_bgr)
+    return encodings[0] if encodings else None
@@ -0,0 +1,249 @@
+# /home/taran/self_discovery/src/user_management/face_gallery.py
+# In-memory index of every enrolled face encoding, queried with one matrix
+# operation per batch of probe faces instead of a Python loop per user.
+
+import numpy as np
+
+
+class FaceGallery:
+    """
+    All enrolled encodings live in one contiguous float32 matrix with a
+    parallel array of user codes. Users can be added, removed or replaced
+    individually; queries return the nearest users for a batch of probes.
+
+    Distances are Euclidean by default (the metric face_recognition's
+    face_distance uses, so the 0.45 / 0.6 cut-offs keep their meaning);
+    metric="cosine" gives 1 - cosine similarity instead.
+
+    Pass `ann=IVFIndex(...)` (ann_index) for large shared galleries: once
+    the gallery holds `ann_min_size` encodings, queries only scan the
+    probed IVF cells and re-rank those candidates exactly. Below ~10k
+    encodings the exact scan is as fast or faster; tests/bench_ann.py
+    prints the crossover for the machine it runs on.
+
+    The encoding size depends on the embedding backend (128 for dlib, 512
+    for some ONNX models). Unless `dim` is given it is taken from the first
+    encodings added; vectors of any other length raise ValueError.
+    """
+
+    _ROW_ARRAYS = ("_matrix", "_sq_norms", "_codes", "_cells")
+
+    def __init__(self, dim=None, capacity=64, ann=None, ann_min_size=50000):
+        self.dim = dim
+        self._matrix = np.zeros((capacity, dim or 0), dtype=np.float32)
+        self._sq_norms = np.zeros(capacity, dtype=np.float32)
+        self._codes = np.zeros(capacity, dtype=np.int32)
+        self._cells = np.zeros(capacity, dtype=np.int32)  # IVF cell per row
+        self._count = 0
+        self._user_ids = []  # code -> user_id
+        self._code_of = {}  # user_id -> code
+        self._groups = None  # cached (order, starts, codes) for per-user reduction
+        self.ann = ann
+        self.ann_min_size = ann_min_size
+        self._cell_groups = None  # cached (order, starts, ends) per IVF cell
+
+    @classmethod
+    def from_profiles(cls, profiles, dim=None):
+        gallery = cls(dim=dim)
+        for user_id, profile in profiles.items():
+            encodings = (profile.get("facial_data") or {}).get("encodings", [])
+            if len(encodings):
+                gallery.add(user_id, encodings)
+        return gallery
+
+    # === Bookkeeping ===
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, user_id):
+        code = self._code_of.get(user_id)
+        return code is not None and bool(np.any(self._codes[: self._count] == code))
+
+    @property
+    def encodings(self):
+        """Read-only view of the stored encodings, one row each."""
+        view = self._matrix[: self._count]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def user_ids(self):
+        """Array of the user id owning each row of `encodings`."""
+        return self._id_array()[self._codes[: self._count]]
+
+    def _id_array(self):
+        ids = np.empty(len(self._user_ids), dtype=object)
+        ids[:] = self._user_ids
+        return ids
+
+    def users(self):
+        return {self._user_ids[c] for c in np.unique(self._codes[: self._count])}
+
+    def _as_rows(self, vectors):
+        """`vectors` as an (n, dim) float32 matrix; one 1-D vector is one row."""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if vectors.size == 0:
+            return vectors.reshape(0, self.dim or 0)
+        if vectors.ndim == 1:
+            vectors = vectors[None, :]
+        if vectors.ndim != 2:
+            raise ValueError(f"Expected encoding vectors, got shape {vectors.shape}")
+        if self.dim is not None and vectors.shape[1] != self.dim:
+            raise ValueError(
+                f"Expected {self.dim}-D encodings, got {vectors.shape[1]}-D "
+                "(was the gallery built with another embedding backend?)"
+            )
+        return vectors
+
+    def _reserve(self, extra):
+        needed = self._count + extra
+        capacity = len(self._matrix)
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        for name in self._ROW_ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[: self._count] = old[: self._count]
+            setattr(self, name, new)
+
+    def add(self, user_id, encodings):
+        encodings = self._as_rows(encodings)
+        if not len(encodings):
+            return
+        if self.dim is None:
+            self.dim = encodings.shape[1]
+            self._matrix = np.zeros((len(self._matrix), self.dim), dtype=np.float32)
+        code = self._code_of.get(user_id)
+        if code is None:
+            code = len(self._user_ids)
+            self._user_ids.append(user_id)
+            self._code_of[user_id] = code
+
+        self._reserve(len(encodings))
+        rows = slice(self._count, self._count + len(encodings))
+        self._matrix[rows] = encodings
+        self._sq_norms[rows] = np.einsum("ij,ij->i", encodings, encodings)
+        self._codes[rows] = code
+        if self.ann is not None and self.ann.is_trained:
+            self._cells[rows] = self.ann.assign(encodings)
+        self._count += len(encodings)
+        self._groups = None
+        self._cell_groups = None
+
+    def remove(self, user_id):
+        code = self._code_of.get(user_id)
+        if code is None:
+            return
+        keep = self._codes[: self._count] != code
+        kept = int(np.count_nonzero(keep))
+        if kept != self._count:
+            for name in self._ROW_ARRAYS:
+                arr = getattr(self, name)
+                arr[:kept] = arr[: self._count][keep]
+            self._count = kept
+            self._groups = None
+            self._cell_groups = None
+
+    def replace(self, user_id, encodings):
+        self.remove(user_id)
+        self.add(user_id, encodings)
+
+    # === Queries ===
+    def distances(self, probes, metric="euclidean", rows=None):
+        """(n_probes, len(gallery)) distance matrix, or (n_probes, len(rows))."""
+        probes = self._as_rows(probes)
+        if rows is None:
+            rows = slice(0, self._count)
+        matrix = self._matrix[rows]
+        sq_norms = self._sq_norms[rows]
+        dots = probes @ matrix.T
+        if metric == "cosine":
+            probe_norms = np.linalg.norm(probes, axis=1)[:, None]
+            norms = np.sqrt(sq_norms)[None, :]
+            denom = np.maximum(probe_norms * norms, 1e-12)
+            return 1.0 - dots / denom
+        if metric != "euclidean":
+            raise ValueError(f"Unknown metric '{metric}'")
+        probe_sq = np.einsum("ij,ij->i", probes, probes)[:, None]
+        sq = probe_sq + sq_norms[None, :] - 2.0 * dots
+        return np.sqrt(np.maximum(sq, 0.0))
+
+    @staticmethod
+    def _group_by_code(codes):
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+        starts = np.flatnonzero(np.r_[True, sorted_codes[1:] != sorted_codes[:-1]])
+        return order, starts, sorted_codes[starts]
+
+    def _user_groups(self):
+        if self._groups is None:
+            self._groups = self._group_by_code(self._codes[: self._count])
+        return self._groups
+
+    def _ann_candidates(self, probes):
+        """Rows to re-rank for `probes`, or None to scan the whole gallery."""
+        if self.ann is None or self._count < self.ann_min_size:
+            return None
+        if not self.ann.is_trained or self._count > 2 * self.ann.trained_size:
+            self.ann.train(self._matrix[: self._count])
+            self._cells[: self._count] = self.ann.assign(self._matrix[: self._count])
+            self._cell_groups = None
+        if self._cell_groups is None:
+            cells = self._cells[: self._count]
+            order = np.argsort(cells, kind="stable")
+            bounds = np.searchsorted(
+                cells[order], np.arange(len(self.ann.centroids) + 1)
+            )
+            self._cell_groups = (order, bounds)
+
+        order, bounds = self._cell_groups
+        probed = self.ann.probe(probes)
+        return np.concatenate([order[bounds[c] : bounds[c + 1]] for c in probed])
+
+    def query(self, probes, k=1, metric="euclidean"):
+        """
+        Top-k users per probe by their closest encoding. Returns (user_ids,
+        distances), both shaped (n_probes, k), nearest first; slots beyond the
+        number of enrolled users hold None / inf.
+        """
+        probes = self._as_rows(probes)
+        ids = np.full((len(probes), k), None, dtype=object)
+        dists = np.full((len(probes), k), np.inf, dtype=np.float32)
+        if not self._count or not len(probes):
+            return ids, dists
+
+        rows = self._ann_candidates(probes)
+        if rows is None:
+            order, starts, codes = self._user_groups()
+            dist = self.distances(probes, metric)
+        else:
+            if not len(rows):
+                return ids, dists
+            order, starts, codes = self._group_by_code(self._codes[rows])
+            dist = self.distances(probes, metric, rows)
+        per_user = np.minimum.reduceat(dist[:, order], starts, axis=1)
+        top = min(k, per_user.shape[1])
+        if top < per_user.shape[1]:
+            best = np.argpartition(per_user, top - 1, axis=1)[:, :top]
+        else:
+            best = np.broadcast_to(np.arange(top), (len(probes), top))
+        best_d = np.take_along_axis(per_user, best, axis=1)
+        rank = np.argsort(best_d, axis=1, kind="stable")
+        best = np.take_along_axis(best, rank, axis=1)
+
+        ids[:, :top] = self._id_array()[codes[best]]
+        dists[:, :top] = np.take_along_axis(best_d, rank, axis=1)
+        return ids, dists
+
+    def match(self, probes, threshold, metric="euclidean"):
+        """[(user_id or None, distance)] for each probe, accepting distance < threshold."""
+        ids, dists = self.query(probes, k=1, metric=metric)
+        return [
+            (user_id if dist < threshold else None, float(dist))
+            for user_id, dist in zip(ids[:, 0], dists[:, 0])
+        ]
+
+    def best_match(self, probe, threshold, metric="euclidean"):
+        return self.match([probe], threshold, metric)[0]
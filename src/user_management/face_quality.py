@@ -0,0 +1,164 @@
+# /home/taran/self_discovery/src/user_management/face_quality.py
+# Cheap checks on a face crop (size, brightness, blur, pose) run before the
+# embedding call, so junk frames never cost an embedding and never reach a
+# user's gallery.
+
+import math
+
+import cv2
+import numpy as np
+
+try:
+    import face_recognition
+
+    has_face_recognition = True
+except ImportError:
+    has_face_recognition = False
+
+try:
+    from .embedding_backends import face_landmarks
+except ImportError:  # user_management dir on sys.path
+    from embedding_backends import face_landmarks
+
+SHARPNESS_SIZE = 112  # crops are scaled to this before measuring blur
+
+
+class FaceQuality:
+    """Verdict and measurements for one face box."""
+
+    __slots__ = (
+        "location",
+        "ok",
+        "reason",
+        "size",
+        "brightness",
+        "sharpness",
+        "yaw",
+        "roll",
+        "landmarks",
+    )
+
+    def __init__(self, location):
+        self.location = location
+        self.ok = False
+        self.reason = None
+        self.size = 0
+        self.brightness = None
+        self.sharpness = None
+        self.yaw = None
+        self.roll = None
+        self.landmarks = None
+
+    def __repr__(self):
+        verdict = "ok" if self.ok else self.reason
+        return f"FaceQuality({self.location}, {verdict})"
+
+
+class FaceQualityGate:
+    """
+    Rejects a face box that is too small, too dark or washed out, blurred
+    (variance of the Laplacian of the crop scaled to 112x112, so the cut-off
+    does not depend on face size) or turned away from the camera.
+
+    Pose comes from the eye and nose landmarks: `roll` is the tilt of the
+    eye line in degrees and `yaw` the nose's horizontal offset from the eye
+    midpoint as a fraction of the eye distance (0 when frontal). It needs
+    face_recognition and is skipped with check_pose=False, or when the
+    landmarks are unavailable. Checks run cheapest first and stop at the
+    first failure.
+
+    The landmarks found for an accepted face are kept on the result. Pass
+    them on as encode_faces(frame, locations, landmarks) so OnnxFaceBackend
+    aligns on them instead of running the landmark model again (dlib's
+    face_encodings always finds its own).
+    """
+
+    def __init__(
+        self,
+        min_size=80,
+        brightness=(40, 220),
+        min_sharpness=40.0,
+        max_yaw=0.35,
+        max_roll=20.0,
+        check_pose=True,
+    ):
+        self.min_size = min_size
+        self.brightness = brightness
+        self.min_sharpness = min_sharpness
+        self.max_yaw = max_yaw
+        self.max_roll = max_roll
+        self.check_pose = check_pose
+
+    def assess(self, frame_bgr, location, rgb=None):
+        """FaceQuality for the (top, right, bottom, left) box in `frame_bgr`."""
+        result = FaceQuality(tuple(int(v) for v in location))
+        top, right, bottom, left = result.location
+        height, width = frame_bgr.shape[:2]
+        top, bottom = max(0, top), min(height, bottom)
+        left, right = max(0, left), min(width, right)
+
+        result.size = min(bottom - top, right - left)
+        if result.size < self.min_size:
+            result.reason = "too small"
+            return result
+
+        gray = cv2.cvtColor(frame_bgr[top:bottom, left:right], cv2.COLOR_BGR2GRAY)
+        result.brightness = float(gray.mean())
+        low, high = self.brightness
+        if result.brightness < low:
+            result.reason = "too dark"
+            return result
+        if result.brightness > high:
+            result.reason = "too bright"
+            return result
+
+        small = cv2.resize(
+            gray, (SHARPNESS_SIZE, SHARPNESS_SIZE), interpolation=cv2.INTER_AREA
+        )
+        result.sharpness = float(cv2.Laplacian(small, cv2.CV_64F).var())
+        if result.sharpness < self.min_sharpness:
+            result.reason = "blurred"
+            return result
+
+        if self.check_pose:
+            if rgb is None:
+                rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+            (result.landmarks,) = face_landmarks(rgb, [result.location])
+            if result.landmarks is not None:
+                result.yaw, result.roll = pose_from_landmarks(result.landmarks)
+                if abs(result.roll) > self.max_roll:
+                    result.reason = "head tilted"
+                    return result
+                if abs(result.yaw) > self.max_yaw:
+                    result.reason = "not facing the mirror"
+                    return result
+
+        result.ok = True
+        return result
+
+    def best_face(self, frame_bgr, locations=None):
+        """
+        Largest acceptable face in the frame, else the largest rejected one
+        (check `.ok`), else None when there is no face. Without `locations`
+        the faces are found with face_recognition's HOG detector.
+        """
+        rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+        if locations is None:
+            if not has_face_recognition:
+                raise RuntimeError("Finding faces needs locations or face_recognition")
+            locations = face_recognition.face_locations(rgb)
+        results = [self.assess(frame_bgr, loc, rgb) for loc in locations]
+        if not results:
+            return None
+        return max(results, key=lambda r: (r.ok, r.size))
+
+
+def pose_from_landmarks(landmarks):
+    """(yaw, roll) from (left eye, right eye, nose) image points; see FaceQualityGate."""
+    left_eye, right_eye, nose = np.asarray(landmarks, dtype=np.float64)
+    dx, dy = right_eye - left_eye
+    eye_distance = max(math.hypot(dx, dy), 1e-6)
+    roll = math.degrees(math.atan2(dy, dx))
+    # Nose offset along the eye line, relative to the eye midpoint
+    offset = np.dot(nose - (left_eye + right_eye) / 2.0, (dx, dy)) / eye_distance
+    return float(offset / eye_distance), roll
@@ -0,0 +1,191 @@
+# /home/taran/self_discovery/src/user_management/profile_store.py
+# In-memory profile cache persisted as a JSON snapshot (user_profiles.json)
+# plus an append-only journal of per-user changes next to it:
+#   user_profiles.json          full snapshot, rewritten only on compaction
+#   user_profiles.json.journal  one {"op": "put"|"delete", ...} JSON line per change
+
+import copy
+import json
+import os
+import threading
+
+try:
+    from .embedding_store import (
+        attach_encodings,
+        detach_encodings,
+        migrate_profiles_file,
+        store_for,
+    )
+except ImportError:  # user_management dir on sys.path
+    from embedding_store import (
+        attach_encodings,
+        detach_encodings,
+        migrate_profiles_file,
+        store_for,
+    )
+
+JOURNAL_SUFFIX = ".journal"
+
+
+class ProfileStore:
+    """
+    Profiles are read from disk once and then served from memory. A change
+    to one user appends a single fsync'd journal line (its encodings go to
+    that user's .npy file first), so saving costs the same with 2 or 2000
+    users and a crash mid-write can at worst lose the torn last line. Once
+    the journal holds `compact_after` entries the snapshot is rewritten to a
+    temp file and renamed over the old one, and the journal is emptied.
+
+    Listeners registered with add_listener(callback) are called as
+    callback(user_id, profile) after every change; profile is None when the
+    user was deleted.
+    """
+
+    def __init__(self, path, template=None, embeddings=None, compact_after=64):
+        self.path = path
+        self.journal_path = path + JOURNAL_SUFFIX
+        self.template = template or {}
+        self.embeddings = embeddings or store_for(path)
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        self._listeners = []
+        self._on_disk = {}  # user_id -> profile as serialised (no arrays)
+        self._profiles = {}  # user_id -> profile with encodings attached
+        self._journal_entries = 0
+        self.reload()
+
+    # === Loading ===
+    def reload(self):
+        """Re-read snapshot + journal, e.g. after another process changed them."""
+        with self._lock:
+            self._on_disk = self._read_snapshot()
+            self._journal_entries = 0
+            for entry in self._read_journal():
+                self._apply(entry)
+                self._journal_entries += 1
+            self._profiles = {
+                user_id: self._materialise(profile)
+                for user_id, profile in self._on_disk.items()
+            }
+
+    def _read_snapshot(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            migrate_profiles_file(self.path, self.embeddings)
+            with open(self.path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            print(f"⚠️ Could not parse {self.path}, starting from an empty store")
+            return {}
+
+    def _read_journal(self):
+        if not os.path.exists(self.journal_path):
+            return
+        with open(self.journal_path, "r") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Torn write from a crash: everything before it is intact
+                    print("⚠️ Ignoring incomplete profile journal entry")
+                    return
+                yield entry
+
+    def _apply(self, entry):
+        if entry.get("op") == "put":
+            self._on_disk[entry["user_id"]] = entry["profile"]
+        elif entry.get("op") == "delete":
+            self._on_disk.pop(entry["user_id"], None)
+
+    def _materialise(self, on_disk):
+        profile = copy.deepcopy(on_disk)
+        for key, default_value in self.template.items():
+            if key not in profile:
+                profile[key] = copy.deepcopy(default_value)
+        # Encodings come back as read-only memory maps of the .npy files
+        return attach_encodings(profile, self.embeddings)
+
+    # === Reads ===
+    @property
+    def profiles(self):
+        """Shallow copy of the cached {user_id: profile} mapping."""
+        with self._lock:
+            return dict(self._profiles)
+
+    def get(self, user_id, default=None):
+        with self._lock:
+            return self._profiles.get(user_id, default)
+
+    def __contains__(self, user_id):
+        with self._lock:
+            return user_id in self._profiles
+
+    def __len__(self):
+        with self._lock:
+            return len(self._profiles)
+
+    # === Writes ===
+    def put(self, user_id, profile):
+        with self._lock:
+            on_disk = detach_encodings(user_id, profile, self.embeddings)
+            self._append({"op": "put", "user_id": user_id, "profile": on_disk})
+            self._on_disk[user_id] = on_disk
+            stored = self._profiles[user_id] = self._materialise(on_disk)
+            self._maybe_compact()
+        self._notify(user_id, stored)
+        return stored
+
+    def delete(self, user_id):
+        with self._lock:
+            if user_id not in self._on_disk:
+                return False
+            self._append({"op": "delete", "user_id": user_id})
+            self._on_disk.pop(user_id)
+            self._profiles.pop(user_id, None)
+            self.embeddings.delete(user_id)
+            self._maybe_compact()
+        self._notify(user_id, None)
+        return True
+
+    def _append(self, entry):
+        line = json.dumps(entry) + "\n"
+        with open(self.journal_path, "a") as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+        self._journal_entries += 1
+
+    def _maybe_compact(self):
+        if self._journal_entries >= self.compact_after:
+            self.compact()
+
+    def compact(self):
+        """Fold the journal into a fresh snapshot and truncate it."""
+        with self._lock:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self._on_disk, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            # Replaying a stale journal over the new snapshot is harmless, so
+            # a crash between the rename and this truncate loses nothing
+            if os.path.exists(self.journal_path):
+                os.remove(self.journal_path)
+            self._journal_entries = 0
+
+    # === Change notification ===
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        if callback in self._listeners:
+            self._listeners.remove(callback)
+
+    def _notify(self, user_id, profile):
+        for callback in list(self._listeners):
+            try:
+                callback(user_id, profile)
+            except Exception as e:
+                print(f"⚠️ Profile listener failed: {e}")
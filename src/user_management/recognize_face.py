@@ -3,45 +3,45 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import json
 import cv2
-import face_recognition
 import numpy as np
-from face_detection.face_detector import HailoFaceDetector
+from face_detection.face_detector import (
+    DETECTION_DTYPE,
+    HailoFaceDetector,
+    detections_to_locations,
+)
+from face_detection.face_tracker import FaceTracker
+from camera.activity_scheduler import IDENTIFY, SKIP, RecognitionScheduler
 from camera.camera_interface import CameraInterface
 from user_management.user_profiles import load_profiles
+from user_management.face_gallery import FaceGallery
+from user_management.embedding_service import get_embedding_service
+from user_management.face_quality import FaceQualityGate
 
 # Tunables
 RECOGNITION_THRESHOLD = 0.6
 DEBUG = True
 
-PROFILE_PATH = os.path.join(os.path.dirname(__file__), "user_profiles.json")
-
 
 def load_user_profiles():
-    with open(PROFILE_PATH, "r") as f:
-        return json.load(f)
-
-
-def compare_embeddings(known_embedding, new_embedding):
-    distance = face_recognition.face_distance([known_embedding], new_embedding)[0]
-    match = distance < RECOGNITION_THRESHOLD
-    return match, round(float(distance), 2)
+    # Encodings are memory-mapped from the embedding store
+    return load_profiles()
 
 
 def recognize_live_face():
     print("🟢 Starting face recognition. Press 'q' to quit.")
-    profiles = load_user_profiles()
-    known_users = {
-        user_id: data["facial_data"]["encodings"]
-        for user_id, data in profiles.items()
-        if data.get("facial_data") and data["facial_data"].get("encodings")
-    }
+    gallery = FaceGallery.from_profiles(load_user_profiles())
 
     camera = CameraInterface()
     detector = HailoFaceDetector("models/hailo/yolov5s_personface_h8l.hef")
+    detector.open()  # keep the vstream pipeline up for the whole session
 
-    frame_count = 0
+    embedder = get_embedding_service()
+    threshold = embedder.backend.threshold_for(RECOGNITION_THRESHOLD)
+    tracker = FaceTracker()
+    quality = FaceQualityGate(min_size=60, check_pose=False)
+    scheduler = RecognitionScheduler()
+    tracks = []
 
     try:
         while True:
@@ -50,42 +50,64 @@ def recognize_live_face():
                 print("Camera frame failed")
                 break
 
-            detections = detector.detect_faces(frame)
-            if DEBUG:
-                print(f"[DEBUG] Hailo detected {len(detections)} box(es)")
-
-            for x, y, w, h, score in detections:
-                frame_count += 1
-                label = "😴 Skipped frame"
-
-                # Run recognition every 5th frame
-                if frame_count % 5 == 0:
-                    face_image = frame[y : y + h, x : x + w]
-                    small_face = cv2.resize(face_image, (0, 0), fx=0.5, fy=0.5)
-                    rgb_face = cv2.cvtColor(small_face, cv2.COLOR_BGR2RGB)
-                    encodings = face_recognition.face_encodings(rgb_face)
-
-                    if encodings:
-                        embedding = encodings[0]
-                        matches = []
-
-                        for user_id, known_list in known_users.items():
-                            for idx, known in enumerate(known_list):
-                                match, dist = compare_embeddings(known, embedding)
-                                if DEBUG:
-                                    print(
-                                        f"[{user_id} #{idx+1}] dist={dist}, match={match}"
-                                    )
-                                if match:
-                                    matches.append((user_id, dist))
-
-                        if matches:
-                            uid, best = sorted(matches, key=lambda x: x[1])[0]
-                            label = f"✅ {uid} ({best})"
-                        else:
-                            label = "❓ Unknown face"
-                    else:
-                        label = "❌ No encoding"
+            # Idle room: only a motion check; skipped frames keep the last boxes
+            action = scheduler.next_action(frame)
+            if action != SKIP:
+                # Person boxes are dropped so only true face crops get embedded
+                detections = detector.detect_faces(frame, classes=("face",))
+                if DEBUG:
+                    print(f"[DEBUG] Hailo detected {len(detections)} face box(es)")
+
+                # Faces are followed across frames and only embedded when a new
+                # track appears or is due for re-verification. The Hailo box is
+                # the face location (no HOG pass), and all due faces of this
+                # frame are embedded together on the worker pool.
+                tracks = tracker.update(detections)
+                scheduler.observe_faces(len(detections))
+                due = tracker.due_for_embedding() if action == IDENTIFY else []
+                if due:
+                    locations = detections_to_locations(
+                        np.array([t.detection for t in due], dtype=DETECTION_DTYPE),
+                        frame.shape,
+                    )
+                    # Blurred, tiny or badly lit crops skip the embedding and are
+                    # retried when the tracker next reports them due
+                    checks = [quality.assess(frame, loc) for loc in locations]
+                    if DEBUG:
+                        for track, check in zip(due, checks):
+                            if not check.ok:
+                                print(
+                                    f"[track {track.track_id}] skipped: {check.reason}"
+                                )
+                    due = [t for t, c in zip(due, checks) if c.ok]
+                    checks = [c for c in checks if c.ok]
+                    encodings = embedder.encode_faces(
+                        frame,
+                        [c.location for c in checks],
+                        [c.landmarks for c in checks],
+                    )
+                    for track, encoding in zip(due, encodings):
+                        if encoding is None:
+                            tracker.identify(track.track_id, None)
+                            continue
+                        uid, best = gallery.best_match(
+                            encoding, threshold, embedder.backend.metric
+                        )
+                        tracker.identify(track.track_id, uid, best)
+                        if DEBUG:
+                            print(
+                                f"[track {track.track_id}] {uid} dist={best:.2f}, "
+                                f"match={uid is not None}"
+                            )
+
+            for track in tracks:
+                x, y, w, h = track.box
+                if track.user_id:
+                    label = f"✅ {track.user_id} ({track.distance:.2f})"
+                elif track.distance is not None:
+                    label = "❓ Unknown face"
+                else:
+                    label = "❌ No encoding"
 
                 # Draw results
                 cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
@@ -104,35 +126,27 @@ def recognize_live_face():
                 break
     finally:
         camera.stop()
-        detector.close()
+        detector.release()
         cv2.destroyAllWindows()
 
 
-def recognize_face(face_img_bgr):
-    profiles = load_user_profiles()
-    known_users = {
-        user_id: data["facial_data"]["encodings"]
-        for user_id, data in profiles.items()
-        if data.get("facial_data") and data["facial_data"].get("encodings")
-    }
+def recognize_face(face_img_bgr, gallery=None):
+    if gallery is None:
+        gallery = FaceGallery.from_profiles(load_user_profiles())
 
-    rgb_face = cv2.cvtColor(face_img_bgr, cv2.COLOR_BGR2RGB)
-    encodings = face_recognition.face_encodings(rgb_face)
+    # The image is already a face crop: encode it whole instead of searching it
+    height, width = face_img_bgr.shape[:2]
+    embedder = get_embedding_service()
+    (encoding,) = embedder.encode_faces(face_img_bgr, [(0, width, height, 0)])
 
-    if not encodings:
+    if encoding is None:
         return None
 
-    new_embedding = encodings[0]
-    best_match = None
-    best_score = float("inf")
-
-    for user_id, known_list in known_users.items():
-        for known in known_list:
-            match, dist = compare_embeddings(known, new_embedding)
-            if match and dist < best_score:
-                best_match = user_id
-                best_score = dist
-
+    best_match, _ = gallery.best_match(
+        encoding,
+        embedder.backend.threshold_for(RECOGNITION_THRESHOLD),
+        embedder.backend.metric,
+    )
     return best_match
 
 
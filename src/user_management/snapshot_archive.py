@@ -0,0 +1,301 @@
+# /home/taran/self_discovery/src/user_management/snapshot_archive.py
+# Per-user index of stored snapshots (SQLite, data/users/<id>/snapshots.sqlite)
+# with a face thumbnail per snapshot and a retention policy, so history
+# queries are index lookups instead of directory scans.
+
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+INDEX_NAME = "snapshots.sqlite"
+THUMBS_DIR = "thumbs"
+THUMB_SIZE = 112
+SNAPSHOT_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+# 2025-06-01_081500_morning.jpg, 2025-06-01_081500_snap1.jpg
+FILENAME_TIME = re.compile(r"(\d{4}-\d{2}-\d{2}_\d{6})")
+DAY = 24 * 3600
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS snapshots (
+    id INTEGER PRIMARY KEY,
+    taken_at REAL NOT NULL,
+    kind TEXT NOT NULL,
+    period TEXT,
+    path TEXT NOT NULL UNIQUE,
+    thumb TEXT,
+    top INTEGER, right INTEGER, bottom INTEGER, left INTEGER,
+    quality REAL,
+    embedding BLOB
+);
+CREATE INDEX IF NOT EXISTS snapshots_taken_at ON snapshots (taken_at);
+"""
+COLUMNS = (
+    "id",
+    "taken_at",
+    "kind",
+    "period",
+    "path",
+    "thumb",
+    "top",
+    "right",
+    "bottom",
+    "left",
+    "quality",
+    "embedding",
+)
+
+
+class SnapshotArchive:
+    """
+    Index of one folder per user under `root`. Each row holds when and why
+    a snapshot was taken (kind "registration" or "daily", period), its path
+    and thumbnail relative to the user folder, the face box, a quality score
+    (FaceQuality.sharpness) and the float32 embedding computed for it.
+
+    add() is called right after the image is written; latest()/history()
+    answer from the taken_at index whatever the archive size. retain()
+    applies the retention policy: daily snapshots are all kept for
+    `keep_daily_days`, after that only the best one per ISO week survives;
+    registration snapshots are never removed.
+
+    One SQLite connection per user, shared by all threads under a lock.
+    Rows come back as dicts with absolute `path` / `thumb`.
+    """
+
+    def __init__(self, root, thumb_size=THUMB_SIZE, keep_daily_days=30):
+        self.root = root
+        self.thumb_size = thumb_size
+        self.keep_daily_days = keep_daily_days
+        self._connections = {}
+        self._lock = threading.RLock()
+
+    def user_folder(self, user_id):
+        return os.path.join(self.root, user_id)
+
+    def _db(self, user_id):
+        db = self._connections.get(user_id)
+        if db is None:
+            folder = self.user_folder(user_id)
+            os.makedirs(folder, exist_ok=True)
+            db = sqlite3.connect(
+                os.path.join(folder, INDEX_NAME), check_same_thread=False
+            )
+            db.executescript(SCHEMA)
+            self._connections[user_id] = db
+        return db
+
+    def _row(self, user_id, values):
+        row = dict(zip(COLUMNS, values))
+        folder = self.user_folder(user_id)
+        row["path"] = os.path.join(folder, row["path"])
+        if row["thumb"]:
+            row["thumb"] = os.path.join(folder, row["thumb"])
+        if row["embedding"] is not None:
+            row["embedding"] = np.frombuffer(row["embedding"], dtype=np.float32)
+        if row["top"] is not None:
+            row["location"] = (row["top"], row["right"], row["bottom"], row["left"])
+        else:
+            row["location"] = None
+        return row
+
+    # === Writing ===
+    def add(
+        self,
+        user_id,
+        path,
+        taken_at=None,
+        kind="daily",
+        period=None,
+        frame=None,
+        location=None,
+        quality=None,
+        embedding=None,
+    ):
+        """
+        Index the snapshot at `path` (inside the user folder). With `frame`
+        and a face `location` a square face thumbnail is written alongside.
+        Returns the row id; re-adding a path replaces its row.
+        """
+        folder = self.user_folder(user_id)
+        rel_path = os.path.relpath(path, folder)
+        taken_at = time.time() if taken_at is None else taken_at
+        thumb = None
+        if frame is not None and location is not None:
+            thumb = self._write_thumb(folder, rel_path, frame, location)
+        box = tuple(int(v) for v in location) if location is not None else (None,) * 4
+        blob = None
+        if embedding is not None:
+            blob = np.asarray(embedding, dtype=np.float32).tobytes()
+
+        with self._lock:
+            db = self._db(user_id)
+            cursor = db.execute(
+                "INSERT OR REPLACE INTO snapshots (taken_at, kind, period, path,"
+                " thumb, top, right, bottom, left, quality, embedding)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (taken_at, kind, period, rel_path, thumb, *box, quality, blob),
+            )
+            db.commit()
+            return cursor.lastrowid
+
+    def _write_thumb(self, folder, rel_path, frame, location):
+        top, right, bottom, left = location
+        side = int(max(bottom - top, right - left) * 1.2)
+        cy, cx = (top + bottom) // 2, (left + right) // 2
+        height, width = frame.shape[:2]
+        y0, x0 = max(0, cy - side // 2), max(0, cx - side // 2)
+        crop = frame[y0 : min(height, y0 + side), x0 : min(width, x0 + side)]
+        if crop.size == 0:
+            return None
+        thumb = cv2.resize(
+            crop, (self.thumb_size, self.thumb_size), interpolation=cv2.INTER_AREA
+        )
+        name = os.path.splitext(os.path.basename(rel_path))[0] + ".jpg"
+        rel_thumb = os.path.join(THUMBS_DIR, name)
+        os.makedirs(os.path.join(folder, THUMBS_DIR), exist_ok=True)
+        cv2.imwrite(os.path.join(folder, rel_thumb), thumb)
+        return rel_thumb
+
+    # === Queries ===
+    def latest(self, user_id, count=3, kind=None):
+        """Newest `count` snapshots, newest first."""
+        query = f"SELECT {', '.join(COLUMNS)} FROM snapshots"
+        params = []
+        if kind is not None:
+            query += " WHERE kind = ?"
+            params.append(kind)
+        query += " ORDER BY taken_at DESC LIMIT ?"
+        params.append(count)
+        with self._lock:
+            rows = self._db(user_id).execute(query, params).fetchall()
+        return [self._row(user_id, r) for r in rows]
+
+    def history(self, user_id, since=None, until=None):
+        """Snapshots taken in [since, until), oldest first."""
+        since = float("-inf") if since is None else since
+        until = float("inf") if until is None else until
+        with self._lock:
+            rows = (
+                self._db(user_id)
+                .execute(
+                    f"SELECT {', '.join(COLUMNS)} FROM snapshots"
+                    " WHERE taken_at >= ? AND taken_at < ? ORDER BY taken_at",
+                    (since, until),
+                )
+                .fetchall()
+            )
+        return [self._row(user_id, r) for r in rows]
+
+    def count(self, user_id):
+        with self._lock:
+            return (
+                self._db(user_id)
+                .execute("SELECT COUNT(*) FROM snapshots")
+                .fetchone()[0]
+            )
+
+    # === Retention ===
+    def retain(self, user_id, now=None):
+        """
+        Drop daily snapshots older than keep_daily_days except the best per
+        ISO week (highest quality, then newest), with their files and
+        thumbnails. Returns the number removed.
+        """
+        now = time.time() if now is None else now
+        cutoff = now - self.keep_daily_days * DAY
+        with self._lock:
+            db = self._db(user_id)
+            old = db.execute(
+                "SELECT id, taken_at, quality, path, thumb FROM snapshots"
+                " WHERE kind = 'daily' AND taken_at < ?",
+                (cutoff,),
+            ).fetchall()
+            best = {}
+            for row in old:
+                week = datetime.fromtimestamp(row[1]).isocalendar()[:2]
+                rank = (row[2] if row[2] is not None else -1.0, row[1])
+                if week not in best or rank > best[week][0]:
+                    best[week] = (rank, row[0])
+            keep = {snapshot_id for _, snapshot_id in best.values()}
+            doomed = [row for row in old if row[0] not in keep]
+            if not doomed:
+                return 0
+            db.executemany(
+                "DELETE FROM snapshots WHERE id = ?", [(row[0],) for row in doomed]
+            )
+            db.commit()
+
+        folder = self.user_folder(user_id)
+        for row in doomed:
+            for rel in (row[3], row[4]):
+                if rel:
+                    try:
+                        os.remove(os.path.join(folder, rel))
+                    except FileNotFoundError:
+                        pass
+        return len(doomed)
+
+    def compact(self, user_id):
+        """Give the space of deleted rows back to the filesystem."""
+        with self._lock:
+            self._db(user_id).execute("VACUUM")
+
+    # === Migration ===
+    def import_folder(self, user_id):
+        """
+        Index loose snapshots of a user folder that are not indexed yet,
+        dated from their file name (else mtime). Returns how many were added.
+        """
+        folder = self.user_folder(user_id)
+        if not os.path.isdir(folder):
+            return 0
+        with self._lock:
+            known = {
+                r[0] for r in self._db(user_id).execute("SELECT path FROM snapshots")
+            }
+        added = 0
+        for name in sorted(os.listdir(folder)):
+            if not name.lower().endswith(SNAPSHOT_EXTENSIONS) or name in known:
+                continue
+            path = os.path.join(folder, name)
+            match = FILENAME_TIME.search(name)
+            if match:
+                taken_at = datetime.strptime(match.group(1), "%Y-%m-%d_%H%M%S")
+                taken_at = taken_at.timestamp()
+            else:
+                taken_at = os.path.getmtime(path)
+            kind = "registration" if "_snap" in name else "daily"
+            period = next(
+                (p for p in ("morning", "afternoon", "evening") if p in name), None
+            )
+            self.add(user_id, path, taken_at=taken_at, kind=kind, period=period)
+            added += 1
+        return added
+
+    def close(self):
+        with self._lock:
+            for db in self._connections.values():
+                db.close()
+            self._connections.clear()
+
+
+DEFAULT_ROOT = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "users")
+)
+_archive = None
+_archive_lock = threading.Lock()
+
+
+def get_snapshot_archive():
+    """Process-wide SnapshotArchive over data/users."""
+    global _archive
+    with _archive_lock:
+        if _archive is None:
+            _archive = SnapshotArchive(DEFAULT_ROOT)
+    return _archive
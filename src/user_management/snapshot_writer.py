@@ -0,0 +1,225 @@
+# /home/taran/self_discovery/src/user_management/snapshot_writer.py
+# Snapshot persistence on a background thread: image encoding and writing,
+# fsync, and the JSON / profile updates that go with a snapshot, so the UI
+# only hands over a frame.
+
+import copy
+import json
+import os
+import queue
+import threading
+
+import cv2
+
+IMAGE_FORMATS = {
+    "jpg": (".jpg", cv2.IMWRITE_JPEG_QUALITY),
+    "webp": (".webp", cv2.IMWRITE_WEBP_QUALITY),
+}
+FSYNC_POLICIES = ("never", "batch", "always")
+
+
+def _replace_atomically(path, data, sync):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        if sync:
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _fsync_path(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SnapshotWriter:
+    """
+    A single writer thread takes work from a queue in batches of up to
+    `batch_size` items:
+
+      save_image(frame, path)          encode (JPEG or WebP at `quality`) and
+                                       write; returns the final path at once
+      update_json(path, updates)       merge keys into a JSON object file
+      update_profile(user_id, update)  update(profile) edits a copy of the
+                                       stored profile, saved with store.put
+      call(fn, *args)                  run fn on the writer thread, in order
+
+    Images are written as they come; JSON and profile updates are merged per
+    file / per user and applied once at the end of the batch, so a burst of
+    snapshots costs one read-modify-write each. A call() sees every update
+    queued before it: pending merges are applied before it runs. Every file is written to a
+    temp name and renamed into place. `fsync` is "never", "batch" (images
+    and JSON files of a batch are synced together at its end) or "always".
+
+    The caller must not modify a frame after handing it over. Errors are
+    printed and the item is skipped. flush() waits for everything queued so
+    far, close() for everything and stops the thread.
+    """
+
+    def __init__(
+        self,
+        store=None,
+        image_format="jpg",
+        quality=90,
+        fsync="batch",
+        batch_size=16,
+    ):
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"image_format must be one of {list(IMAGE_FORMATS)}")
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}")
+        self.store = store
+        self.extension, quality_flag = IMAGE_FORMATS[image_format]
+        self.encode_params = [quality_flag, int(quality)]
+        self.fsync = fsync
+        self.batch_size = batch_size
+        self.images_written = 0
+        self.batches = 0
+        self._queue = queue.Queue()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="snapshot-writer", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    # === Submission (any thread) ===
+    def _put(self, item):
+        if self._closed:
+            raise RuntimeError("SnapshotWriter is closed")
+        self._queue.put(item)
+
+    def save_image(self, frame, path):
+        """Queue `frame` for writing; returns `path` with the format's extension."""
+        path = os.path.splitext(path)[0] + self.extension
+        self._put(("image", frame, path))
+        return path
+
+    def update_json(self, path, updates):
+        self._put(("json", path, dict(updates)))
+
+    def update_profile(self, user_id, update):
+        if self.store is None:
+            raise RuntimeError("SnapshotWriter needs a ProfileStore for profiles")
+        self._put(("profile", user_id, update))
+
+    def call(self, fn, *args):
+        self._put(("call", fn, args))
+
+    def flush(self):
+        self._queue.join()
+
+    def close(self):
+        if self._closed:
+            return
+        self._queue.put(None)
+        self._closed = True
+        self._thread.join()
+
+    # === Writer thread ===
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not None:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process([item for item in batch if item is not None])
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if batch[-1] is None:
+                return
+
+    def _process(self, batch):
+        json_updates = {}  # path -> merged updates
+        profile_updates = {}  # user_id -> [update, ...]
+        written = []
+        sync_each = self.fsync == "always"
+
+        for kind, *args in batch:
+            try:
+                if kind == "image":
+                    frame, path = args
+                    self._write_image(frame, path, sync_each)
+                    written.append(path)
+                elif kind == "json":
+                    path, updates = args
+                    json_updates.setdefault(path, {}).update(updates)
+                elif kind == "profile":
+                    user_id, update = args
+                    profile_updates.setdefault(user_id, []).append(update)
+                else:
+                    fn, fn_args = args
+                    self._apply_updates(json_updates, profile_updates, written)
+                    fn(*fn_args)
+            except Exception as e:
+                print(f"⚠️ Snapshot writer: {kind} failed: {e}")
+
+        self._apply_updates(json_updates, profile_updates, written)
+        if self.fsync == "batch" and written:
+            try:
+                for path in written:
+                    _fsync_path(path)
+                for folder in {os.path.dirname(os.path.abspath(p)) for p in written}:
+                    _fsync_path(folder)  # make the renames durable too
+            except Exception as e:
+                print(f"⚠️ Snapshot writer: fsync failed: {e}")
+        self.batches += 1
+
+    def _apply_updates(self, json_updates, profile_updates, written):
+        """Apply and clear the merged JSON / profile updates held so far."""
+        sync_each = self.fsync == "always"
+        for path, updates in json_updates.items():
+            try:
+                self._merge_json(path, updates, sync_each)
+                written.append(path)
+            except Exception as e:
+                print(f"⚠️ Snapshot writer: could not update {path}: {e}")
+        json_updates.clear()
+
+        for user_id, updates in profile_updates.items():
+            try:
+                self._update_profile(user_id, updates)
+            except Exception as e:
+                print(f"⚠️ Snapshot writer: could not save profile {user_id}: {e}")
+        profile_updates.clear()
+
+    def _write_image(self, frame, path, sync):
+        ok, data = cv2.imencode(self.extension, frame, self.encode_params)
+        if not ok:
+            raise ValueError(f"could not encode {path}")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _replace_atomically(path, data.tobytes(), sync)
+        self.images_written += 1
+
+    def _merge_json(self, path, updates, sync):
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            data = {}
+        data.update(updates)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        _replace_atomically(path, json.dumps(data, indent=2).encode("utf-8"), sync)
+
+    def _update_profile(self, user_id, updates):
+        current = self.store.get(user_id)
+        if current is None:
+            raise KeyError(user_id)
+        # Readers may hold the stored dict: edit a copy, then swap it in
+        profile = copy.deepcopy(current)
+        for update in updates:
+            update(profile)
+        self.store.put(user_id, profile)
@@ -1,8 +1,8 @@
+import copy
 import os
+import sys
 import cv2
-import json
 import time
-import face_recognition
 from datetime import datetime
 from PyQt5.QtWidgets import (
     QDialog,
@@ -18,6 +18,18 @@ from PyQt5.QtWidgets import (
 )
 from PyQt5.QtCore import QDate
 
+try:
+    from .embedding_service import get_embedding_service
+    from .face_quality import FaceQualityGate
+    from .profile_store import ProfileStore
+except ImportError:  # user_management dir on sys.path
+    from embedding_service import get_embedding_service
+    from face_quality import FaceQualityGate
+    from profile_store import ProfileStore
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+from weather.location_resolver import get_location_resolver
+
 USER_PROFILE_PATH = os.path.join(os.path.dirname(__file__), "user_profiles.json")
 USER_DATA_ROOT = os.path.abspath(
     os.path.join(os.path.dirname(__file__), "../../data/users")
@@ -26,7 +38,14 @@ USER_DATA_ROOT = os.path.abspath(
 DEFAULT_PROFILE_TEMPLATE = {
     "name": "",
     "registered": False,
-    "location": {"city": "", "state": "", "country": "", "lat": 0.0, "lon": 0.0},
+    "location": {
+        "city": "",
+        "state": "",
+        "country": "",
+        "lat": 0.0,
+        "lon": 0.0,
+        "timezone": None,
+    },
     "date_of_birth": None,
     "sex": None,
     "preferences": {"display_tips": True},
@@ -164,7 +183,8 @@ def create_new_user(name, camera=None, snapshot_count=3):
     user_folder = os.path.join(USER_DATA_ROOT, user_id)
     os.makedirs(user_folder, exist_ok=True)
 
-    profile = DEFAULT_PROFILE_TEMPLATE.copy()
+    # Deep copy: the nested location/facial_data dicts are filled in below
+    profile = copy.deepcopy(DEFAULT_PROFILE_TEMPLATE)
     profile["name"] = name
     profile["registered"] = True
 
@@ -179,11 +199,14 @@ def create_new_user(name, camera=None, snapshot_count=3):
         return
 
     profile["location"].update(location)
+    # Geocode once now so the UI never has to
+    get_location_resolver().resolve_into(profile["location"])
     profile["date_of_birth"] = dialog.get_dob()
     profile["sex"] = dialog.get_sex()
 
     embeddings = []
     training_images = []
+    gate = FaceQualityGate()
 
     for i in range(snapshot_count):
         msg = QMessageBox()
@@ -204,20 +227,28 @@ def create_new_user(name, camera=None, snapshot_count=3):
             continue
 
         frame = cv2.flip(frame, 1)
+        quality = gate.best_face(frame)
+        if quality is None:
+            print(f"⚠️ No face found in snapshot {i+1}. Skipped.")
+            continue
+        if not quality.ok:
+            print(f"⚠️ Snapshot {i+1} rejected ({quality.reason}). Skipped.")
+            continue
+
+        (encoding,) = get_embedding_service().encode_faces(
+            frame, [quality.location], [quality.landmarks]
+        )
+        if encoding is None:
+            print(f"⚠️ No face encoding for snapshot {i+1}. Skipped.")
+            continue
+
         timestamp = datetime.now().strftime("%Y-%m-%d_%H%M%S")
         filename = f"{timestamp}_snap{i+1}.jpg"
         image_path = os.path.join(user_folder, filename)
         cv2.imwrite(image_path, frame)
-
-        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        encodings = face_recognition.face_encodings(rgb)
-
-        if encodings:
-            embeddings.append(encodings[0].tolist())
-            training_images.append(image_path)
-            print(f"✅ Saved: {image_path}")
-        else:
-            print(f"⚠️ No face found in snapshot {i+1}. Skipped.")
+        embeddings.append(encoding.tolist())
+        training_images.append(image_path)
+        print(f"✅ Saved: {image_path}")
 
     if not embeddings:
         print("❌ No valid encodings. User not saved.")
@@ -231,23 +262,20 @@ def create_new_user(name, camera=None, snapshot_count=3):
     print(f"🎉 Registered '{name}' with {len(embeddings)} snapshot(s).")
 
 
+_profile_store = None
+
+
+def get_profile_store():
+    """Process-wide ProfileStore for USER_PROFILE_PATH, opened on first use."""
+    global _profile_store
+    if _profile_store is None:
+        _profile_store = ProfileStore(USER_PROFILE_PATH, DEFAULT_PROFILE_TEMPLATE)
+    return _profile_store
+
+
 def load_profiles():
-    if not os.path.exists(USER_PROFILE_PATH):
-        return {}
-    try:
-        with open(USER_PROFILE_PATH, "r") as f:
-            data = json.load(f)
-            for user_id, profile in data.items():
-                for key, default_value in DEFAULT_PROFILE_TEMPLATE.items():
-                    if key not in profile:
-                        profile[key] = default_value
-            return data
-    except json.JSONDecodeError:
-        return {}
+    return get_profile_store().profiles
 
 
 def save_profile(user_id, profile):
-    profiles = load_profiles()
-    profiles[user_id] = profile
-    with open(USER_PROFILE_PATH, "w") as f:
-        json.dump(profiles, f, indent=4)
+    return get_profile_store().put(user_id, profile)
@@ -0,0 +1,189 @@
+# /home/taran/self_discovery/src/weather/location_resolver.py
+# City/state/country -> lat/lon/timezone, resolved once per place and kept in
+# a JSON cache on disk, so the UI loop never geocodes or builds a new
+# TimezoneFinder (which loads its polygon data on construction).
+
+import json
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+try:
+    from geopy.geocoders import Nominatim
+
+    has_geopy = True
+except ImportError:
+    has_geopy = False
+
+try:
+    from timezonefinder import TimezoneFinder
+
+    has_timezonefinder = True
+except ImportError:
+    has_timezonefinder = False
+
+# Runtime state lives under data/ with the user folders, not in the source tree
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "location_cache.json")
+)
+GEOCODE_TIMEOUT = 5.0  # seconds
+
+_timezone_finder = None
+_timezone_finder_lock = threading.Lock()
+
+
+def get_timezone_finder():
+    """The process-wide TimezoneFinder, built on first use (None if unavailable)."""
+    global _timezone_finder
+    if _timezone_finder is None and has_timezonefinder:
+        with _timezone_finder_lock:
+            if _timezone_finder is None:
+                _timezone_finder = TimezoneFinder()
+    return _timezone_finder
+
+
+def location_key(location):
+    parts = [location.get(k, "") or "" for k in ("city", "state", "country")]
+    return "|".join(p.strip().lower() for p in parts)
+
+
+class LocationResolver:
+    """
+    Resolves profile location dicts to {"lat", "lon", "timezone"}. Results
+    are cached per (city, state, country) in `cache_path`, written through a
+    temp file + rename. A place that could not be geocoded is not written to
+    the cache, and this process does not ask for it again.
+
+    resolve() may block on the network for up to GEOCODE_TIMEOUT;
+    resolve_async() returns a Future instead, completed at once for a place
+    already known and otherwise geocoded on one background thread (one
+    request per place at a time, as Nominatim's usage policy asks).
+
+    `geocoder` (anything with geocode(query)) and `timezone_finder` (anything
+    with timezone_at(lng=, lat=)) default to Nominatim and the shared
+    TimezoneFinder.
+    """
+
+    def __init__(
+        self, cache_path=DEFAULT_CACHE_PATH, geocoder=None, timezone_finder=None
+    ):
+        self.cache_path = cache_path
+        self._geocoder = geocoder
+        self._timezone_finder = timezone_finder
+        self._lock = threading.Lock()
+        self._cache = self._load_cache()
+        self._failed = set()  # keys not found this run
+        self._pending = {}  # key -> Future of the lookup in progress
+        self._executor = None
+
+    def _load_cache(self):
+        if not self.cache_path or not os.path.exists(self.cache_path):
+            return {}
+        try:
+            with open(self.cache_path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _save_cache(self):
+        if not self.cache_path:
+            return
+        os.makedirs(os.path.dirname(self.cache_path) or ".", exist_ok=True)
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self._cache, f, indent=2)
+        os.replace(tmp_path, self.cache_path)
+
+    @property
+    def geocoder(self):
+        if self._geocoder is None and has_geopy:
+            self._geocoder = Nominatim(
+                user_agent="smart_mirror", timeout=GEOCODE_TIMEOUT
+            )
+        return self._geocoder
+
+    @property
+    def timezone_finder(self):
+        return self._timezone_finder or get_timezone_finder()
+
+    def timezone_at(self, lat, lon):
+        finder = self.timezone_finder
+        if finder is None:
+            return None
+        return finder.timezone_at(lng=lon, lat=lat)
+
+    def _known(self, key):
+        """(True, result) if `key` needs no lookup; call with the lock held."""
+        if not key.strip("|") or key in self._failed:
+            return True, None
+        if key in self._cache:
+            return True, dict(self._cache[key])
+        return False, None
+
+    def resolve(self, location):
+        """Cached {"lat", "lon", "timezone"} for a location dict, or None."""
+        key = location_key(location)
+        with self._lock:
+            known, result = self._known(key)
+        if known:
+            return result
+
+        query = ", ".join(
+            location.get(k) for k in ("city", "state", "country") if location.get(k)
+        )
+        try:
+            place = self.geocoder.geocode(query) if self.geocoder else None
+        except Exception as e:
+            print(f"⚠️ Geocoding '{query}' failed: {e}")
+            place = None
+        if place is None:
+            print(f"⚠️ Could not resolve '{query}'")
+            self._failed.add(key)
+            return None
+
+        lat, lon = float(place.latitude), float(place.longitude)
+        result = {"lat": lat, "lon": lon, "timezone": self.timezone_at(lat, lon)}
+        with self._lock:
+            self._cache[key] = result
+            self._save_cache()
+        print(f"📍 Resolved '{query}' to {lat:.4f}, {lon:.4f} ({result['timezone']})")
+        return dict(result)
+
+    def resolve_async(self, location):
+        """Future resolving to what resolve(location) returns."""
+        key = location_key(location)
+        with self._lock:
+            known, result = self._known(key)
+            if known:
+                future = Future()
+                future.set_result(result)
+                return future
+            future = self._pending.get(key)
+            if future is None:
+                if self._executor is None:
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=1, thread_name_prefix="geocode"
+                    )
+                future = self._executor.submit(self.resolve, dict(location))
+                self._pending[key] = future
+                future.add_done_callback(lambda _: self._pending.pop(key, None))
+            return future
+
+    def resolve_into(self, location):
+        """Fill lat/lon/timezone of a profile location in place; True on success."""
+        result = self.resolve(location)
+        if result is None:
+            return False
+        location.update(result)
+        return True
+
+
+_resolver = None
+
+
+def get_location_resolver():
+    """Process-wide LocationResolver over DEFAULT_CACHE_PATH."""
+    global _resolver
+    if _resolver is None:
+        _resolver = LocationResolver()
+    return _resolver
@@ -1,61 +1,107 @@
 # /home/taran/self_discovery/src/weather/open_meteo.py
 import requests
+from requests.adapters import HTTPAdapter
 
+try:
+    from .weather_service import WeatherService
+except ImportError:  # weather dir on sys.path
+    from weather_service import WeatherService
 
-def get_weather(location="default"):
-    """
-    Get current weather data for the specified location.
-    If location is \"default\", returns weather for Brasov, Romania.
-    Otherwise expects a dict with lat/lon and optional city/state/country fields.
-    """
-    try:
-        if location == "default":
-            lat = 45.6427
-            lon = 25.5887
-            location_name = "Brasov, Romania"
-        else:
-            lat = location.get("lat", 45.6427)
-            lon = location.get("lon", 25.5887)
-            city = location.get("city", "")
-            state = location.get("state", "")
-            country = location.get("country", "")
-            parts = [city, state, country]
-            location_name = ", ".join([p for p in parts if p])
-
-        url = (
-            f"https://api.open-meteo.com/v1/forecast?"
-            f"latitude={lat}&longitude={lon}&current=temperature_2m,weather_code,wind_speed_10m"
-            f"&temperature_unit=fahrenheit"
-        )
+OPEN_METEO_URL = "https://api.open-meteo.com/v1/forecast"
+DEFAULT_LOCATION = {"lat": 45.6427, "lon": 25.5887, "name": "Brasov, Romania"}
+REQUEST_TIMEOUT = 5.0  # seconds, connect + read
 
-        response = requests.get(url)
-        data = response.json()
 
-        temp = round(data["current"]["temperature_2m"])
-        weather_code = data["current"]["weather_code"]
-        wind = round(data["current"]["wind_speed_10m"])
-        condition = get_weather_condition(weather_code)
+class OpenMeteoClient:
+    """Current conditions from Open-Meteo over one pooled keep-alive session."""
 
+    def __init__(self, base_url=OPEN_METEO_URL, timeout=REQUEST_TIMEOUT, session=None):
+        self.base_url = base_url
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def fetch(self, lat, lon):
+        response = self.session.get(
+            self.base_url,
+            params={
+                "latitude": lat,
+                "longitude": lon,
+                "current": "temperature_2m,weather_code,wind_speed_10m",
+                "temperature_unit": "fahrenheit",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        current = response.json()["current"]
         return {
-            "temperature": temp,
-            "condition": condition,
-            "wind": wind,
-            "location": location_name,
+            "temperature": round(current["temperature_2m"]),
+            "condition": get_weather_condition(current["weather_code"]),
+            "wind": round(current["wind_speed_10m"]),
         }
 
+
+_service = None
+
+
+def get_weather_service():
+    """Process-wide WeatherService backed by Open-Meteo, created on first use."""
+    global _service
+    if _service is None:
+        _service = WeatherService(OpenMeteoClient().fetch)
+    return _service
+
+
+def location_query(location="default"):
+    """(lat, lon, display name) for "default" or a profile location dict."""
+    if location == "default":
+        return (
+            DEFAULT_LOCATION["lat"],
+            DEFAULT_LOCATION["lon"],
+            DEFAULT_LOCATION["name"],
+        )
+    lat = location.get("lat") or DEFAULT_LOCATION["lat"]
+    lon = location.get("lon") or DEFAULT_LOCATION["lon"]
+    parts = [
+        location.get("city", ""),
+        location.get("state", ""),
+        location.get("country", ""),
+    ]
+    name = ", ".join([p for p in parts if p]) or location.get("name", "Unknown")
+    return lat, lon, name
+
+
+def get_weather(location="default", wait=True, service=None):
+    """
+    Get current weather data for the specified location.
+    If location is \"default\", returns weather for Brasov, Romania.
+    Otherwise expects a dict with lat/lon and optional city/state/country fields.
+
+    Readings come from a shared cache (see WeatherService). With wait=False
+    the call never blocks; until the first reading arrives, or if the
+    service has never reached Open-Meteo, the values are "--" and the
+    condition is "Updating" while a first fetch is on its way, "Unavailable"
+    once one has failed.
+    """
+    lat, lon, name = location_query(location)
+    service = service or get_weather_service()
+    try:
+        reading = service.get(lat, lon, wait=wait)
     except Exception as e:
         print(f"Error getting weather: {e}")
-        fallback = (
-            "Brasov, Romania"
-            if location == "default"
-            else location.get("name", "Unknown")
-        )
+        reading = None
+
+    if reading is None:
+        updating = not wait and not service.failed(lat, lon)
         return {
-            "temperature": 50,
-            "condition": "Unknown",
-            "wind": 5,
-            "location": fallback,
+            "temperature": "--",
+            "condition": "Updating" if updating else "Unavailable",
+            "wind": "--",
+            "location": name,
         }
+    return dict(reading, location=name)
 
 
 def get_weather_condition(code):
@@ -0,0 +1,125 @@
+# /home/taran/self_discovery/src/weather/weather_service.py
+# Per-location cache in front of a weather fetch function: answers from memory
+# while fresh, refreshes in the background shortly before expiry, serves the
+# last good reading if a refresh fails, and runs at most one request per
+# location at a time.
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class _Entry:
+    __slots__ = ("data", "fetched_at", "failed_at", "pending")
+
+    def __init__(self):
+        self.data = None
+        self.fetched_at = None
+        self.failed_at = None
+        self.pending = None  # Future of the in-flight fetch, if any
+
+
+class WeatherService:
+    """
+    `fetch(lat, lon)` is called on a small worker pool and must return a
+    dict or raise. Readings are cached per location (coordinates rounded to
+    `precision` decimals, ~100 m at 3) for `ttl` seconds. A read within
+    `refresh_ahead` seconds of expiry still returns the cached value but
+    starts a background refresh; a read after expiry returns the stale value
+    too (stale-while-revalidate) unless there is none yet.
+
+    Concurrent callers asking for the same location share one in-flight
+    request. get(..., wait=False) never blocks: it returns None until the
+    first reading for that location has arrived. After a failed fetch the
+    location is not retried for `retry_after` seconds.
+    """
+
+    def __init__(
+        self,
+        fetch,
+        ttl=600.0,
+        refresh_ahead=120.0,
+        precision=3,
+        retry_after=30.0,
+        max_workers=2,
+        clock=time.monotonic,
+    ):
+        self.fetch = fetch
+        self.ttl = ttl
+        self.refresh_ahead = refresh_ahead
+        self.precision = precision
+        self.retry_after = retry_after
+        self.clock = clock
+        self.fetch_count = 0
+        self.error_count = 0
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="weather"
+        )
+
+    def _key(self, lat, lon):
+        return (round(float(lat), self.precision), round(float(lon), self.precision))
+
+    def _start_fetch(self, key, entry):
+        """Schedule a fetch unless one is running or backing off. Call with the lock held."""
+        backing_off = (
+            entry.failed_at is not None
+            and self.clock() - entry.failed_at < self.retry_after
+        )
+        if entry.pending is None and not backing_off:
+            entry.pending = self._executor.submit(self._refresh, key, entry)
+        return entry.pending  # None while backing off
+
+    def _refresh(self, key, entry):
+        try:
+            data = self.fetch(*key)
+        except Exception as e:
+            with self._lock:
+                self.error_count += 1
+                entry.failed_at = self.clock()
+                entry.pending = None
+            print(f"⚠️ Weather refresh for {key} failed: {e}")
+            return entry.data  # last good reading, possibly None
+        with self._lock:
+            self.fetch_count += 1
+            entry.data = data
+            entry.fetched_at = self.clock()
+            entry.failed_at = None
+            entry.pending = None
+        return data
+
+    def get(self, lat, lon, wait=True, timeout=None):
+        key = self._key(lat, lon)
+        with self._lock:
+            entry = self._entries.setdefault(key, _Entry())
+            if entry.data is not None:
+                age = self.clock() - entry.fetched_at
+                if age >= self.ttl - self.refresh_ahead:
+                    self._start_fetch(key, entry)
+                return entry.data
+            future = self._start_fetch(key, entry)
+
+        if not wait or future is None:
+            return None
+        return future.result(timeout=timeout)
+
+    def failed(self, lat, lon):
+        """True if the last fetch for this location failed."""
+        with self._lock:
+            entry = self._entries.get(self._key(lat, lon))
+            return entry is not None and entry.failed_at is not None
+
+    def prefetch(self, lat, lon):
+        """Warm the cache for a location without waiting."""
+        self.get(lat, lon, wait=False)
+
+    def invalidate(self, lat=None, lon=None):
+        with self._lock:
+            if lat is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(self._key(lat, lon), None)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,114 @@
+# Recall / latency benchmark: exact FaceGallery scan vs the IVF (ANN) backend
+# on synthetic 128-D dlib-like embeddings (10 encodings per user).
+# Usage: python tests/bench_ann.py [--sizes 1000 10000 100000] [--queries 200]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.ann_index import IVFIndex
+from user_management.face_gallery import FaceGallery
+
+# Distance cut-offs used by the GUI and recognize_face
+THRESHOLDS = (0.45, 0.6)
+# IVF must beat the exact scan by this much to be worth its recall risk
+MIN_SPEEDUP = 1.5
+
+
+def synthetic_gallery(num_vectors, per_user=10, seed=0):
+    """
+    dlib encodings of one person sit ~0.3-0.4 apart while different people are
+    ~0.9+ apart; user centres and per-capture noise are scaled to match.
+    """
+    rng = np.random.default_rng(seed)
+    num_users = num_vectors // per_user
+    centers = rng.normal(0, 0.07, size=(num_users, 128)).astype(np.float32)
+    noise = rng.normal(0, 0.02, size=(num_users, per_user, 128)).astype(np.float32)
+    return centers, centers[:, None, :] + noise
+
+
+def make_probes(centers, count, seed=1):
+    """Half enrolled users seen again, half strangers."""
+    rng = np.random.default_rng(seed)
+    known = centers[rng.integers(0, len(centers), count // 2)]
+    known = known + rng.normal(0, 0.02, known.shape).astype(np.float32)
+    strangers = rng.normal(0, 0.07, size=(count - len(known), 128)).astype(np.float32)
+    return np.concatenate([known, strangers])
+
+
+def build(encodings, ann=None):
+    gallery = FaceGallery(capacity=encodings.shape[0] * encodings.shape[1], ann=ann)
+    for i, user_encodings in enumerate(encodings):
+        gallery.add(f"user{i}", user_encodings)
+    return gallery
+
+
+def timed_queries(gallery, probes):
+    gallery.query(probes[:1])  # warm caches / train the index
+    results = []
+    start = time.perf_counter()
+    for probe in probes:
+        results.append(gallery.query(probe)[0][0, 0])
+    per_query = (time.perf_counter() - start) / len(probes)
+    decisions = {t: [m[0] for m in gallery.match(probes, t)] for t in THRESHOLDS}
+    return per_query, results, decisions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1000, 10000, 50000, 100000]
+    )
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--nprobe", type=int, default=8)
+    args = parser.parse_args()
+
+    print(
+        f"{'vectors':>8} {'exact ms':>9} {'ivf ms':>8} {'speedup':>8} {'train s':>8} "
+        f"{'recall@1':>9} " + " ".join(f"{'agree@' + str(t):>10}" for t in THRESHOLDS)
+    )
+    crossover = None
+    for size in sorted(args.sizes):
+        centers, encodings = synthetic_gallery(size)
+        probes = make_probes(centers, args.queries)
+
+        exact = build(encodings)
+        exact_t, exact_ids, exact_dec = timed_queries(exact, probes)
+
+        ann = build(encodings, ann=IVFIndex(nprobe=args.nprobe))
+        ann.ann_min_size = 0
+        start = time.perf_counter()
+        ann.query(probes[:1])
+        train_t = time.perf_counter() - start
+        ann_t, ann_ids, ann_dec = timed_queries(ann, probes)
+
+        # Recall over enrolled users only; a stranger's nearest user is arbitrary
+        known = len(probes) // 2
+        recall = np.mean([a == e for a, e in zip(ann_ids[:known], exact_ids[:known])])
+        agree = [
+            np.mean([a == e for a, e in zip(ann_dec[t], exact_dec[t])])
+            for t in THRESHOLDS
+        ]
+        print(
+            f"{size:>8} {exact_t * 1000:>9.3f} {ann_t * 1000:>8.3f} "
+            f"{exact_t / ann_t:>7.1f}x {train_t:>8.2f} {recall:>9.3f} "
+            + " ".join(f"{a:>10.3f}" for a in agree)
+        )
+        if exact_t / ann_t >= MIN_SPEEDUP:
+            crossover = size if crossover is None else crossover
+        else:
+            crossover = None  # only sizes from which IVF keeps winning count
+
+    if crossover is None:
+        print(f"IVF never reached {MIN_SPEEDUP}x: keep exact search (no ann=)")
+    else:
+        print(f"Recommended FaceGallery(ann_min_size=...): {crossover}")
+
+
+if __name__ == "__main__":
+    main()
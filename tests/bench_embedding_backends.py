@@ -0,0 +1,74 @@
+# Per-face CPU cost of each embedding backend (dlib ResNet vs an ONNX model).
+# Usage: python tests/bench_embedding_backends.py [--images data/users]
+#            [--model models/hailo/phase2_embedding/mobilefacenet.onnx] [--faces 1 4]
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.embedding_backends import (
+    MOBILEFACENET_PATH,
+    DlibBackend,
+    OnnxFaceBackend,
+    has_face_recognition,
+)
+
+
+def load_images(folder, limit=20):
+    images = []
+    if folder:
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                    image = cv2.imread(os.path.join(root, name))
+                    if image is not None:
+                        images.append(cv2.cvtColor(image, cv2.COLOR_BGR2RGB))
+    if not images:  # synthetic stand-ins: the cost does not depend on content
+        rng = np.random.default_rng(0)
+        images = [rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)]
+    return images[:limit]
+
+
+def time_backend(backend, images, faces, repeats=5):
+    boxes = [
+        (100 + 10 * i, 300 + 10 * i, 300 + 10 * i, 100 + 10 * i) for i in range(faces)
+    ]
+    backend(images[0], boxes)  # warm up (model load, first-run allocations)
+    start = time.process_time()
+    for _ in range(repeats):
+        for image in images:
+            backend(image, boxes)
+    return (time.process_time() - start) / (repeats * len(images) * faces)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images", default=None, help="folder of face snapshots")
+    parser.add_argument("--model", default=MOBILEFACENET_PATH)
+    parser.add_argument("--faces", type=int, nargs="+", default=[1, 4])
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    backends = {"mobilefacenet": OnnxFaceBackend(args.model)}
+    if has_face_recognition:
+        backends = {"dlib": DlibBackend(), **backends}
+
+    print(f"{'backend':<14} " + " ".join(f"{f'{n} face(s)':>12}" for n in args.faces))
+    for name, backend in backends.items():
+        try:
+            per_face = [time_backend(backend, images, n) * 1000 for n in args.faces]
+        except RuntimeError as e:
+            print(f"{name:<14} skipped: {e}")
+            continue
+        print(f"{name:<14} " + " ".join(f"{ms:>9.1f} ms" for ms in per_face))
+
+
+if __name__ == "__main__":
+    main()
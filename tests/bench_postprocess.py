@@ -0,0 +1,178 @@
+# Micro-benchmark: legacy per-row postprocess + O(n^2) NMS vs the vectorized path
+# Usage: python tests/bench_postprocess.py [--boxes 10 100 1000 10000] [--repeat 5]
+# Fails if NMS is slower than the legacy one at REALISTIC_BOXES raw boxes.
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.face_detection.face_detector import (
+    DETECTION_DTYPE,
+    HailoFaceDetector,
+    non_max_suppression,
+)
+from src.face_detection.hailo_runtime import FakeBackend
+
+
+def legacy_non_max_suppression(boxes, iou_threshold=0.4):
+    if len(boxes) == 0:
+        return []
+
+    boxes = sorted(boxes, key=lambda x: x[4], reverse=True)
+    selected_boxes = []
+
+    def iou(box1, box2):
+        x1, y1, w1, h1 = box1[:4]
+        x2, y2, w2, h2 = box2[:4]
+        xa = max(x1, x2)
+        ya = max(y1, y2)
+        xb = min(x1 + w1, x2 + w2)
+        yb = min(y1 + h1, y2 + h2)
+        inter_area = max(0, xb - xa) * max(0, yb - ya)
+        union_area = w1 * h1 + w2 * h2 - inter_area
+        return inter_area / union_area if union_area > 0 else 0
+
+    while boxes:
+        current = boxes.pop(0)
+        selected_boxes.append(current)
+        boxes = [box for box in boxes if iou(current, box) < iou_threshold]
+
+    return selected_boxes
+
+
+def legacy_decode(output_dict, input_shape, threshold=0.4):
+    detections = []
+    input_w, input_h = input_shape[1], input_shape[0]
+
+    for name, output_list in output_dict.items():
+        for item in output_list:
+            nested_items = item if isinstance(item, list) else [item]
+            for subitem in nested_items:
+                rows = subitem.reshape(-1, subitem.shape[-1])
+                for row in rows:
+                    x1, y1, x2, y2, score = row[:5]
+                    if score < threshold:
+                        continue
+                    x1 = max(0, int(x1 * input_w))
+                    y1 = max(0, int(y1 * input_h))
+                    x2 = min(input_w - 1, int(x2 * input_w))
+                    y2 = min(input_h - 1, int(y2 * input_h))
+                    w = x2 - x1
+                    h = y2 - y1
+                    if w > 0 and h > 0:
+                        detections.append((x1, y1, w, h, float(score)))
+    return detections
+
+
+def legacy_postprocess(output_dict, input_shape, threshold=0.4):
+    return legacy_non_max_suppression(
+        legacy_decode(output_dict, input_shape, threshold)
+    )
+
+
+# Raw boxes above threshold for a frame with a person or two in front of the mirror
+REALISTIC_BOXES = 10
+NOISE = 1.25
+
+
+def synthetic_outputs(num_boxes, num_classes=2, seed=0):
+    """Random boxes clustered around a few objects, like raw pre-NMS output."""
+    rng = np.random.default_rng(seed)
+    groups = []
+    per_class = num_boxes // num_classes
+    for _ in range(num_classes):
+        centers = rng.uniform(0.1, 0.9, size=(max(1, per_class // 50), 2))
+        idx = rng.integers(0, len(centers), size=per_class)
+        cxcy = centers[idx] + rng.normal(0, 0.02, size=(per_class, 2))
+        wh = rng.uniform(0.05, 0.2, size=(per_class, 2))
+        boxes = np.concatenate(
+            [cxcy - wh / 2, cxcy + wh / 2, rng.uniform(0, 1, (per_class, 1))], axis=1
+        )
+        groups.append(boxes.astype(np.float32))
+    return {"nms": [groups]}
+
+
+def best_of(fn, repeat, number=1):
+    """Best time per call over `repeat` runs of `number` calls each."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            result = fn()
+        best = min(best, (time.perf_counter() - start) / number)
+    return best, result
+
+
+def nms_inputs(outputs, input_shape):
+    """The same decoded boxes as legacy tuples and as a DETECTION_DTYPE array."""
+    raw = legacy_decode(outputs, input_shape)
+    return raw, np.array([row + (0,) for row in raw], dtype=DETECTION_DTYPE)
+
+
+def check_realistic_nms(detector, repeat=30, number=500):
+    """
+    NMS must keep up with the legacy one on a realistic frame's boxes. Both
+    are timed in alternation so clock and load drift hit them alike; at this
+    size both are pure Python and a few microseconds apart, so NOISE is
+    allowed on top.
+    """
+    raw, boxes = nms_inputs(synthetic_outputs(REALISTIC_BOXES, 1), detector.input_shape)
+    legacy_t = new_t = float("inf")
+    for _ in range(repeat):
+        legacy_t = min(
+            legacy_t, best_of(lambda: legacy_non_max_suppression(raw), 1, number)[0]
+        )
+        new_t = min(new_t, best_of(lambda: non_max_suppression(boxes), 1, number)[0])
+    print(
+        f"NMS at {REALISTIC_BOXES} raw boxes: legacy {legacy_t * 1e6:.1f} us, "
+        f"vectorized {new_t * 1e6:.1f} us ({legacy_t / new_t:.1f}x)"
+    )
+    assert (
+        new_t <= legacy_t * NOISE
+    ), f"NMS is slower than legacy at {REALISTIC_BOXES} boxes"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--boxes", type=int, nargs="+", default=[REALISTIC_BOXES, 100, 1000, 10000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    detector = HailoFaceDetector(backend=FakeBackend())
+
+    print(
+        f"{'boxes':>8} {'legacy ms':>12} {'vectorized ms':>14} {'speedup':>9} "
+        f"{'NMS speedup':>12} {'kept':>6}"
+    )
+    for n in args.boxes:
+        # One class group: the legacy path suppresses across classes, so this
+        # keeps both implementations producing the same boxes
+        outputs = synthetic_outputs(n, num_classes=1)
+        legacy_t, legacy = best_of(
+            lambda: legacy_postprocess(outputs, detector.input_shape), args.repeat
+        )
+        new_t, new = best_of(lambda: detector.postprocess(outputs), args.repeat)
+        assert len(legacy) == len(new), (len(legacy), len(new))
+
+        # NMS alone, on the same decoded boxes
+        raw, boxes = nms_inputs(outputs, detector.input_shape)
+        legacy_nms_t, _ = best_of(lambda: legacy_non_max_suppression(raw), args.repeat)
+        new_nms_t, _ = best_of(lambda: non_max_suppression(boxes), args.repeat)
+        print(
+            f"{n:>8} {legacy_t * 1000:>12.2f} {new_t * 1000:>14.2f} "
+            f"{legacy_t / new_t:>8.1f}x {legacy_nms_t / new_nms_t:>11.1f}x "
+            f"{len(new):>6}"
+        )
+
+    check_realistic_nms(detector)
+
+
+if __name__ == "__main__":
+    main()
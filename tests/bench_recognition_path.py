@@ -0,0 +1,94 @@
+# Per-recognition CPU cost on recorded frames: CPU HOG face_locations +
+# face_encodings (the old GUI path) vs accelerator face boxes passed to
+# face_encodings as known_face_locations.
+# Usage: python tests/bench_recognition_path.py --source recordings/hallway.mp4 \
+#            [--detector hailo|fake] [--hef PATH] [--frames 100]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from camera.frame_sources import ReplaySource
+from face_detection.face_detector import HailoFaceDetector, detections_to_locations
+from face_detection.hailo_runtime import FakeBackend
+
+try:
+    import face_recognition
+except ImportError:
+    sys.exit("face_recognition is required for this benchmark")
+
+DEFAULT_HEF_PATH = "/usr/share/hailo-models/yolov5s_personface_h8l.hef"
+
+
+def hog_path(frame, scale=0.5):
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    small_rgb = cv2.resize(rgb, (0, 0), fx=scale, fy=scale)
+    locations = face_recognition.face_locations(small_rgb)
+    return face_recognition.face_encodings(small_rgb, locations)
+
+
+def accelerated_path(frame, detector):
+    detections = detector.detect_faces(frame, classes=("face",))
+    rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    locations = detections_to_locations(detections, frame.shape)
+    return face_recognition.face_encodings(rgb, locations)
+
+
+def measure(frames, fn):
+    cpu, wall, faces = [], [], 0
+    for frame in frames:
+        cpu_start, wall_start = time.process_time(), time.perf_counter()
+        faces += len(fn(frame))
+        cpu.append(time.process_time() - cpu_start)
+        wall.append(time.perf_counter() - wall_start)
+    return np.array(cpu) * 1000.0, np.array(wall) * 1000.0, faces
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--source", required=True, help="video file or image folder")
+    parser.add_argument("--detector", choices=["hailo", "fake"], default="hailo")
+    parser.add_argument("--hef", default=DEFAULT_HEF_PATH)
+    parser.add_argument("--frames", type=int, default=100)
+    args = parser.parse_args()
+
+    source = ReplaySource(args.source, loop=False)
+    frames = []
+    while len(frames) < args.frames:
+        frame = source.read()
+        if frame is None:
+            break
+        frames.append(frame)
+    source.close()
+    if not frames:
+        sys.exit(f"No frames read from {args.source}")
+
+    backend = FakeBackend() if args.detector == "fake" else None
+    with HailoFaceDetector(args.hef, backend=backend) as detector:
+        accelerated_path(frames[0], detector)  # warm up the vstreams
+        results = {
+            "hog (cpu)": measure(frames, hog_path),
+            f"{args.detector} boxes": measure(
+                frames, lambda f: accelerated_path(f, detector)
+            ),
+        }
+
+    print(f"{len(frames)} frames from {args.source}")
+    print(
+        f"{'path':<14} {'cpu ms':>8} {'cpu p95':>8} {'wall ms':>8} {'wall p95':>9} {'faces':>6}"
+    )
+    for name, (cpu, wall, faces) in results.items():
+        print(
+            f"{name:<14} {cpu.mean():>8.1f} {np.percentile(cpu, 95):>8.1f} "
+            f"{wall.mean():>8.1f} {np.percentile(wall, 95):>9.1f} {faces:>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
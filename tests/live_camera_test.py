@@ -37,6 +37,7 @@ class CameraInterface:
 def main():
     print("[INFO] Initializing face detector...")
     detector = HailoFaceDetector(str(HEF_PATH))
+    detector.open()
 
     print("[INFO] Starting camera feed...")
     cam = CameraInterface()
@@ -48,7 +49,7 @@ def main():
             print(f"[DEBUG] Detections: {detections}")
             print(f"[DEBUG] Frame shape: {frame.shape}")
 
-            for x, y, w, h, score in detections:
+            for x, y, w, h, score, class_id in detections:
                 cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
                 cv2.putText(
                     frame,
@@ -68,7 +69,7 @@ def main():
         print("[INFO] Shutting down...")
         cam.stop()
         cv2.destroyAllWindows()
-        detector.close()
+        detector.release()
 
 
 if __name__ == "__main__":
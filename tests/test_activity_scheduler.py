@@ -0,0 +1,96 @@
+# RecognitionScheduler: idle / presence / identify states with hysteresis
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.camera.activity_scheduler import (
+    DETECT,
+    IDENTIFY,
+    IDLE,
+    PRESENCE,
+    SKIP,
+    MotionDetector,
+    RecognitionScheduler,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+STILL = np.full((120, 160, 3), 90, dtype=np.uint8)
+
+
+def moving(step):
+    frame = STILL.copy()
+    x = (step * 20) % 120
+    frame[30:90, x : x + 40] = 230
+    return frame
+
+
+def test_motion_detector_ignores_a_still_scene():
+    motion = MotionDetector()
+    assert motion.update(STILL) == 0.0
+    assert motion.update(STILL) == 0.0
+    assert motion.update(moving(1)) > 0.05
+
+
+def test_scheduler_walks_idle_presence_identify_and_back():
+    clock = FakeClock()
+    scheduler = RecognitionScheduler(lost_after=2.0, idle_after=5.0, clock=clock)
+
+    # Idle: rate-limited motion checks only, even with a still frame every tick
+    actions = []
+    for _ in range(10):
+        actions.append(scheduler.next_action(STILL))
+        clock.now += 0.1
+    assert set(actions) == {SKIP} and scheduler.state == IDLE
+
+    # Two motion samples in a row wake it up, and it detects straight away
+    step = 0
+    while scheduler.state == IDLE:
+        step += 1
+        action = scheduler.next_action(moving(step))
+        clock.now += 0.5
+    assert action == DETECT and scheduler.state == PRESENCE
+
+    scheduler.observe_faces(1)
+    assert scheduler.state == IDENTIFY
+    assert scheduler.next_action(STILL) == IDENTIFY
+
+    # A face lost briefly keeps identify (hysteresis), longer drops to presence
+    clock.now += 1.0
+    scheduler.observe_faces(0)
+    assert scheduler.state == IDENTIFY
+    clock.now += 1.5
+    scheduler.observe_faces(0)
+    assert scheduler.state == PRESENCE
+
+    clock.now += 6.0
+    scheduler.observe_faces(0)
+    assert scheduler.state == IDLE
+    assert scheduler.transitions == 4
+    spent = scheduler.time_in_states()
+    assert np.isclose(sum(spent.values()), clock.now)
+
+
+def test_rates_are_per_state():
+    clock = FakeClock()
+    scheduler = RecognitionScheduler(
+        rates={PRESENCE: 2.0}, motion_samples=1, clock=clock
+    )
+    scheduler.next_action(STILL)  # background
+    clock.now += 0.5
+    assert scheduler.next_action(moving(1)) == DETECT
+    clock.now += 0.25
+    assert scheduler.next_action(moving(2)) == SKIP
+    clock.now += 0.25
+    assert scheduler.next_action(moving(3)) == DETECT
@@ -0,0 +1,91 @@
+# Hardware-free checks for the pipelined detector using a simulated-latency backend
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.face_detection.face_detector import HailoFaceDetector
+from src.face_detection.hailo_runtime import FakeBackend
+
+
+class SlowCpuDetector(HailoFaceDetector):
+    """Detector whose CPU stages take `stage_latency` on top of their real work."""
+
+    def __init__(self, stage_latency, **kwargs):
+        super().__init__(**kwargs)
+        self.stage_latency = stage_latency
+
+    def preprocess(self, frame):
+        time.sleep(self.stage_latency)
+        return super().preprocess(frame)
+
+    def postprocess(self, *args, **kwargs):
+        time.sleep(self.stage_latency)
+        return super().postprocess(*args, **kwargs)
+
+
+def make_frame():
+    return np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_pipeline_returns_results_in_order():
+    boxes = np.array([[0.1, 0.1, 0.3, 0.4, 0.9]], dtype=np.float32)
+    backend = FakeBackend(detections=[boxes, np.zeros((0, 5), np.float32)])
+    with HailoFaceDetector(backend=backend) as detector:
+        detector.start_pipeline(queue_depth=8)
+        futures = [detector.submit(make_frame()) for _ in range(5)]
+        results = [f.result(timeout=5) for f in futures]
+    assert all(len(r) == 1 for r in results)
+
+
+def test_pipeline_overlaps_stages():
+    latency = 0.02
+    frames = 20
+    detector = SlowCpuDetector(latency, backend=FakeBackend(latency=latency))
+    with detector:
+        pipeline = detector.start_pipeline(queue_depth=frames)
+        start = time.perf_counter()
+        futures = [detector.submit(make_frame()) for _ in range(frames)]
+        for f in futures:
+            f.result(timeout=5)
+        elapsed = time.perf_counter() - start
+    assert pipeline.completed == frames
+    # Run one after another the three equal stages would take 3 * latency per
+    # frame; overlapped, throughput approaches 1 / latency
+    serial = frames * 3 * latency
+    assert elapsed < serial * 0.75
+
+
+def test_full_queue_drops_oldest_frame():
+    with HailoFaceDetector(backend=FakeBackend(latency=0.05)) as detector:
+        pipeline = detector.start_pipeline(queue_depth=1)
+        futures = [detector.submit(make_frame()) for _ in range(10)]
+        assert futures[-1].result(timeout=5) is not None
+        time.sleep(0.2)
+    assert pipeline.dropped > 0
+    assert any(f.cancelled() for f in futures[:-1])
+
+
+def test_cancelled_frames_leave_the_in_flight_count():
+    with HailoFaceDetector(backend=FakeBackend(latency=0.05)) as detector:
+        pipeline = detector.start_pipeline(queue_depth=8)
+        futures = [detector.submit(make_frame()) for _ in range(6)]
+        # The first frames are already in the stages; the last ones still wait
+        assert futures[-1].cancel() and futures[-2].cancel()
+        detector.submit(make_frame()).result(timeout=5)
+        assert pipeline.in_flight == 0
+        assert pipeline.dropped == 2
+
+
+def test_callback_and_asyncio_api():
+    received = []
+    with HailoFaceDetector(backend=FakeBackend()) as detector:
+        detector.submit(make_frame(), callback=received.append).result(timeout=5)
+        result = asyncio.run(detector.detect_async(make_frame()))
+    assert len(received) == 1
+    assert result is not None
@@ -0,0 +1,63 @@
+# Hardware-free checks for the persistent inference session in HailoFaceDetector
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.face_detection.face_detector import HailoFaceDetector
+from src.face_detection.hailo_runtime import FakeBackend
+
+
+def make_frame():
+    return np.zeros((480, 640, 3), dtype=np.uint8)
+
+
+def test_one_shot_mode_sets_up_pipeline_per_frame():
+    backend = FakeBackend()
+    detector = HailoFaceDetector(backend=backend)
+    for _ in range(5):
+        detector.detect_faces(make_frame())
+    assert backend.setup_count == 5
+    assert backend.infer_count == 5
+
+
+def test_session_keeps_pipeline_open_across_frames():
+    backend = FakeBackend()
+    with HailoFaceDetector(backend=backend) as detector:
+        assert detector.is_open
+        for _ in range(5):
+            detector.detect_faces(make_frame())
+    assert backend.setup_count == 1
+    assert backend.infer_count == 5
+    assert not backend.is_open
+
+
+def test_detector_can_be_opened_again_after_close():
+    backend = FakeBackend()
+    detector = HailoFaceDetector(backend=backend)
+    for _ in range(2):
+        with detector:
+            detector.detect_faces(make_frame())
+        assert not backend.is_open and not backend.released
+    assert backend.setup_count == 2
+    detector.release()
+    assert backend.released
+
+
+def test_session_measures_steady_state_latency():
+    backend = FakeBackend(latency=0.002, setup_latency=0.05)
+    with HailoFaceDetector(backend=backend) as detector:
+        detector.detect_faces(make_frame())
+        assert detector.last_inference_time < 0.05
+
+
+def test_fake_detections_are_decoded():
+    boxes = np.array([[0.1, 0.1, 0.3, 0.4, 0.9]], dtype=np.float32)
+    backend = FakeBackend(detections=[np.zeros((0, 5), np.float32), boxes])
+    with HailoFaceDetector(backend=backend) as detector:
+        detections = detector.detect_faces(make_frame())
+    assert len(detections) == 1
+    assert detections[0][4] > 0.89
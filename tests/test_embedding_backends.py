@@ -0,0 +1,143 @@
+# Embedding backends: ONNX Runtime plumbing on a tiny generated model,
+# alignment, and threshold calibration
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.embedding_backends import (
+    ARCFACE_EYES_NOSE,
+    OnnxFaceBackend,
+    align_face,
+    best_agreement_threshold,
+)
+
+
+def tiny_embedding_model(path, dim=128):
+    """NCHW 112x112 image -> per-channel means -> fixed projection to `dim`."""
+    onnx = pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    from onnx import TensorProto, helper, numpy_helper
+
+    weights = np.random.default_rng(0).normal(size=(3, dim)).astype(np.float32)
+    graph = helper.make_graph(
+        [
+            helper.make_node("GlobalAveragePool", ["input"], ["pooled"]),
+            helper.make_node("Flatten", ["pooled"], ["flat"]),
+            helper.make_node("MatMul", ["flat", "weights"], ["embedding"]),
+        ],
+        "tiny_face_net",
+        [
+            helper.make_tensor_value_info(
+                "input", TensorProto.FLOAT, [None, 3, 112, 112]
+            )
+        ],
+        [helper.make_tensor_value_info("embedding", TensorProto.FLOAT, [None, dim])],
+        [numpy_helper.from_array(weights, "weights")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    onnx.save(model, str(path))
+    return str(path)
+
+
+def test_onnx_backend_batches_and_normalises(tmp_path):
+    backend = OnnxFaceBackend(tiny_embedding_model(tmp_path / "net.onnx"), threads=1)
+    rgb = np.zeros((240, 320, 3), dtype=np.uint8)
+    rgb[20:80, 30:90] = (200, 30, 30)
+    rgb[100:180, 200:280] = (30, 30, 200)
+    boxes = [(20, 90, 80, 30), (100, 280, 180, 200)]
+
+    locations, encodings = backend(rgb, boxes)
+    assert locations == boxes
+    assert len(encodings) == 2 and encodings[0].shape == (128,)
+    assert np.allclose(np.linalg.norm(encodings, axis=1), 1.0, atol=1e-5)
+    assert np.dot(encodings[0], encodings[1]) < 0.99  # different faces differ
+    assert backend(rgb, []) == ([], [])
+
+
+def test_given_landmarks_are_not_searched_again(tmp_path, monkeypatch):
+    from user_management import embedding_backends
+
+    searched = []
+
+    def fake_landmarks(rgb, locations):
+        searched.extend(locations)
+        return [ARCFACE_EYES_NOSE + 10] * len(locations)
+
+    monkeypatch.setattr(embedding_backends, "face_landmarks", fake_landmarks)
+    backend = OnnxFaceBackend(str(tmp_path / "net.onnx"))
+    backend.embed = lambda crops: np.ones((len(crops), 4), np.float32)
+    rgb = np.zeros((240, 320, 3), dtype=np.uint8)
+    boxes = [(20, 90, 80, 30), (100, 280, 180, 200)]
+
+    backend(rgb, boxes, [ARCFACE_EYES_NOSE + 30, ARCFACE_EYES_NOSE + 100])
+    assert searched == []
+    backend(rgb, boxes, [ARCFACE_EYES_NOSE + 30, None])  # only the missing one
+    assert searched == [boxes[1]]
+
+
+def test_unreadable_model_is_reported(tmp_path):
+    pytest.importorskip("onnxruntime")
+    bad = tmp_path / "mobilefacenet.onnx"
+    bad.write_text("<!DOCTYPE html><html></html>")
+    with pytest.raises(RuntimeError, match="Could not load embedding model"):
+        OnnxFaceBackend(str(bad)).embed(np.zeros((1, 112, 112, 3), np.uint8))
+
+
+def test_alignment_puts_landmarks_on_template():
+    rgb = np.zeros((400, 400, 3), dtype=np.uint8)
+    # A tilted, larger face: eyes and nose scaled x2 and rotated a little
+    angle = np.deg2rad(15)
+    rot = np.array([[np.cos(angle), -np.sin(angle)], [np.sin(angle), np.cos(angle)]])
+    landmarks = (ARCFACE_EYES_NOSE * 2) @ rot.T + 100
+    for x, y in landmarks.astype(int):
+        rgb[y - 2 : y + 3, x - 2 : x + 3] = 255
+
+    aligned = align_face(rgb, (100, 324, 324, 100), landmarks.astype(np.float32))
+    assert aligned.shape == (112, 112, 3)
+    for x, y in ARCFACE_EYES_NOSE.round().astype(int):
+        assert aligned[y, x].max() > 100
+
+    fallback = align_face(rgb, (100, 324, 324, 100))
+    assert fallback.shape == (112, 112, 3)
+
+
+def test_best_agreement_threshold_reproduces_reference_decisions():
+    rng = np.random.default_rng(0)
+    same = rng.uniform(0.1, 0.3, 50)
+    different = rng.uniform(0.5, 0.9, 200)
+    distances = np.concatenate([same, different])
+    reference = np.r_[np.ones(50, bool), np.zeros(200, bool)]
+
+    threshold, agreement = best_agreement_threshold(distances, reference)
+    assert agreement == 1.0
+    assert same.max() < threshold < different.min()
+
+
+def test_calibration_file_maps_dlib_thresholds(tmp_path):
+    model = tmp_path / "net.onnx"
+    (tmp_path / "net.calibration.json").write_text(
+        json.dumps({"thresholds": {"0.45": 0.3, "0.6": 0.42}})
+    )
+    backend = OnnxFaceBackend(str(model))
+    assert backend.threshold_for(0.45) == 0.3
+    assert backend.threshold_for(0.525) == pytest.approx(0.36)
+    assert OnnxFaceBackend(str(tmp_path / "other.onnx")).threshold_for(0.6) == 0.5
+
+
+def test_onnx_backend_runs_in_the_worker_pool(tmp_path):
+    from user_management.embedding_service import EmbeddingService
+
+    backend = OnnxFaceBackend(tiny_embedding_model(tmp_path / "net.onnx"))
+    rgb_bgr = np.full((120, 160, 3), 90, dtype=np.uint8)
+    local = backend(rgb_bgr[..., ::-1].copy(), [(10, 70, 70, 10)])[1][0]
+
+    with EmbeddingService(workers=1, backend=backend) as service:
+        (remote,) = service.encode_faces(rgb_bgr, [(10, 70, 70, 10)])
+    assert np.allclose(remote, local, atol=1e-5)
@@ -0,0 +1,112 @@
+# EmbeddingService process pool + shared-memory transport, with a stand-in
+# encoder (face_recognition is not needed to exercise the plumbing)
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.embedding_service import EmbeddingService
+
+SLOW_ENCODE_SECONDS = 0.3
+
+
+def mean_color_encode(rgb, locations):
+    """Encodes a box as its mean R, G, B repeated; proves crop + colour order."""
+    if locations is None:
+        locations = [(0, rgb.shape[1], rgb.shape[0], 0)]
+    encodings = []
+    for top, right, bottom, left in locations:
+        mean = rgb[top:bottom, left:right].reshape(-1, 3).mean(axis=0)
+        encodings.append(np.resize(mean, 128))
+    return locations, encodings
+
+
+def slow_encode(rgb, locations):
+    time.sleep(SLOW_ENCODE_SECONDS)
+    return mean_color_encode(rgb, locations)
+
+
+def landmark_encode(rgb, locations, landmarks=None):
+    """Echoes the landmarks it was given, flattened, as the encoding."""
+    return locations, [np.asarray(marks, np.float32).ravel() for marks in landmarks]
+
+
+class BatchRecorder:
+    """Batching stand-in backend: encodes each box by its index in the call."""
+
+    batches = True
+
+    def __call__(self, rgb, locations, landmarks=None):
+        return locations, [np.full(4, len(locations), np.float32)] * len(locations)
+
+
+def make_frame():
+    frame = np.zeros((240, 320, 3), dtype=np.uint8)
+    frame[20:80, 30:90] = (255, 0, 0)  # blue face (BGR)
+    frame[100:180, 200:280] = (0, 0, 255)  # red face
+    return frame
+
+
+@pytest.fixture(scope="module")
+def service():
+    with EmbeddingService(workers=2, backend=mean_color_encode) as service:
+        yield service
+
+
+def test_faces_are_cropped_and_converted_to_rgb(service):
+    frame = make_frame()
+    blue, red, outside = service.encode_faces(
+        frame, [(20, 90, 80, 30), (100, 280, 180, 200), (500, 600, 550, 560)]
+    )
+    assert blue.dtype == np.float32 and blue.shape == (128,)
+    assert blue[:3].tolist() == [0.0, 0.0, 255.0]
+    assert red[:3].tolist() == [255.0, 0.0, 0.0]
+    assert outside is None
+
+
+def test_whole_frame_and_oversized_slot(service):
+    frame = np.full((1080, 1920, 3), (10, 20, 30), dtype=np.uint8)  # > slot size
+    locations, encodings = service.encode_frame(frame)
+    assert locations == [(0, 1920, 1080, 0)]
+    assert encodings[0][:3].tolist() == [30.0, 20.0, 10.0]
+
+
+def test_landmarks_are_moved_into_the_crop():
+    marks = np.array([[50.0, 40.0], [70.0, 40.0], [60.0, 60.0]], np.float32)
+    with EmbeddingService(workers=1, backend=landmark_encode) as service:
+        (encoding,) = service.encode_faces(make_frame(), [(20, 90, 80, 30)], [marks])
+    # The box is cropped with a 50% margin: from x=0 (clipped), y=0 (clipped)
+    assert encoding.reshape(3, 2).tolist() == marks.tolist()
+
+    frame = np.zeros((400, 400, 3), np.uint8)
+    with EmbeddingService(workers=1, backend=landmark_encode) as service:
+        (encoding,) = service.encode_faces(frame, [(200, 260, 260, 200)], [marks + 200])
+    # Crop starts at (170, 170)
+    assert encoding.reshape(3, 2).tolist() == (marks + 30).tolist()
+
+
+def test_batching_backend_gets_all_faces_of_a_frame_at_once():
+    boxes = [(20, 90, 80, 30), (100, 280, 180, 200), (500, 600, 550, 560)]
+    with EmbeddingService(workers=2, backend=BatchRecorder()) as service:
+        first, second, outside = service.encode_faces(make_frame(), boxes)
+    assert first[0] == second[0] == 2  # one call with both faces in the frame
+    assert outside is None
+
+
+def test_faces_of_one_frame_run_in_parallel():
+    with EmbeddingService(workers=4, backend=slow_encode) as service:
+        frame = make_frame()
+        boxes = [(20, 90, 80, 30)] * 4
+        service.encode_faces(frame, boxes)  # start the worker processes
+
+        start = time.perf_counter()
+        encodings = service.encode_faces(frame, boxes)
+        elapsed = time.perf_counter() - start
+
+    assert len(encodings) == 4
+    assert elapsed < 2.5 * SLOW_ENCODE_SECONDS  # serial would be 4x
@@ -0,0 +1,75 @@
+# Checks for the binary embedding store and the inline-JSON migration
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.embedding_store import (
+    attach_encodings,
+    detach_encodings,
+    migrate_profiles_file,
+    store_for,
+)
+
+
+def test_save_and_mmap_load_roundtrip(tmp_path):
+    store = store_for(tmp_path / "user_profiles.json")
+    encodings = np.random.default_rng(0).normal(size=(4, 128))
+    ref = store.save("Ana Maria", encodings)
+
+    loaded = store.load(ref)
+    assert isinstance(loaded, np.memmap)
+    assert loaded.dtype == np.float32 and loaded.shape == (4, 128)
+    assert np.allclose(loaded, encodings, atol=1e-6)
+    assert len(store.load(None)) == 0
+
+
+def test_encodings_keep_their_width(tmp_path):
+    store = store_for(tmp_path / "user_profiles.json")
+    wide = np.random.default_rng(2).normal(size=(2, 512))
+    assert store.load(store.save("ana", wide)).shape == (2, 512)
+    with pytest.raises(ValueError):
+        store.save("ana", wide.ravel())  # a flat list is not reshaped into faces
+
+
+def test_migration_moves_inline_encodings_out_of_json(tmp_path):
+    path = tmp_path / "user_profiles.json"
+    encodings = np.random.default_rng(1).normal(size=(3, 128)).tolist()
+    path.write_text(
+        json.dumps(
+            {
+                "ana": {"name": "Ana", "facial_data": {"encodings": encodings}},
+                "bob": {"name": "Bob", "facial_data": {"encodings": []}},
+            }
+        )
+    )
+
+    assert migrate_profiles_file(str(path))
+    assert not migrate_profiles_file(str(path))  # one-time
+
+    on_disk = json.loads(path.read_text())
+    assert "encodings" not in on_disk["ana"]["facial_data"]
+    assert on_disk["ana"]["facial_data"]["encoding_count"] == 3
+
+    store = store_for(path)
+    ana = attach_encodings(on_disk["ana"], store)
+    bob = attach_encodings(on_disk["bob"], store)
+    assert np.allclose(ana["facial_data"]["encodings"], encodings, atol=1e-6)
+    assert len(bob["facial_data"]["encodings"]) == 0
+
+
+def test_detach_writes_only_the_saved_user(tmp_path):
+    store = store_for(tmp_path / "user_profiles.json")
+    profile = {"name": "Ana", "facial_data": {"encodings": np.ones((2, 128))}}
+    on_disk = detach_encodings("ana", profile, store)
+    assert on_disk["facial_data"] == {
+        "encodings_file": store.relative_path("ana"),
+        "encoding_count": 2,
+    }
+    # The in-memory profile keeps its array
+    assert profile["facial_data"]["encodings"].shape == (2, 128)
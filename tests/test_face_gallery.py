@@ -0,0 +1,115 @@
+# Checks for the vectorized FaceGallery index against brute-force distances
+import sys
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.face_gallery import FaceGallery
+
+
+def random_users(n_users=20, per_user=5, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(0, 0.1, size=(n_users, 128))
+    return {
+        f"user{i}": centers[i] + rng.normal(0, 0.02, size=(per_user, 128))
+        for i in range(n_users)
+    }
+
+
+def brute_force(users, probe):
+    return min(
+        (
+            (uid, np.linalg.norm(encs - probe, axis=1).min())
+            for uid, encs in users.items()
+        ),
+        key=lambda x: x[1],
+    )
+
+
+def test_nearest_user_matches_brute_force():
+    users = random_users()
+    gallery = FaceGallery()
+    for uid, encs in users.items():
+        gallery.add(uid, encs)
+
+    rng = np.random.default_rng(1)
+    probes = [users[f"user{i}"][0] + rng.normal(0, 0.01, 128) for i in range(20)]
+    ids, dists = gallery.query(probes, k=3)
+    for probe, row_ids, row_d in zip(probes, ids, dists):
+        uid, dist = brute_force(users, probe)
+        assert row_ids[0] == uid
+        assert abs(row_d[0] - dist) < 1e-4
+        assert row_d[0] <= row_d[1] <= row_d[2]
+
+
+def test_threshold_and_incremental_updates():
+    users = random_users(n_users=3)
+    gallery = FaceGallery.from_profiles(
+        {
+            **{
+                uid: {"facial_data": {"encodings": encs.tolist()}}
+                for uid, encs in users.items()
+            },
+            "legacy": {"facial_data": None},  # stored before any capture
+        }
+    )
+    assert "legacy" not in gallery
+    probe = users["user1"][2]
+    assert gallery.best_match(probe, threshold=0.45)[0] == "user1"
+
+    gallery.remove("user1")
+    assert "user1" not in gallery and len(gallery) == 10
+    assert gallery.best_match(probe, threshold=0.01)[0] is None
+
+    gallery.replace("user1", users["user1"][:2])
+    assert gallery.best_match(users["user1"][1], threshold=0.01)[0] == "user1"
+    assert len(gallery) == 12
+
+
+def test_empty_gallery_returns_no_match():
+    gallery = FaceGallery()
+    assert gallery.best_match(np.zeros(128), threshold=0.6) == (None, float("inf"))
+
+
+def test_ivf_backend_keeps_threshold_decisions():
+    from user_management.ann_index import IVFIndex
+
+    users = random_users(n_users=200, per_user=10, seed=4)
+    exact = FaceGallery()
+    approx = FaceGallery(ann=IVFIndex(nlist=16, nprobe=4), ann_min_size=0)
+    for uid, encs in users.items():
+        exact.add(uid, encs)
+        approx.add(uid, encs)
+
+    rng = np.random.default_rng(5)
+    probes = np.array([users[f"user{i}"][0] for i in range(0, 200, 7)])
+    probes = probes + rng.normal(0, 0.01, probes.shape)
+    for threshold in (0.45, 0.6):
+        assert [m[0] for m in approx.match(probes, threshold)] == [
+            m[0] for m in exact.match(probes, threshold)
+        ]
+
+    # Incremental updates go straight into the trained cells
+    approx.replace("user0", users["user0"][:3])
+    assert approx.best_match(users["user0"][1], 0.45)[0] == "user0"
+
+
+def test_dimension_comes_from_first_encodings_and_is_enforced():
+    rng = np.random.default_rng(2)
+    gallery = FaceGallery()
+    ana = rng.normal(size=(3, 512))
+    gallery.add("ana", ana)
+    assert gallery.dim == 512 and len(gallery) == 3
+    assert gallery.best_match(ana[1], threshold=0.1)[0] == "ana"
+
+    # A 512-D vector is never split into four 128-D "faces", nor the reverse
+    with pytest.raises(ValueError):
+        gallery.add("bob", rng.normal(size=(1, 128)))
+    with pytest.raises(ValueError):
+        gallery.query(rng.normal(size=128))
+    # Nothing enrolled yet: any probe simply has no match
+    assert FaceGallery().best_match(ana[0], threshold=1.0) == (None, np.inf)
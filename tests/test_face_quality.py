@@ -0,0 +1,67 @@
+# Face quality gate: size, exposure, blur and pose checks ahead of embedding
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.face_quality import FaceQualityGate, pose_from_landmarks
+
+BOX = (100, 300, 300, 100)  # top, right, bottom, left
+
+
+def textured_frame(seed=0):
+    rng = np.random.default_rng(seed)
+    frame = np.full((400, 400, 3), 128, dtype=np.uint8)
+    noise = rng.integers(40, 216, size=(200, 200), dtype=np.uint8)
+    frame[100:300, 100:300] = noise[..., None]
+    return frame
+
+
+def test_sharp_face_passes_and_blur_is_rejected():
+    gate = FaceQualityGate(check_pose=False)
+    frame = textured_frame()
+    sharp = gate.assess(frame, BOX)
+    assert sharp.ok and sharp.sharpness > gate.min_sharpness
+
+    blurred = gate.assess(cv2.GaussianBlur(frame, (31, 31), 10), BOX)
+    assert not blurred.ok and blurred.reason == "blurred"
+
+
+def test_small_and_badly_lit_faces_are_rejected_before_blur():
+    gate = FaceQualityGate(check_pose=False)
+    frame = textured_frame()
+    small = gate.assess(frame, (100, 150, 150, 100))
+    assert small.reason == "too small" and small.sharpness is None
+
+    dark = gate.assess((frame // 8).astype(np.uint8), BOX)
+    assert dark.reason == "too dark" and dark.sharpness is None
+    bright = gate.assess(np.full_like(frame, 250), BOX)
+    assert bright.reason == "too bright"
+
+
+def test_best_face_prefers_the_largest_acceptable_one():
+    gate = FaceQualityGate(check_pose=False)
+    frame = textured_frame()
+    frame[0:100, 0:100] = 0  # a dark "face" in the corner
+    best = gate.best_face(frame, [(0, 100, 100, 0), (120, 280, 280, 120), BOX])
+    assert best.ok and best.location == BOX
+    assert gate.best_face(frame, []) is None
+    assert not gate.best_face(frame, [(0, 100, 100, 0)]).ok
+
+
+def test_pose_from_landmarks():
+    frontal = [(40, 50), (80, 50), (60, 75)]
+    yaw, roll = pose_from_landmarks(frontal)
+    assert abs(yaw) < 1e-6 and abs(roll) < 1e-6
+
+    turned = [(40, 50), (80, 50), (76, 75)]
+    yaw, _ = pose_from_landmarks(turned)
+    assert np.isclose(yaw, 0.4)
+
+    tilted = [(40, 50), (80, 90), (55, 85)]
+    _, roll = pose_from_landmarks(tilted)
+    assert np.isclose(roll, 45.0)
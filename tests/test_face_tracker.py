@@ -0,0 +1,63 @@
+# FaceTracker: identities carried across frames, embeddings only when due
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.face_detection.face_detector import DETECTION_DTYPE
+from src.face_detection.face_tracker import FaceTracker
+
+
+def boxes(*rows):
+    out = np.zeros(len(rows), dtype=DETECTION_DTYPE)
+    for i, (x, y, w, h) in enumerate(rows):
+        out[i] = (x, y, w, h, 0.9, 2)
+    return out
+
+
+def test_moving_faces_keep_their_track_ids():
+    tracker = FaceTracker()
+    first = tracker.update(boxes((10, 10, 100, 100), (300, 50, 80, 80)))
+    # Both faces drift a few pixels, and come back in the other order
+    second = tracker.update(boxes((305, 52, 80, 80), (14, 12, 100, 100)))
+    assert [t.track_id for t in second] == [first[1].track_id, first[0].track_id]
+    assert second[1].box == (14, 12, 100, 100)
+    assert second[1].hits == 2
+
+
+def test_each_track_is_embedded_once_then_reverified():
+    tracker = FaceTracker(retry_every=3, reverify_every=5)
+    face = boxes((10, 10, 100, 100))
+
+    requests = []
+    for frame in range(12):
+        (track,) = tracker.update(face)
+        due = tracker.due_for_embedding()
+        requests.append(len(due))
+        if due and frame == 0:
+            tracker.identify(track.track_id, None)  # not recognized yet
+        elif due:
+            tracker.identify(track.track_id, "ana", 0.3)
+
+    # frame 0: new; frame 3: retry while unknown; then every 5 frames
+    assert requests == [1, 0, 0, 1, 0, 0, 0, 0, 1, 0, 0, 0]
+    assert tracker.tracks[track.track_id].user_id == "ana"
+
+
+def test_new_arrival_is_embedded_immediately_and_lost_tracks_expire():
+    tracker = FaceTracker(max_missed=2)
+    tracker.update(boxes((10, 10, 100, 100)))
+    tracker.due_for_embedding()
+
+    tracker.update(boxes((12, 10, 100, 100), (300, 300, 90, 90)))
+    due = tracker.due_for_embedding()
+    assert [t.box for t in due] == [(300, 300, 90, 90)]
+
+    for _ in range(3):
+        tracker.update(boxes())
+    assert tracker.tracks == {}
+    (returning,) = tracker.update(boxes((12, 10, 100, 100)))
+    assert returning.track_id == 3 and tracker.due_for_embedding() == [returning]
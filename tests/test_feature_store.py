@@ -0,0 +1,120 @@
+# Skin metrics computed once per snapshot and the columnar FeatureStore
+import os
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_analysis.feature_store import DAY, FeatureStore, rolling_mean
+from user_analysis.skin_analyzer import analyze_face_history, load_features, skin_trend
+from user_analysis.skin_metrics import METRIC_NAMES, compute_skin_metrics
+from user_management.snapshot_archive import SnapshotArchive
+
+BOX = (20, 120, 120, 20)  # top, right, bottom, left
+
+
+def face(bgr, spots=0):
+    frame = np.zeros((140, 140, 3), dtype=np.uint8)  # dark background
+    frame[20:120, 20:120] = bgr
+    for i in range(spots):
+        y, x = 45 + (i // 4) * 12, 45 + (i % 4) * 12
+        frame[y : y + 6, x : x + 6] = (40, 40, 220)
+    return frame
+
+
+def test_metrics_measure_the_face_region_only():
+    metrics = compute_skin_metrics(face((120, 140, 180)), BOX)
+    assert set(metrics) == set(METRIC_NAMES)
+    whole = compute_skin_metrics(face((120, 140, 180)))
+    assert metrics["brightness"] > whole["brightness"]  # background excluded
+    assert metrics["a_mean"] > 0 and metrics["texture"] < 1.0
+
+    blotchy = compute_skin_metrics(face((120, 140, 180), spots=8), BOX)
+    assert blotchy["redness"] > metrics["redness"] == 0.0
+    assert blotchy["texture"] > metrics["texture"]
+    assert compute_skin_metrics(face((0, 0, 0)), (50, 50, 50, 50)) is None
+
+
+def test_columns_append_load_and_survive_a_torn_row(tmp_path):
+    store = FeatureStore(str(tmp_path))
+    for i, value in enumerate([3.0, 1.0, 2.0]):
+        # Appended out of order, as a backfill would
+        store.append("ana", 100.0 * value, {"brightness": value}, snapshot_id=i)
+    columns = store.load("ana")
+    assert columns["taken_at"].tolist() == [100.0, 200.0, 300.0]
+    assert columns["snapshot"].tolist() == [1, 2, 0]
+    assert np.isnan(columns["redness"]).all()
+
+    # A crash after the first column of a row was written
+    with open(os.path.join(store.folder("ana"), "taken_at.f8"), "ab") as f:
+        f.write(np.float64(999.0).tobytes())
+    assert store.count("ana") == 3
+    store.append("ana", 400.0, {"brightness": 4.0})
+    assert store.latest("ana", 2)["brightness"].tolist() == [3.0, 4.0]
+
+
+def test_rolling_mean_uses_a_trailing_time_window():
+    times = np.array([0, 1, 2, 10, 11], dtype=np.float64) * DAY
+    values = np.array([1.0, 3.0, np.nan, 10.0, 20.0])
+    means = rolling_mean(times, values, window=3 * DAY)
+    assert np.allclose(means, [1.0, 2.0, 2.0, 10.0, 15.0])
+
+
+def test_analysis_backfills_once_then_reads_features(tmp_path):
+    folder = tmp_path / "bob"
+    folder.mkdir()
+    for day, level in enumerate([60, 62, 64]):
+        cv2.imwrite(
+            str(folder / f"2025-06-0{day + 1}_081500_morning.jpg"),
+            np.full((80, 80, 3), level, dtype=np.uint8),
+        )
+
+    assert "dull" in analyze_face_history("bob", str(folder))
+    archive = SnapshotArchive(str(tmp_path))
+    store = FeatureStore(str(tmp_path))
+    assert store.count("bob") == 3
+    # The images are no longer needed for the analysis
+    for path in folder.glob("*.jpg"):
+        path.unlink()
+    assert "dull" in analyze_face_history("bob", archive=archive, features=store)
+
+    times, trend = skin_trend("bob", window_days=2, archive=archive, features=store)
+    assert len(times) == 3 and trend[-1] > trend[0]
+
+
+def test_snapshots_older_than_the_store_are_measured_after_new_rows(tmp_path):
+    archive = SnapshotArchive(str(tmp_path))
+    store = FeatureStore(str(tmp_path))
+    folder = Path(archive.user_folder("cal"))
+    folder.mkdir(parents=True)
+    for day in range(3):  # archived before the feature store existed
+        path = folder / f"old{day}.jpg"
+        cv2.imwrite(str(path), face((120, 140, 180)))
+        archive.add("cal", str(path), taken_at=day * DAY, location=BOX)
+    broken = folder / "broken.jpg"
+    broken.write_bytes(b"not an image")
+    archive.add("cal", str(broken), taken_at=3 * DAY, location=BOX)
+    # A snapshot taken with the store in place already has its row
+    new_id = archive.add("cal", str(folder / "new.jpg"), taken_at=10 * DAY)
+    store.append("cal", 10 * DAY, compute_skin_metrics(face((90, 90, 90)), BOX), new_id)
+
+    reads = []
+
+    def read_image(path):
+        reads.append(path)
+        return cv2.imread(path)
+
+    assert store.backfill("cal", archive, read_image) == 4
+    assert store.count("cal") == 5
+    assert np.isnan(store.load("cal")["brightness"][3])  # the broken one
+    assert store.backfill("cal", archive, read_image) == 0
+    assert len(reads) == 4
+
+    # The analysis picks up snapshots the store has no row for, too
+    cv2.imwrite(str(folder / "late.jpg"), face((120, 140, 180)))
+    archive.add("cal", str(folder / "late.jpg"), taken_at=4 * DAY, location=BOX)
+    assert len(load_features("cal", archive=archive, features=store)["taken_at"]) == 6
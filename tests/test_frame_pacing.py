@@ -0,0 +1,23 @@
+# FramePacingStats: dropped / duplicate / late accounting for displayed frames
+import sys
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.camera.frame_pacing import FramePacingStats
+
+
+def test_counts_gaps_repeats_and_late_frames():
+    stats = FramePacingStats(late_after=0.05, clock=lambda: 10.0)
+    stats.record(1, 9.99, now=10.00)
+    stats.record(2, 10.02, now=10.03)
+    stats.record(2, 10.02, now=10.05)  # shown again
+    stats.record(5, 10.10, now=10.20)  # 3 and 4 never shown, and late
+    summary = stats.summary(now=11.0)
+    assert summary["displayed"] == 3
+    assert summary["duplicate"] == 1
+    assert summary["dropped"] == 2
+    assert summary["late"] == 1
+    assert abs(summary["max_latency_ms"] - 100.0) < 1e-6
+    assert abs(summary["fps"] - 3.0) < 1e-6
@@ -0,0 +1,88 @@
+# LocationResolver caching with stand-ins for Nominatim and TimezoneFinder
+import json
+import sys
+import threading
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from weather.location_resolver import LocationResolver
+
+
+class Place:
+    def __init__(self, latitude, longitude):
+        self.latitude, self.longitude = latitude, longitude
+
+
+class FakeGeocoder:
+    def __init__(self, places):
+        self.places = places
+        self.queries = []
+
+    def geocode(self, query):
+        self.queries.append(query)
+        return self.places.get(query)
+
+
+class FakeTimezoneFinder:
+    def timezone_at(self, lng, lat):
+        return "Europe/Bucharest" if lng > 20 else "America/New_York"
+
+
+BRASOV = {"city": "Brasov", "state": "", "country": "Romania"}
+
+
+def test_resolves_once_and_persists(tmp_path):
+    cache_path = tmp_path / "data" / "location_cache.json"  # folder made on save
+    geocoder = FakeGeocoder({"Brasov, Romania": Place(45.6427, 25.5887)})
+    resolver = LocationResolver(str(cache_path), geocoder, FakeTimezoneFinder())
+
+    location = dict(BRASOV, lat=0.0, lon=0.0)
+    assert resolver.resolve_into(location)
+    assert location["lat"] == 45.6427 and location["timezone"] == "Europe/Bucharest"
+    # Same place, different spelling/case: served from the cache
+    resolver.resolve({"city": " brasov", "country": "ROMANIA"})
+    assert geocoder.queries == ["Brasov, Romania"]
+
+    # A fresh resolver (next start-up) reads the cache from disk
+    offline = FakeGeocoder({})
+    reloaded = LocationResolver(str(cache_path), offline, FakeTimezoneFinder())
+    assert reloaded.resolve(BRASOV)["timezone"] == "Europe/Bucharest"
+    assert offline.queries == []
+    assert list(json.loads(cache_path.read_text())) == ["brasov||romania"]
+
+
+def test_unknown_place_is_not_cached_or_retried(tmp_path):
+    cache_path = tmp_path / "location_cache.json"
+    geocoder = FakeGeocoder({})
+    resolver = LocationResolver(str(cache_path), geocoder, FakeTimezoneFinder())
+
+    location = {"city": "Atlantis", "country": "Sea"}
+    assert not resolver.resolve_into(location)
+    assert not resolver.resolve_into(location)
+    assert "lat" not in location
+    assert geocoder.queries == ["Atlantis, Sea"]
+    assert not cache_path.exists()
+    assert resolver.resolve({"city": "", "country": ""}) is None
+
+
+def test_async_lookup_runs_once_in_the_background(tmp_path):
+    release = threading.Event()
+
+    class SlowGeocoder(FakeGeocoder):
+        def geocode(self, query):
+            release.wait(5)
+            return super().geocode(query)
+
+    geocoder = SlowGeocoder({"Brasov, Romania": Place(45.6427, 25.5887)})
+    resolver = LocationResolver(
+        str(tmp_path / "location_cache.json"), geocoder, FakeTimezoneFinder()
+    )
+    first = resolver.resolve_async(BRASOV)
+    second = resolver.resolve_async(dict(BRASOV))
+    assert second is first and not first.done()  # the caller is not held up
+    release.set()
+    assert first.result(timeout=5)["timezone"] == "Europe/Bucharest"
+    assert resolver.resolve_async(BRASOV).done()  # known now: answered at once
+    assert geocoder.queries == ["Brasov, Romania"]
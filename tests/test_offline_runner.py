@@ -0,0 +1,27 @@
+# Hardware-free run of the offline pipeline runner over a replayed folder
+import json
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from pipeline.offline_runner import main
+
+
+def test_runner_reports_per_stage_timings(tmp_path):
+    frames = tmp_path / "frames"
+    frames.mkdir()
+    for i in range(4):
+        cv2.imwrite(str(frames / f"{i:03d}.jpg"), np.zeros((48, 64, 3), np.uint8))
+
+    out = tmp_path / "report.json"
+    report = main(["--source", str(frames), "--detector", "fake", "--json", str(out)])
+
+    assert report["frames"] == 4
+    for stage in ("capture", "preprocess", "infer", "postprocess"):
+        assert report["stages"][stage]["count"] == 4
+    assert json.loads(out.read_text())["frames"] == 4
@@ -0,0 +1,95 @@
+# Hardware-free checks for the vectorized postprocess / NMS
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR))
+
+from src.face_detection.face_detector import (
+    DETECTION_DTYPE,
+    HailoFaceDetector,
+    detections_to_locations,
+    non_max_suppression,
+)
+from src.face_detection import face_detector
+from src.face_detection.hailo_runtime import FakeBackend
+from tests.bench_postprocess import legacy_postprocess, nms_inputs, synthetic_outputs
+
+
+def make_boxes(rows):
+    boxes = np.zeros(len(rows), dtype=DETECTION_DTYPE)
+    for i, row in enumerate(rows):
+        boxes[i] = row
+    return boxes
+
+
+def test_nms_suppresses_overlapping_lower_scores():
+    boxes = make_boxes(
+        [
+            (10, 10, 100, 100, 0.8, 0),
+            (12, 12, 100, 100, 0.9, 0),
+            (300, 300, 50, 50, 0.5, 0),
+        ]
+    )
+    kept = non_max_suppression(boxes)
+    assert kept["score"].tolist() == [np.float32(0.9), np.float32(0.5)]
+
+
+def test_detections_to_locations_clips_to_frame():
+    boxes = make_boxes([(10, 20, 100, 50, 0.9, 2), (600, 400, 80, 120, 0.8, 2)])
+    assert detections_to_locations(boxes) == [(20, 110, 70, 10), (400, 680, 520, 600)]
+    assert detections_to_locations(boxes, (480, 640, 3)) == [
+        (20, 110, 70, 10),
+        (400, 640, 480, 600),
+    ]
+
+
+def test_postprocess_returns_structured_array():
+    detector = HailoFaceDetector(backend=FakeBackend())
+    outputs = {"nms": [[np.array([[0.1, 0.2, 0.3, 0.5, 0.7]], np.float32)]]}
+    detections = detector.postprocess(outputs)
+    assert detections.dtype == DETECTION_DTYPE
+    x, y, w, h, score, class_id = detections[0]
+    assert (x, y, w, h) == (64, 128, 128, 192)
+
+
+def test_matches_legacy_implementation():
+    detector = HailoFaceDetector(backend=FakeBackend())
+    outputs = synthetic_outputs(2000, num_classes=1, seed=3)
+    legacy = legacy_postprocess(outputs, detector.input_shape)
+    vectorized = detector.postprocess(outputs)
+    assert [tuple(b[:4]) for b in legacy] == [
+        tuple(int(v) for v in b.tolist()[:4]) for b in vectorized
+    ]
+
+
+def test_nms_paths_agree(monkeypatch):
+    detector = HailoFaceDetector(backend=FakeBackend())
+    for n in (10, 200, 2000):
+        _, boxes = nms_inputs(synthetic_outputs(n, 1, seed=n), detector.input_shape)
+        boxes["class_id"] = np.arange(len(boxes)) % 2
+        results = []
+        # Pure Python, IoU matrix, row by row
+        for small, limit in ((10**6, 10**6), (0, 10**6), (0, 0)):
+            monkeypatch.setattr(face_detector, "NMS_SMALL", small)
+            monkeypatch.setattr(face_detector, "NMS_MATRIX_LIMIT", limit)
+            results.append(non_max_suppression(boxes).tolist())
+            results.append(non_max_suppression(boxes, per_class=False).tolist())
+        assert results[0::2] == [results[0]] * 3
+        assert results[1::2] == [results[1]] * 3
+        assert len(results[0]) > len(results[1])
+
+
+def test_nms_runs_per_class_and_filters_classes():
+    detector = HailoFaceDetector(backend=FakeBackend())
+    box = np.array([[0.1, 0.1, 0.5, 0.5, 0.9]], np.float32)
+    outputs = {"nms": [[box, box.copy()]]}
+
+    both = detector.postprocess(outputs)
+    assert sorted(detector.labels[c] for c in both["class_id"]) == ["face", "person"]
+
+    faces = detector.postprocess(outputs, classes=("face",))
+    assert len(faces) == 1
+    assert detector.labels[faces[0]["class_id"]] == "face"
@@ -0,0 +1,73 @@
+# Checks for the journaled ProfileStore: O(1) saves, crash recovery, listeners
+import json
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.profile_store import ProfileStore
+
+TEMPLATE = {"name": "", "preferences": {"display_tips": True}, "facial_data": {}}
+
+
+def make_profile(name, rows=2):
+    return {"name": name, "facial_data": {"encodings": np.ones((rows, 128))}}
+
+
+def test_put_appends_to_journal_without_rewriting_snapshot(tmp_path):
+    path = tmp_path / "user_profiles.json"
+    path.write_text(json.dumps({"ana": {"name": "Ana", "facial_data": {}}}))
+    before = path.read_text()
+
+    store = ProfileStore(str(path), TEMPLATE)
+    store.put("bob", make_profile("Bob"))
+
+    assert path.read_text() == before
+    lines = Path(store.journal_path).read_text().splitlines()
+    assert [json.loads(line)["user_id"] for line in lines] == ["bob"]
+
+    reopened = ProfileStore(str(path), TEMPLATE)
+    assert set(reopened.profiles) == {"ana", "bob"}
+    assert reopened.get("bob")["facial_data"]["encodings"].shape == (2, 128)
+    # Template backfill does not share nested dicts between users
+    reopened.get("ana")["preferences"]["display_tips"] = False
+    assert reopened.get("bob")["preferences"]["display_tips"] is True
+
+
+def test_torn_journal_tail_is_ignored(tmp_path):
+    path = tmp_path / "user_profiles.json"
+    store = ProfileStore(str(path), TEMPLATE)
+    store.put("ana", make_profile("Ana"))
+    with open(store.journal_path, "a") as f:
+        f.write('{"op": "put", "user_id": "bob", "prof')
+
+    assert set(ProfileStore(str(path), TEMPLATE).profiles) == {"ana"}
+
+
+def test_compaction_folds_journal_into_snapshot(tmp_path):
+    path = tmp_path / "user_profiles.json"
+    store = ProfileStore(str(path), TEMPLATE, compact_after=3)
+    store.put("ana", make_profile("Ana"))
+    store.put("bob", make_profile("Bob"))
+    store.delete("ana")  # third entry triggers compaction
+
+    assert not Path(store.journal_path).exists()
+    assert set(json.loads(path.read_text())) == {"bob"}
+    assert set(ProfileStore(str(path), TEMPLATE).profiles) == {"bob"}
+
+
+def test_listeners_receive_changes(tmp_path):
+    store = ProfileStore(str(tmp_path / "user_profiles.json"), TEMPLATE)
+    events = []
+    store.add_listener(lambda user_id, profile: events.append((user_id, profile)))
+
+    stored = store.put("ana", make_profile("Ana", rows=3))
+    store.delete("ana")
+    store.delete("ana")  # unknown user: no event
+
+    assert [user_id for user_id, _ in events] == ["ana", "ana"]
+    assert events[0][1] is stored and events[1][1] is None
+    assert len(stored["facial_data"]["encodings"]) == 3
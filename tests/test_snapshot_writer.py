@@ -0,0 +1,100 @@
+# SnapshotWriter: background image writes, merged JSON and profile updates
+import json
+import sys
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from user_management.profile_store import ProfileStore
+from user_management.snapshot_writer import SnapshotWriter
+
+
+def frame(value=120):
+    img = np.full((48, 64, 3), value, dtype=np.uint8)
+    img[10:20, 10:30] = (0, 0, 255)
+    return img
+
+
+@pytest.mark.parametrize("image_format", ["jpg", "webp"])
+def test_images_are_encoded_in_the_background(tmp_path, image_format):
+    with SnapshotWriter(image_format=image_format, quality=80) as writer:
+        path = writer.save_image(frame(), str(tmp_path / "ana" / "snap.jpg"))
+        assert path.endswith("." + image_format)
+        writer.flush()
+    img = cv2.imread(path)
+    assert img.shape == (48, 64, 3) and abs(int(img[30, 50, 0]) - 120) < 8
+    assert not list(tmp_path.rglob("*.tmp"))
+
+
+def test_json_and_profile_updates_are_merged_per_batch(tmp_path):
+    store = ProfileStore(str(tmp_path / "user_profiles.json"))
+    store.put("ana", {"name": "Ana", "snapshots": []})
+    saves = []
+    store.add_listener(lambda user_id, profile: saves.append(user_id))
+
+    writer = SnapshotWriter(store, fsync="always")
+    gate = threading.Event()
+    writer.call(gate.wait)  # hold the thread so the rest lands in one batch
+    tips = str(tmp_path / "daily_tips.json")
+    for i in range(3):
+        writer.update_json(tips, {f"day{i}": "💡"})
+        writer.update_profile("ana", lambda p, i=i: p["snapshots"].append(f"s{i}"))
+    gate.set()
+    writer.close()
+
+    assert json.loads(Path(tips).read_text()) == {
+        "day0": "💡",
+        "day1": "💡",
+        "day2": "💡",
+    }
+    assert store.get("ana")["snapshots"] == ["s0", "s1", "s2"]
+    assert saves == ["ana"]  # one save for three updates
+
+
+def test_failed_item_does_not_stop_the_writer(tmp_path):
+    writer = SnapshotWriter()
+    writer.call(lambda: 1 / 0)
+    path = writer.save_image(frame(), str(tmp_path / "after.jpg"))
+    writer.close()
+    assert Path(path).exists()
+    with pytest.raises(RuntimeError):
+        writer.save_image(frame(), str(tmp_path / "closed.jpg"))
+
+
+def test_call_sees_updates_queued_before_it(tmp_path):
+    store = ProfileStore(str(tmp_path / "user_profiles.json"))
+    store.put("ana", {"name": "Ana", "snapshots": []})
+    writer = SnapshotWriter(store)
+    gate = threading.Event()
+    writer.call(gate.wait)
+    tips = str(tmp_path / "daily_tips.json")
+    seen = []
+    writer.update_json(tips, {"day0": "💡"})
+    writer.update_profile("ana", lambda p: p["snapshots"].append("s0"))
+    writer.call(
+        lambda: seen.append((Path(tips).exists(), store.get("ana")["snapshots"]))
+    )
+    gate.set()
+    writer.close()
+    assert seen == [(True, ["s0"])]
+
+
+def test_failed_fsync_does_not_stop_the_writer(tmp_path, monkeypatch):
+    from user_management import snapshot_writer
+
+    def broken(path):
+        raise OSError("disk gone")
+
+    monkeypatch.setattr(snapshot_writer, "_fsync_path", broken)
+    writer = SnapshotWriter(fsync="batch")
+    writer.save_image(frame(), str(tmp_path / "first.jpg"))
+    writer.flush()
+    path = writer.save_image(frame(), str(tmp_path / "second.jpg"))
+    writer.close()
+    assert Path(path).exists()
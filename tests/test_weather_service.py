@@ -0,0 +1,132 @@
+# WeatherService caching/coalescing against a local stub of the Open-Meteo API
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parents[1]
+sys.path.append(str(ROOT_DIR / "src"))
+
+from weather.open_meteo import OpenMeteoClient, get_weather
+from weather.weather_service import WeatherService
+
+
+class StubOpenMeteo(BaseHTTPRequestHandler):
+    delay = 0.0
+    status = 200
+    hits = []
+
+    def do_GET(self):
+        StubOpenMeteo.hits.append(self.path)
+        time.sleep(StubOpenMeteo.delay)
+        body = json.dumps(
+            {
+                "current": {
+                    "temperature_2m": 68.4,
+                    "weather_code": 61,
+                    "wind_speed_10m": 7.6,
+                }
+            }
+        ).encode()
+        self.send_response(StubOpenMeteo.status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_url():
+    StubOpenMeteo.delay, StubOpenMeteo.status, StubOpenMeteo.hits = 0.0, 200, []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenMeteo)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}/v1/forecast"
+    server.shutdown()
+    server.server_close()
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_reading_is_parsed_and_cached(stub_url):
+    service = WeatherService(OpenMeteoClient(stub_url).fetch)
+    location = {"lat": 44.4268, "lon": 26.1025, "city": "Bucharest", "country": "RO"}
+
+    first = get_weather(location, service=service)
+    second = get_weather(location, service=service)
+
+    assert first == {
+        "temperature": 68,
+        "condition": "Rain",
+        "wind": 8,
+        "location": "Bucharest, RO",
+    }
+    assert second == first
+    assert len(StubOpenMeteo.hits) == 1
+    assert "latitude=44.427&" in StubOpenMeteo.hits[0]
+
+
+def test_concurrent_requests_are_coalesced(stub_url):
+    StubOpenMeteo.delay = 0.2
+    service = WeatherService(OpenMeteoClient(stub_url).fetch, max_workers=4)
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(service.get(45.0, 25.0)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 8 and all(r["temperature"] == 68 for r in results)
+    assert len(StubOpenMeteo.hits) == 1
+
+
+def test_refresh_ahead_and_stale_fallback(stub_url):
+    clock = FakeClock()
+    service = WeatherService(
+        OpenMeteoClient(stub_url).fetch, ttl=600, refresh_ahead=120, clock=clock
+    )
+    assert service.get(45.0, 25.0)["temperature"] == 68
+
+    # Close to expiry: cached value now, refresh in the background
+    clock.now = 500
+    assert service.get(45.0, 25.0, wait=False)["temperature"] == 68
+    service._entries[(45.0, 25.0)].pending.result(timeout=5)
+    assert len(StubOpenMeteo.hits) == 2
+
+    # Upstream broken after expiry: the last good reading is still served
+    StubOpenMeteo.status = 500
+    clock.now = 2000
+    assert service.get(45.0, 25.0, wait=False)["temperature"] == 68
+    service._entries[(45.0, 25.0)].pending.result(timeout=5)
+    assert service.error_count == 1
+    assert service.get(45.0, 25.0)["temperature"] == 68
+
+
+def test_non_blocking_miss_and_unreachable_server():
+    service = WeatherService(
+        OpenMeteoClient("http://127.0.0.1:9/v1/forecast", timeout=0.5).fetch
+    )
+    assert get_weather("default", wait=False, service=service)["temperature"] == "--"
+    reading = get_weather("default", service=service)
+    assert reading["condition"] == "Unavailable"
+    assert reading["location"] == "Brasov, Romania"
+    # The failed fetch is remembered: non-blocking reads stop saying "Updating"
+    assert get_weather("default", wait=False, service=service)["condition"] == (
+        "Unavailable"
+    )